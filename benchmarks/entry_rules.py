@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Entry rules benchmark: cost of the rules check per message and of process_message with and without rules
+Reports the CPU share the fetcher would spend at a given message rate
+
+Usage: python benchmarks/entry_rules.py [--messages N] [--keywords N] [--rate MSGS_PER_SEC]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+
+from entry_rules import EntryRules  # noqa: E402
+from participant_store import message_flags  # noqa: E402
+
+WORDS = ['merhaba', 'selam', 'harika', 'yayın', 'çekiliş', 'ne', 'zaman', 'bu', 'gol', 'olmaz', 'abi', 'hadi']
+
+
+def make_messages(count, authors, rng):
+    """Chat-like messages, roughly one in five carries the entry command"""
+    messages = []
+    for i in range(count):
+        words = rng.choices(WORDS, k=rng.randint(2, 12))
+        if rng.random() < 0.2:
+            words.insert(rng.randrange(len(words) + 1), '!katil')
+        author_id = rng.randrange(authors)
+        author = SimpleNamespace(
+            channelId=f"UC{author_id:022d}", name=f"user{author_id}",
+            isChatSponsor=author_id % 7 == 0, isChatModerator=author_id % 97 == 0,
+            isChatOwner=False, isVerified=False
+        )
+        messages.append(SimpleNamespace(id=str(i), type='textMessage', message=' '.join(words), author=author))
+    return messages
+
+
+def make_rules(keyword_count, rng):
+    keywords = ['!katil', '#cekilis'] + [f"kelime{i}" for i in range(keyword_count - 2)]
+    blocked = [f"UC{rng.randrange(10 ** 6):022d}" for _ in range(1000)]
+    return EntryRules(keywords=keywords, exclude_moderators=True, blocked_channels=blocked)
+
+
+def timed(label, messages, fn, rate):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    per_message = elapsed / len(messages)
+    print(f"{label:<28} {len(messages):>8} msgs  {per_message * 1e6:7.2f} us/msg  "
+          f"{rate * per_message * 100:6.3f}% CPU at {rate} msgs/s")
+    return per_message
+
+
+def run_fetcher(messages, rules):
+    """process_message end to end, minus network and disk"""
+    from chat_fetcher_robust import RobustChatFetcher
+
+    fetcher = RobustChatFetcher('benchmark', server_url='http://127.0.0.1:9')
+    fetcher.journal.append = lambda record: None
+    fetcher.journal.extend = lambda records: None
+    fetcher.uploader.submit = lambda record: None
+    fetcher.entry_rules = rules
+
+    import builtins
+    original_print = builtins.print
+    builtins.print = lambda *args, **kwargs: None  # New-participant logs would dominate
+    try:
+        for message in messages:
+            fetcher.process_message(message)
+    finally:
+        builtins.print = original_print
+    return fetcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=200000)
+    parser.add_argument('--authors', type=int, default=50000)
+    parser.add_argument('--keywords', type=int, default=50)
+    parser.add_argument('--rate', type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    messages = make_messages(args.messages, args.authors, rng)
+    rules = make_rules(args.keywords, rng)
+    print(f"{len(rules.keywords)} keywords, {len(rules.blocked_channels)} blocked channels, moderators excluded")
+
+    def check():
+        allows = rules.allows
+        for message in messages:
+            author = message.author
+            allows(author.channelId, message_flags(message), message.message)
+
+    timed('rules.allows', messages, check, args.rate)
+
+    stats = {}
+
+    def plain():
+        stats['plain'] = run_fetcher(messages, None).stats
+
+    def filtered():
+        stats['filtered'] = run_fetcher(messages, rules).stats
+
+    timed('process_message (no rules)', messages, plain, args.rate)
+    timed('process_message (rules)', messages, filtered, args.rate)
+    print(f"participants: {stats['plain']['participants_found']} without rules, "
+          f"{stats['filtered']['participants_found']} with rules "
+          f"({stats['filtered']['messages_filtered']} messages filtered)")
+
+
+if __name__ == '__main__':
+    main()
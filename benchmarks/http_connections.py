@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Connection/syscall comparison: module-level requests.post vs the pooled ServerClient
+Runs a local stand-in server and counts TCP connections and bytes received
+
+Usage: python benchmarks/http_connections.py [--uploads N] [--batch N] [--strace]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+
+import requests  # noqa: E402
+from server_client import ServerClient  # noqa: E402
+
+
+class CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address):
+        super().__init__(address, CountingHandler)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.connections = 0
+        self.requests = 0
+        self.bytes_received = 0
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Allow keep-alive
+    disable_nagle_algorithm = True  # Headers and body go out as separate writes
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.reply({'encodings': ['json', 'gzip']})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.bytes_received += len(body)
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        payload = json.loads(body)
+        self.reply({'success': True, 'ackSeq': payload.get('seq'), 'resync': False})
+
+
+def make_batch(seq, size):
+    return {
+        'videoId': 'benchmark',
+        'session': 'benchmark',
+        'seq': seq,
+        'full': False,
+        'participants': [
+            {
+                'name': f'Viewer {seq}-{i}',
+                'id': f'UC{seq:010d}{i:012d}',
+                'url': f'http://www.youtube.com/channel/UC{seq:010d}{i:012d}',
+                'first_seen': '2024-01-01T12:00:00.000000'
+            }
+            for i in range(size)
+        ]
+    }
+
+
+def run_legacy(server_url, uploads, batch):
+    """Previous behaviour: a fresh requests.post per upload, plain JSON"""
+    for seq in range(1, uploads + 1):
+        requests.post(f"{server_url}/api/chat-participants", json=make_batch(seq, batch), timeout=5)
+        requests.post(f"{server_url}/api/chat-heartbeat", json={'videoId': 'benchmark', 'status': 'alive'}, timeout=2)
+
+
+def run_pooled(server_url, uploads, batch):
+    """Shared keep-alive session, gzip for larger bodies"""
+    client = ServerClient(server_url)
+    client.negotiate()
+    for seq in range(1, uploads + 1):
+        client.post('/api/chat-participants', make_batch(seq, batch))
+        client.post('/api/chat-heartbeat', {'videoId': 'benchmark', 'status': 'alive'})
+    client.close()
+
+
+MODES = {'legacy': run_legacy, 'pooled': run_pooled}
+
+
+def strace_summary(mode, server_url, uploads, batch):
+    """Re-run one mode in a child under strace -c, returns the summary text"""
+    command = [
+        'strace', '-f', '-c', '-e', 'trace=socket,connect,close,sendto,recvfrom,write,read,poll',
+        sys.executable, os.path.abspath(__file__), '--child', mode,
+        '--server', server_url, '--uploads', str(uploads), '--batch', str(batch)
+    ]
+    result = subprocess.run(command, capture_output=True, text=True)
+    return result.stderr.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--uploads', type=int, default=200)
+    parser.add_argument('--batch', type=int, default=100, help='participants per upload')
+    parser.add_argument('--strace', action='store_true', help='also collect syscall counts (Linux)')
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--server', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        MODES[args.child](args.server, args.uploads, args.batch)
+        return
+
+    server = CountingServer(('127.0.0.1', 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"{args.uploads} uploads x {args.batch} participants (+1 heartbeat each)")
+    print(f"{'mode':<8} {'connections':>11} {'requests':>9} {'bytes rx':>12} {'seconds':>8}")
+    for mode, run in MODES.items():
+        server.reset()
+        start = time.perf_counter()
+        run(server_url, args.uploads, args.batch)
+        elapsed = time.perf_counter() - start
+        print(f"{mode:<8} {server.connections:>11} {server.requests:>9} {server.bytes_received:>12} {elapsed:>8.2f}")
+
+    if args.strace:
+        if not shutil.which('strace'):
+            print("strace not found, skipping syscall counts")
+        else:
+            for mode in MODES:
+                print(f"\n--- syscalls: {mode} ---")
+                print(strace_summary(mode, server_url, args.uploads, args.batch))
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
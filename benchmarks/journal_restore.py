@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Warm-restart benchmark for the participant journal
+Writes N participants (part snapshot, part journal tail) and times load()
+
+Usage: python benchmarks/journal_restore.py [--participants N] [--tail-ratio R]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+
+from participant_journal import ParticipantJournal  # noqa: E402
+from participant_store import ParticipantStore  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--participants', type=int, default=100000)
+    parser.add_argument('--tail-ratio', type=float, default=0.5, help='share of participants only in the journal tail')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as journal_dir:
+        participants = ParticipantStore()
+        journal = ParticipantJournal(
+            'benchmark',
+            roster=participants.to_wire,
+            journal_dir=journal_dir,
+            log=lambda message: None,
+            compact_every=10 ** 12
+        )
+        journal.start()
+
+        snapshot_count = int(args.participants * (1 - args.tail_ratio))
+        for i in range(args.participants):
+            journal.append(participants.add(f"UC{i:022d}", f"Viewer {i}"))
+            if i + 1 == snapshot_count:
+                journal.write()
+                journal.compact()
+
+        start = time.perf_counter()
+        journal.stop()
+        write_seconds = time.perf_counter() - start
+
+        # Same path as RobustChatFetcher.restore_participants
+        reload = ParticipantJournal('benchmark', roster=list, journal_dir=journal_dir)
+        restored = ParticipantStore()
+        start = time.perf_counter()
+        restored.load_wire(reload.load().values())
+        load_seconds = time.perf_counter() - start
+        assert len(restored) == args.participants, len(restored)
+
+        sizes = {name: os.path.getsize(os.path.join(journal_dir, name)) for name in os.listdir(journal_dir)}
+
+    print(f"participants:        {args.participants}")
+    print(f"snapshot / tail:     {snapshot_count} / {args.participants - snapshot_count}")
+    print(f"final write + fsync: {write_seconds:.3f}s")
+    print(f"restore:             {load_seconds:.3f}s")
+    for name, size in sorted(sizes.items()):
+        print(f"  {name}: {size / 1024 / 1024:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lean parser benchmark and conformance check against pytchat's DefaultProcessor
+Every item of every fixture must produce the same ID, type, text, timestamp,
+author fields and draw flags on both paths; any mismatch exits with status 1.
+Throughput covers JSON decoding plus item parsing, as chat.get() pays both.
+
+Fixtures are raw continuation responses, one per line, as written by
+`chat_replay.py record <video_id> out.jsonl --raw raw.jsonl`. Without any,
+synthetic responses covering every item type, badge and emoji are generated.
+
+Usage: python benchmarks/lean_parser.py [--fixtures raw.jsonl ...] [--responses N] [--items N]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+
+from pytchat.parser.live import Parser  # noqa: E402
+from pytchat.processors.default.processor import DefaultProcessor  # noqa: E402
+
+import lean_chat  # noqa: E402
+from participant_store import message_flags  # noqa: E402
+
+FIELDS = ('id', 'type', 'message', 'timestamp')
+AUTHOR_FIELDS = ('channelId', 'name', 'isVerified', 'isChatOwner', 'isChatSponsor', 'isChatModerator')
+WORDS = ('merhaba', 'selam', 'harika', 'yayın', 'çekiliş', 'gol', 'hadi', 'abi', 'süper', 'ne', 'zaman', 'bu')
+
+
+def badge(icon=None, member=False):
+    renderer = {'tooltip': 'badge', 'accessibility': {'accessibilityData': {'label': 'badge'}}}
+    if icon:
+        renderer['icon'] = {'iconType': icon}
+    if member:
+        renderer['customThumbnail'] = {'thumbnails': [{'url': 'https://yt3.ggpht.com/badge=s16', 'width': 16},
+                                                      {'url': 'https://yt3.ggpht.com/badge=s32', 'width': 32}]}
+    return {'liveChatAuthorBadgeRenderer': renderer}
+
+
+def synthetic_item(rng, n):
+    """One addChatItemAction item shaped like YouTube's, with every variant we handle"""
+    author_id = rng.randrange(5000)
+    runs = []
+    for _ in range(rng.randint(1, 8)):
+        if rng.random() < 0.15:
+            runs.append({'emoji': {
+                'emojiId': f"UCemoji/{rng.randrange(100)}", 'shortcuts': [':smile:', ':happy:'],
+                'image': {'thumbnails': [{'url': 'https://yt3.ggpht.com/emoji=w24-h24'}]}
+            }})
+        else:
+            runs.append({'text': rng.choice(WORDS) + ' '})
+    renderer = {
+        'id': f"ChwKGkNPUzh{n:012d}",
+        'timestampUsec': str(1700000000000000 + n * 137123),
+        'authorName': {'simpleText': f"Viewer {author_id}"},
+        'authorPhoto': {'thumbnails': [{'url': 'https://yt3.ggpht.com/a=s32', 'width': 32},
+                                       {'url': 'https://yt3.ggpht.com/a=s64', 'width': 64}]},
+        'authorExternalChannelId': f"UC{author_id:022d}",
+        'message': {'runs': runs},
+        'contextMenuEndpoint': {'commandMetadata': {'webCommandMetadata': {'ignoreNavigation': True}}},
+        'timestampText': {'simpleText': '1:23'}
+    }
+    badges = []
+    roll = rng.random()
+    if roll < 0.1:
+        badges.append(badge(member=True))
+    if 0.1 <= roll < 0.12:
+        badges.append(badge('MODERATOR'))
+    if 0.12 <= roll < 0.13:
+        badges.append(badge('VERIFIED'))
+    if roll > 0.999:
+        badges.append(badge('OWNER'))
+    if badges:
+        renderer['authorBadges'] = badges
+
+    kind = rng.random()
+    key = 'liveChatTextMessageRenderer'
+    if kind < 0.02:
+        key = 'liveChatPaidMessageRenderer'
+        renderer['purchaseAmountText'] = {'simpleText': '₺100.00'}
+        for color in ('headerBackgroundColor', 'headerTextColor', 'bodyBackgroundColor', 'bodyTextColor',
+                      'authorNameTextColor', 'timestampColor'):
+            renderer[color] = 4280150454
+    elif kind < 0.03:
+        key = 'liveChatPaidStickerRenderer'
+        del renderer['message']
+        renderer['purchaseAmountText'] = {'simpleText': '$5.00'}
+        renderer['sticker'] = {'thumbnails': [{'url': '//lh3.googleusercontent.com/sticker=s40'}]}
+        renderer['moneyChipBackgroundColor'] = renderer['moneyChipTextColor'] = 4278237396
+        renderer['backgroundColor'] = renderer['authorNameTextColor'] = 4278237396
+    elif kind < 0.035:
+        key = 'liveChatMembershipItemRenderer'
+        del renderer['message']
+        if rng.random() < 0.5:
+            renderer['headerSubtext'] = {'runs': [{'text': 'Welcome to '}, {'text': 'the club'}]}
+    elif kind < 0.037:
+        key = 'liveChatLegacyPaidMessageRenderer'
+        del renderer['message']
+        renderer['eventText'] = {'runs': [{'text': 'New member'}]}
+        renderer['detailText'] = {'simpleText': 'Welcome!'}
+    elif kind < 0.04:
+        return {'liveChatViewerEngagementMessageRenderer': {'id': f"engagement{n}", 'message': {'runs': []}}}
+    elif kind < 0.041:
+        del renderer['authorExternalChannelId']  # Skipped on both paths
+    return {key: renderer}
+
+
+def synthetic_responses(count, items, seed=42):
+    """Raw get_live_chat response bodies"""
+    rng = random.Random(seed)
+    n = 0
+    bodies = []
+    for _ in range(count):
+        actions = []
+        for _ in range(items):
+            actions.append({'addChatItemAction': {'item': synthetic_item(rng, n), 'clientId': ''}})
+            n += 1
+        if rng.random() < 0.3:
+            actions.append({'addLiveChatTickerItemAction': {'item': {}, 'durationSec': '10'}})
+        bodies.append(json.dumps({
+            'responseContext': {'serviceTrackingParams': [], 'mainAppWebResponseContext': {'loggedOut': True}},
+            'continuationContents': {'liveChatContinuation': {
+                'continuations': [{'invalidationContinuationData': {'continuation': 'abc', 'timeoutMs': 5000}}],
+                'actions': actions
+            }}
+        }, ensure_ascii=False).encode('utf-8'))
+    return bodies
+
+
+def load_fixtures(paths):
+    bodies = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            bodies.extend(line.strip() for line in f if line.strip())
+    return bodies
+
+
+def components(bodies, loads):
+    """Decode and split like PytchatCore._get_chat_component, one component per response
+
+    A generator, so like chat.get() only one decoded response is alive at a time.
+    """
+    parser = Parser(is_replay=False)
+    for body in bodies:
+        contents, _ = parser.get_contents(loads(body))
+        if contents is None:
+            continue
+        try:
+            metadata, chatdata = parser.parse(contents)
+        except Exception:
+            continue  # End of stream or an unknown continuation
+        yield {'timeout': metadata['timeoutMs'] / 1000, 'chatdata': chatdata}
+
+
+def describe(chat):
+    fields = {field: getattr(chat, field) for field in FIELDS}
+    fields.update({field: getattr(chat.author, field) for field in AUTHOR_FIELDS})
+    fields['flags'] = message_flags(chat)
+    return fields
+
+
+def check_conformance(bodies):
+    """Compare both processors item by item, returns (items compared, mismatches)"""
+    default = DefaultProcessor()
+    lean = lean_chat.LeanProcessor()
+    compared = 0
+    mismatches = []
+    for component in components(bodies, json.loads):
+        expected = default.process([component])
+        actual = lean.process([component])
+        if expected.interval != actual.interval or len(expected.items) != len(actual.items):
+            mismatches.append(f"chunk: {len(expected.items)} items / {expected.interval}s vs "
+                              f"{len(actual.items)} items / {actual.interval}s")
+            continue
+        for want, got in zip(expected.items, actual.items):
+            compared += 1
+            want, got = describe(want), describe(got)
+            if want != got:
+                diff = {key: (want[key], got[key]) for key in want if want[key] != got[key]}
+                mismatches.append(f"{want['id']}: {diff}")
+    return compared, mismatches
+
+
+def throughput(bodies, loads, processor, repeat):
+    """Best-of-`repeat` messages per second for decoding + parsing every body"""
+    best = None
+    items = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = 0
+        for component in components(bodies, loads):
+            items += len(processor.process([component]).items)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return items / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fixtures', nargs='*', default=[], help="raw continuation JSONL files")
+    parser.add_argument('--responses', type=int, default=500, help="synthetic responses without fixtures")
+    parser.add_argument('--items', type=int, default=100, help="chat items per synthetic response")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    bodies = load_fixtures(args.fixtures) if args.fixtures else synthetic_responses(args.responses, args.items)
+    compared, mismatches = check_conformance(bodies)
+    print(f"conformance: {compared} items from {len(bodies)} responses, {len(mismatches)} mismatches")
+    for mismatch in mismatches[:10]:
+        print(f"  {mismatch}")
+
+    decoder = 'orjson' if lean_chat.orjson else 'json'
+    default_rate = throughput(bodies, json.loads, DefaultProcessor(), args.repeat)
+    lean_rate = throughput(bodies, lean_chat.loads, lean_chat.LeanProcessor(), args.repeat)
+    print(f"{'pytchat (json + DefaultProcessor)':<36} {default_rate:>12,.0f} msgs/s")
+    print(f"{f'lean ({decoder} + LeanProcessor)':<36} {lean_rate:>12,.0f} msgs/s  {lean_rate / default_rate:.1f}x")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
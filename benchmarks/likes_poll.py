@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Like-count polling: streaming early-exit scanner vs downloading the whole page
+A local HTTP server serves a watch-page sized HTML fixture with "likeCount"
+early (where YouTube puts it) or late, with an ETag so repeat polls can be
+answered 304. Reports bytes read and CPU time per poll for each way of
+fetching, and checks the scanner finds the count, including a match split
+across two chunks, before timing anything (exit status 1 otherwise).
+
+Usage: python benchmarks/likes_poll.py [--page-kb 1200] [--polls 50] [--position early|late]
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+
+from likes_tracker import LIKE_PATTERN, LikesTracker  # noqa: E402
+
+LIKES = 123456
+FILLER = b'<script nonce="x">var ytInitialPlayerResponse = {"responseContext":{"serviceTrackingParams":[]}};</script>\n'
+
+
+def fixture_page(size, position):
+    """HTML of about `size` bytes with the like count at `position` (0..1) of it"""
+    marker = b'{"toggleButtonViewModel":{"likeCount":"%d","title":"like"}}' % LIKES
+    body = FILLER * (size // len(FILLER) + 1)
+    at = int(len(body) * position)
+    return b'<!DOCTYPE html><html><body>' + body[:at] + marker + body[at:size] + b'</body></html>'
+
+
+def serve(page, etag):
+    """Serve `page` on localhost, honouring If-None-Match when `etag` is set"""
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            if etag and self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(page)))
+            if etag:
+                self.send_header('ETag', etag)
+            self.end_headers()
+            try:
+                self.wfile.write(page)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # The scanner hung up early, as intended
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+
+        def handle_error(self, request, client_address):
+            pass  # Resets from connections the scanner dropped
+
+    server = Server(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/watch"
+
+
+def full_download(session, url):
+    """What server.js does: the whole page, then a regex over all of it"""
+    response = session.get(url, timeout=10)
+    match = LIKE_PATTERN.search(response.content)
+    return (int(match.group(1)) if match else None), len(response.content)
+
+
+def check_split_match(page):
+    """A chunk boundary in the middle of "likeCount" must not hide it"""
+    offset = page.index(b'"likeCount"') + 5
+    server, url = serve(page, None)
+    try:
+        tracker = LikesTracker('fixture', on_likes=None, url=url, chunk_size=offset)
+        return tracker.poll() == LIKES
+    finally:
+        server.shutdown()
+
+
+def measure(polls, fetch):
+    """Average (bytes, CPU ms, wall ms) per poll"""
+    total_bytes = 0
+    cpu_started = time.thread_time()
+    wall_started = time.perf_counter()
+    for _ in range(polls):
+        total_bytes += fetch()
+    cpu = time.thread_time() - cpu_started
+    wall = time.perf_counter() - wall_started
+    return total_bytes / polls, cpu * 1000 / polls, wall * 1000 / polls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--page-kb', type=int, default=1200, help="fixture page size")
+    parser.add_argument('--polls', type=int, default=50)
+    parser.add_argument('--position', choices=('early', 'late'), default='early',
+                        help="where likeCount sits in the page")
+    args = parser.parse_args()
+
+    page = fixture_page(args.page_kb * 1024, 0.12 if args.position == 'early' else 0.95)
+    etag = '"%s"' % hashlib.sha1(page).hexdigest()[:16]
+
+    if not check_split_match(page):
+        print("scanner missed a likeCount split across chunks")
+        sys.exit(1)
+
+    server, url = serve(page, etag)
+    try:
+        session = requests.Session()
+        likes, _ = full_download(session, url)
+        streaming = LikesTracker('fixture', on_likes=None, url=url)
+        conditional = LikesTracker('fixture', on_likes=None, url=url)
+        if likes != LIKES or streaming.poll() != LIKES or conditional.poll() != LIKES:
+            print("like count not found in the fixture")
+            sys.exit(1)
+
+        def streamed():
+            streaming.etag = None  # Unconditional every time
+            streaming.poll()
+            return streaming.stats['last_bytes']
+
+        def revalidated():
+            conditional.poll()
+            return conditional.stats['last_bytes']
+
+        results = {
+            'full download': measure(args.polls, lambda: full_download(session, url)[1]),
+            'streaming scan': measure(args.polls, streamed),
+            'conditional (304)': measure(args.polls, revalidated)
+        }
+    finally:
+        server.shutdown()
+
+    print(f"{len(page) / 1024:.0f} KB page, likeCount {args.position} "
+          f"(offset {page.index(b'likeCount') / 1024:.0f} KB), {args.polls} polls each")
+    print(f"{'':<18} {'KB/poll':>10} {'CPU ms/poll':>12} {'wall ms/poll':>13}")
+    baseline = results['full download']
+    for name, (read, cpu, wall) in results.items():
+        print(f"{name:<18} {read / 1024:>10.1f} {cpu:>12.3f} {wall:>13.3f}"
+              f"  {baseline[1] / cpu if cpu else float('inf'):.1f}x CPU")
+
+
+if __name__ == '__main__':
+    main()
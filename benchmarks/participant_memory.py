@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memory per participant: plain dicts (previous format) vs ParticipantStore
+Measured with tracemalloc, channel IDs and names built the way pytchat delivers them
+
+Usage: python benchmarks/participant_memory.py [--sizes 10000,100000,1000000]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+
+from participant_store import ParticipantStore  # noqa: E402
+
+
+def authors(count):
+    """(channel_id, name) pairs as fresh strings, like parsed chat JSON"""
+    for i in range(count):
+        yield ''.join(('UC', f"{i:022d}")), ''.join(('Viewer ', str(i)))
+
+
+def build_dicts(count):
+    participants = {}
+    for channel_id, name in authors(count):
+        participants[channel_id] = {
+            'name': name,
+            'id': channel_id,
+            'url': 'http://www.youtube.com/channel/' + channel_id,
+            'first_seen': datetime.now().isoformat()
+        }
+    return participants
+
+
+def build_store(count):
+    participants = ParticipantStore()
+    for channel_id, name in authors(count):
+        participants.add(channel_id, name)
+    return participants
+
+
+def measure(build, count):
+    gc.collect()
+    tracemalloc.start()
+    result = build(count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    gc.collect()
+    return current / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    args = parser.parse_args()
+
+    print(f"{'participants':>12} {'dict B/p':>10} {'store B/p':>10} {'saving':>8}")
+    for count in (int(size) for size in args.sizes.split(',')):
+        dict_bytes = measure(build_dicts, count)
+        store_bytes = measure(build_store, count)
+        print(f"{count:>12} {dict_bytes:>10.0f} {store_bytes:>10.0f} {1 - store_bytes / dict_bytes:>8.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bounded-memory mode: ParticipantStore vs SpillingParticipantStore at 1M+ authors
+Each store is built in its own process so peak RSS is its own. Reports insert
+and lookup cost (known and never-seen authors) and the measured Bloom
+false-positive rate.
+
+Usage: python benchmarks/participant_spill.py [--authors 1000000] [--memory-mb 64] [--error-rate 0.001]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows: no peak RSS
+
+from participant_spill import SpillingParticipantStore  # noqa: E402
+from participant_store import ParticipantStore  # noqa: E402
+
+LOOKUPS = 100000
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_store(args):
+    """Build one store and measure it, returns a dict of results"""
+    if args.store == 'spill':
+        store = SpillingParticipantStore(memory_mb=args.memory_mb, error_rate=args.error_rate)
+    else:
+        store = ParticipantStore()
+
+    start = time.perf_counter()
+    for i in range(args.authors):
+        store.add(''.join(('UC', f"{i:022d}")), ''.join(('Viewer ', str(i))))
+    insert_us = (time.perf_counter() - start) / args.authors * 1e6
+
+    # Returning chatters, drawn uniformly so most of them are not in the hot cache
+    rng = random.Random(42)
+    known = [f"UC{rng.randrange(args.authors):022d}" for _ in range(LOOKUPS)]
+    start = time.perf_counter()
+    for channel_id in known:
+        store.get(channel_id)
+    known_us = (time.perf_counter() - start) / LOOKUPS * 1e6
+
+    new = [f"UX{i:022d}" for i in range(LOOKUPS)]
+    false_positives = store.stats['false_positives'] if args.store == 'spill' else 0
+    start = time.perf_counter()
+    for channel_id in new:
+        store.get(channel_id)
+    new_us = (time.perf_counter() - start) / LOOKUPS * 1e6
+
+    result = {'insert_us': insert_us, 'known_lookup_us': known_us, 'new_lookup_us': new_us}
+    if args.store == 'spill':
+        stats = store.memory_stats()
+        result['false_positive_rate'] = (stats['false_positives'] - false_positives) / LOOKUPS
+        result['bloom_mb'] = stats['bloom']['bytes'] / (1024 * 1024)
+        result['spill_mb'] = stats['spill_bytes'] / (1024 * 1024)
+        store.close()
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--authors', type=int, default=1000000)
+    parser.add_argument('--memory-mb', type=int, default=64)
+    parser.add_argument('--error-rate', type=float, default=0.001)
+    parser.add_argument('--store', choices=('memory', 'spill'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.store:
+        print(json.dumps(run_store(args)), flush=True)
+        return
+
+    results = {}
+    for store in ('memory', 'spill'):
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--authors', str(args.authors),
+             '--memory-mb', str(args.memory_mb), '--error-rate', str(args.error_rate), '--store', store],
+            stdout=subprocess.PIPE, text=True, check=True
+        )
+        results[store] = json.loads(child.stdout.strip().splitlines()[-1])
+
+    print(f"{args.authors} authors, spill budget {args.memory_mb} MB, Bloom error rate {args.error_rate}")
+    print(f"{'':<18} {'memory':>10} {'spill':>10}")
+    for key, unit in (('insert_us', 'us/op'), ('known_lookup_us', 'us/op'),
+                      ('new_lookup_us', 'us/op'), ('peak_rss_mb', 'MB')):
+        memory, spill = results['memory'][key], results['spill'][key]
+        if memory is None:
+            continue
+        print(f"{key:<18} {memory:>10.2f} {spill:>10.2f} {unit}")
+    spill = results['spill']
+    print(f"Bloom filter {spill['bloom_mb']:.1f} MB, measured false-positive rate {spill['false_positive_rate']:.4%}, "
+          f"spill file {spill['spill_mb']:.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
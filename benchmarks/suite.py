@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ingestion pipeline benchmark suite with baseline regression checks
+Each benchmark runs in its own process so its peak RSS is its own.
+
+  message_cost    process_message per message, new and known authors
+  batch_ingest    process_batch per message for 100/1k/10k-message chunks,
+                  against process_message on the same messages
+  dedup_index     ParticipantStore insert and lookup at 10k-1M authors
+  serialization   upload batch to_wire + encode per batch size
+  profiling       process_batch per message with the timing hooks off, on, and
+                  with the sampling profiler running, medians over alternating
+                  runs; the paired on-off differences are informational only
+  burst           end-to-end: 50k messages in 60 s through the replay harness
+                  and a local stand-in server
+  startup         interpreter start + fetcher module import (cold start cost),
+                  time to first participant in a replay
+
+Usage:
+  python benchmarks/suite.py [--only a,b] [--quick] [--output results.json]
+  python benchmarks/suite.py --baseline benchmarks/baseline.json [--threshold 0.25]
+  python benchmarks/suite.py --quick --baseline benchmarks/baseline-quick.json
+
+Baselines: benchmarks/baseline.json (full sizes) and baseline-quick.json
+(--quick) are reference runs; compare a run with the one of the same mode.
+Timings only compare on the machine that produced them, so on other hardware
+first record a local baseline from the commit you are comparing against. To
+refresh the committed ones after an intended change, on an idle machine:
+  python benchmarks/suite.py --runs 3 --output benchmarks/baseline.json
+  python benchmarks/suite.py --quick --runs 3 --output benchmarks/baseline-quick.json
+and commit them with the change. A single run makes a poor baseline: one
+lucky fast run turns every later run into a regression. Informational metrics (the profiling
+overheads) are printed but not stored or compared. Per-message timings move
+20-40% between runs on a busy shared host, so rerun anything flagged before
+believing it.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows: no peak RSS
+
+LOWER = 'lower'    # Times, latencies, memory
+HIGHER = 'higher'  # Throughput
+INFO = 'info'      # Printed for reference, never a regression (noise-level differences)
+
+
+def metric(value, unit, better=LOWER, spread=None):
+    result = {'value': round(value, 4), 'unit': unit, 'better': better}
+    if spread is not None:
+        result['spread'] = round(spread, 4)  # Interquartile range of the samples
+    return result
+
+
+def quartile_spread(samples):
+    quartiles = statistics.quantiles(samples, n=4)
+    return quartiles[2] - quartiles[0]
+
+
+def best_of(repeat, fn):
+    """Smallest of several runs, the least noisy estimate of a hot path"""
+    return min(fn() for _ in range(repeat))
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def make_messages(count, authors, seed=42):
+    from chat_replay import ReplayMessage, SyntheticSource
+
+    source = SyntheticSource(rate=1000, duration=count / 1000, authors=authors, seed=seed)
+    now = int(time.time() * 1000)
+    return [ReplayMessage(data, now) for _, data in source][:count]
+
+
+def quiet_fetcher(**options):
+    """A fetcher that never touches the network or disk during the measurement"""
+    from chat_fetcher_robust import RobustChatFetcher
+    from event_channel import LOG_ERROR
+
+    fetcher = RobustChatFetcher('benchmark', server_url='http://127.0.0.1:9', verbosity=LOG_ERROR, **options)
+    fetcher.journal.append = lambda record: None
+    fetcher.journal.extend = lambda records: None
+    return fetcher
+
+
+def bench_message_cost(args):
+    messages = make_messages(args.messages, args.authors)
+
+    def run(known):
+        fetcher = quiet_fetcher(upload_options={'max_queue': len(messages) + 1})
+        if known:
+            for message in messages:
+                fetcher.process_message(message)
+        start = time.perf_counter()
+        for message in messages:
+            fetcher.process_message(message)
+        return (time.perf_counter() - start) / len(messages) * 1e6
+
+    return {
+        'message_cost_mixed_us': metric(best_of(args.repeat, lambda: run(False)), 'us/msg'),
+        'message_cost_known_us': metric(best_of(args.repeat, lambda: run(True)), 'us/msg')
+    }
+
+
+def bench_batch_ingest(args):
+    messages = make_messages(args.messages, args.authors)
+    results = {}
+    for size in (100, 1000, 10000):
+        chunks = [messages[i:i + size] for i in range(0, len(messages), size)]
+
+        def run(batched):
+            fetcher = quiet_fetcher(upload_options={'max_queue': len(messages) + 1})
+            start = time.perf_counter()
+            if batched:
+                for chunk in chunks:
+                    fetcher.process_batch(chunk)
+            else:
+                for chunk in chunks:
+                    for message in chunk:
+                        fetcher.process_message(message)
+            return (time.perf_counter() - start) / len(messages) * 1e6
+
+        results[f"ingest_chunk_{size}_per_message_us"] = metric(best_of(args.repeat, lambda: run(False)), 'us/msg')
+        results[f"ingest_chunk_{size}_batch_us"] = metric(best_of(args.repeat, lambda: run(True)), 'us/msg')
+    return results
+
+
+def bench_profiling(args):
+    messages = make_messages(args.messages, args.authors)
+    chunks = [messages[i:i + 1000] for i in range(0, len(messages), 1000)]
+
+    def run(timings=False, profiler=False):
+        fetcher = quiet_fetcher(upload_options={'max_queue': len(messages) + 1})
+        if timings:
+            fetcher.timings.enable()
+        if profiler:
+            fetcher.profiler.write = lambda: None
+            fetcher.profiler.start()
+        start = time.perf_counter()
+        for chunk in chunks:
+            fetcher.process_batch(chunk)
+        elapsed = time.perf_counter() - start
+        fetcher.profiler.stop()
+        return elapsed / len(messages) * 1e6
+
+    # The overhead is smaller than the drift between separate best-of runs, so
+    # on and off alternate (order rotated each round) and each round's
+    # difference is taken against the off run right next to it
+    variants = [{}, {'timings': True}, {'profiler': True}]
+    times = [[] for _ in variants]
+    for round_ in range(max(9, args.repeat * 5)):
+        for i in range(len(variants)):
+            variant = (round_ + i) % len(variants)
+            times[variant].append(run(**variants[variant]))
+    off, hooks_on, sampler_on = times
+    # Overheads sit within the noise and take either sign, so they are reported
+    # with their spread and never gate a comparison; the totals above do
+    hooks = [on - base for on, base in zip(hooks_on, off)]
+    sampler = [on - base for on, base in zip(sampler_on, off)]
+
+    return {
+        'profiling_hooks_off_us': metric(statistics.median(off), 'us/msg'),
+        'profiling_hooks_on_us': metric(statistics.median(hooks_on), 'us/msg'),
+        'profiling_sampler_on_us': metric(statistics.median(sampler_on), 'us/msg'),
+        'profiling_hooks_overhead_us': metric(statistics.median(hooks), 'us/msg', INFO, quartile_spread(hooks)),
+        'profiling_sampler_overhead_us': metric(statistics.median(sampler), 'us/msg', INFO, quartile_spread(sampler))
+    }
+
+
+def bench_dedup_index(args):
+    from participant_store import ParticipantStore
+
+    results = {}
+    for size in args.sizes:
+        ids = [''.join(('UC', f"{i:022d}")) for i in range(size)]
+        misses = [''.join(('UX', f"{i:022d}")) for i in range(min(size, 100000))]
+        built = {}
+
+        def insert():
+            store = ParticipantStore()
+            start = time.perf_counter()
+            for channel_id in ids:
+                store.add(channel_id, 'Viewer')
+            elapsed = time.perf_counter() - start
+            built['store'] = store
+            return elapsed / size * 1e6
+
+        def lookup():
+            get = built['store'].get
+            start = time.perf_counter()
+            for channel_id in ids:
+                get(channel_id)
+            for channel_id in misses:
+                get(channel_id)
+            return (time.perf_counter() - start) / (size + len(misses)) * 1e6
+
+        label = f"{size // 1000}k"
+        results[f"dedup_insert_{label}_us"] = metric(best_of(args.repeat, insert), 'us/op')
+        results[f"dedup_lookup_{label}_us"] = metric(best_of(args.repeat, lookup), 'us/op')
+        built.clear()
+    return results
+
+
+def bench_serialization(args):
+    from participant_store import Participant
+    from server_client import ServerClient, ENCODING_GZIP
+
+    client = ServerClient('http://127.0.0.1:9')
+    client.encodings.add(ENCODING_GZIP)
+    now = time.time()
+    results = {}
+    for size in (10, 100, 1000):
+        batch = [Participant(f"UC{i:022d}", f"Viewer {i}", now) for i in range(size)]
+        rounds = max(1, 20000 // size)
+
+        def encode():
+            start = time.perf_counter()
+            for seq in range(rounds):
+                client.encode({
+                    'videoId': 'benchmark', 'session': 'benchmark', 'seq': seq, 'full': False,
+                    'participants': [participant.to_wire() for participant in batch]
+                })
+            return (time.perf_counter() - start) / rounds * 1e6
+
+        results[f"serialize_batch_{size}_us"] = metric(best_of(args.repeat, encode), 'us/batch')
+        body, _ = client.encode({'participants': [participant.to_wire() for participant in batch]})
+        results[f"serialize_batch_{size}_bytes"] = metric(len(body), 'bytes')
+    return results
+
+
+def bench_burst(args):
+    from chat_replay import ReplayFetcher, StandInServer, SyntheticSource
+    from event_channel import LOG_ERROR
+
+    duration = 60
+    source = SyntheticSource(rate=args.burst / duration, duration=duration, authors=args.authors)
+    server = StandInServer().start()
+    fetcher = ReplayFetcher(source, server.url, speed=args.speed, verbosity=LOG_ERROR)
+
+    start = time.perf_counter()
+    fetcher.run()  # Includes cleanup, so every upload has been acknowledged
+    elapsed = time.perf_counter() - start
+    report = fetcher.report(server)
+    server.stop()
+
+    if report['server']['participants'] != report['participants']:
+        raise AssertionError(f"stand-in received {report['server']['participants']} of "
+                             f"{report['participants']} participants")
+
+    delivery = report['delivery_seconds']
+    replay_seconds = duration / args.speed if args.speed else 0
+    return {
+        # Time beyond the replay's own pacing, i.e. how far ingestion fell behind
+        'burst_lag_seconds': metric(max(0.0, elapsed - replay_seconds), 's'),
+        'burst_messages_per_second': metric(report['messages'] / elapsed, 'msgs/s', HIGHER),
+        'burst_delivery_p50_seconds': metric(delivery.get('p50', 0), 's'),
+        'burst_delivery_p99_seconds': metric(delivery.get('p99', 0), 's'),
+        'burst_upload_batches': metric(report['upload']['batches_sent'], 'batches')
+    }
+
+
+def bench_startup(args):
+    from chat_replay import ReplayFetcher, StandInServer, SyntheticSource
+    from event_channel import LOG_ERROR
+
+    python_dir = sys.path[0]
+
+    def cold_import():
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'import chat_fetcher_robust'], cwd=python_dir, check=True)
+        return time.perf_counter() - start
+
+    server = StandInServer().start()
+    fetcher = ReplayFetcher(SyntheticSource(rate=100, duration=1), server.url, speed=0, verbosity=LOG_ERROR)
+    fetcher.run()
+    server.stop()
+
+    return {
+        'startup_import_seconds': metric(best_of(args.repeat * 2, cold_import), 's'),
+        'startup_first_participant_seconds': metric(fetcher.stats['first_participant_seconds'] or 0, 's')
+    }
+
+
+BENCHMARKS = {
+    'message_cost': bench_message_cost,
+    'batch_ingest': bench_batch_ingest,
+    'profiling': bench_profiling,
+    'dedup_index': bench_dedup_index,
+    'serialization': bench_serialization,
+    'burst': bench_burst,
+    'startup': bench_startup
+}
+
+
+def run_child(args):
+    """Run one benchmark and print its metrics as the last stdout line"""
+    results = BENCHMARKS[args.child](args)
+    rss = peak_rss_mb()
+    if rss is not None:
+        results[f"{args.child}_peak_rss_mb"] = metric(rss, 'MB')
+    print(json.dumps(results), flush=True)
+
+
+def run_suite(args, argv):
+    results = {}
+    for name in args.only:
+        print(f"running {name}...", file=sys.stderr, flush=True)
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *argv, '--child', name],
+            stdout=subprocess.PIPE, text=True
+        )
+        lines = child.stdout.strip().splitlines()
+        if child.returncode != 0 or not lines:
+            print(f"{name} failed (exit code {child.returncode})", file=sys.stderr, flush=True)
+            results[f"{name}_failed"] = metric(1, 'failed')
+            continue
+        results.update(json.loads(lines[-1]))
+    return results
+
+
+def median_results(runs):
+    """Per-metric median over whole-suite runs, what a baseline should store"""
+    results = {}
+    for name, result in runs[0].items():
+        values = [run[name]['value'] for run in runs if name in run]
+        results[name] = dict(result, value=round(statistics.median(values), 4))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the comparison, returns the names of regressed metrics"""
+    regressions = []
+    print(f"{'metric':<34} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, current in sorted(results.items()):
+        base = baseline.get(name)
+        if current['better'] == INFO:
+            print(f"{name:<34} {base['value'] if base else '-':>12} {current['value']:>12} {'info':>8}")
+            continue
+        if not base:
+            print(f"{name:<34} {'-':>12} {current['value']:>12} {'new':>8}")
+            continue
+        if base['value'] <= 0:
+            # No relative change from zero or below, such a baseline needs refreshing
+            print(f"{name:<34} {base['value']:>12} {current['value']:>12} {'n/a':>8}")
+            continue
+        change = (current['value'] - base['value']) / base['value']
+        worse = change > threshold if current['better'] == LOWER else change < -threshold
+        flag = '  REGRESSION' if worse else ''
+        print(f"{name:<34} {base['value']:>12} {current['value']:>12} {change:>+7.1%}{flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', default=','.join(BENCHMARKS), help="comma-separated benchmark names")
+    parser.add_argument('--quick', action='store_true', help="smaller sizes for a fast check")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--runs', type=int, default=1, help="run the suite N times, report each metric's median")
+    parser.add_argument('--output', help="write results JSON here (e.g. to store a new baseline)")
+    parser.add_argument('--baseline', help="compare against this results JSON")
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument('--child', choices=list(BENCHMARKS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    args.sizes = [10000, 100000] if args.quick else [10000, 100000, 1000000]
+    args.messages = 50000 if args.quick else 200000
+    args.authors = 20000 if args.quick else 50000
+    args.burst = 10000 if args.quick else 50000
+    args.speed = 30 if args.quick else 6  # 60 s of chat in 2 s / 10 s
+
+    if args.child:
+        run_child(args)
+        return
+
+    args.only = [name for name in args.only.split(',') if name]
+    unknown = [name for name in args.only if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    # Children get the same options minus the suite-level ones
+    argv = ['--repeat', str(args.repeat)] + (['--quick'] if args.quick else [])
+    results = median_results([run_suite(args, argv) for _ in range(max(1, args.runs))])
+
+    if args.output:
+        # Informational metrics are noise-level, a baseline only keeps what compare() gates
+        stored = {name: result for name, result in results.items() if result['better'] != INFO}
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed more than {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+    else:
+        for name, result in sorted(results.items()):
+            spread = f" (IQR {result['spread']})" if 'spread' in result else ''
+            print(f"{name:<34} {result['value']:>12} {result['unit']}{spread}")
+
+    if any(name.endswith('_failed') for name in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sliding-window "recently active" index for the chat fetchers
+Participants live in the time bucket of their last message. Whole buckets
+expire as the window slides, so nobody is ever found by a full scan.
+"""
+
+import threading
+import time
+
+
+class ActivityWindow:
+    def __init__(self, window_seconds=600, bucket_seconds=10):
+        self.lock = threading.Lock()
+        self.configure(window_seconds, bucket_seconds)
+
+    def configure(self, window_seconds, bucket_seconds=None):
+        """Reset the index for a new window size"""
+        with self.lock:
+            self.window_seconds = window_seconds
+            if bucket_seconds:
+                self.bucket_seconds = bucket_seconds
+            self.buckets = {}  # bucket number -> set of channel IDs
+            self.bucket_of = {}  # channel ID -> bucket number
+            self.oldest = None  # Lowest bucket number that may still hold members
+            self.added = set()
+            self.removed = set()
+            self.full = True  # Next delta has to carry the complete set
+
+    def __len__(self):
+        return len(self.bucket_of)
+
+    def __contains__(self, channel_id):
+        return channel_id in self.bucket_of
+
+    def touch(self, channel_id, timestamp):
+        """Record activity, moving the participant into the bucket of `timestamp`"""
+        bucket = int(timestamp // self.bucket_seconds)
+        with self.lock:
+            current = self.bucket_of.get(channel_id)
+            if current is not None and current >= bucket:
+                return
+            if current is None:
+                if bucket <= self.horizon(time.time()):
+                    return  # Already outside the window
+                self.removed.discard(channel_id)
+                self.added.add(channel_id)
+            else:
+                self.buckets[current].discard(channel_id)
+
+            self.buckets.setdefault(bucket, set()).add(channel_id)
+            self.bucket_of[channel_id] = bucket
+            if self.oldest is None or bucket < self.oldest:
+                self.oldest = bucket
+
+    def touch_many(self, channel_ids, timestamp):
+        """touch() for every ID of one chunk, all active at `timestamp`, under one lock"""
+        bucket = int(timestamp // self.bucket_seconds)
+        with self.lock:
+            if bucket <= self.horizon(time.time()):
+                return  # Already outside the window
+            bucket_of = self.bucket_of
+            members = self.buckets.setdefault(bucket, set())
+            for channel_id in channel_ids:
+                current = bucket_of.get(channel_id)
+                if current is not None and current >= bucket:
+                    continue
+                if current is None:
+                    self.removed.discard(channel_id)
+                    self.added.add(channel_id)
+                else:
+                    self.buckets[current].discard(channel_id)
+                members.add(channel_id)
+                bucket_of[channel_id] = bucket
+            if self.oldest is None or bucket < self.oldest:
+                self.oldest = bucket
+
+    def horizon(self, now):
+        """Highest bucket number that lies completely outside the window"""
+        return int((now - self.window_seconds) // self.bucket_seconds) - 1
+
+    def expire(self, now=None):
+        """Drop buckets that slid out of the window, returns how many participants left"""
+        horizon = self.horizon(now if now is not None else time.time())
+        expired = 0
+        with self.lock:
+            if self.oldest is None:
+                return 0
+            while self.oldest <= horizon:
+                for channel_id in self.buckets.pop(self.oldest, ()):
+                    del self.bucket_of[channel_id]
+                    self.added.discard(channel_id)
+                    self.removed.add(channel_id)
+                    expired += 1
+                self.oldest += 1
+            if not self.bucket_of:
+                self.oldest = None
+        return expired
+
+    def count(self, window=None, now=None):
+        """Eligible participants for a window up to window_seconds, O(window / bucket)"""
+        if window is None or window >= self.window_seconds:
+            return len(self.bucket_of)
+        first = int(((now if now is not None else time.time()) - window) // self.bucket_seconds)
+        with self.lock:
+            return sum(len(members) for bucket, members in self.buckets.items() if bucket >= first)
+
+    def members(self, window=None, now=None):
+        """Eligible channel IDs for a window up to window_seconds, O(k)"""
+        with self.lock:
+            if window is None or window >= self.window_seconds:
+                return list(self.bucket_of)
+            first = int(((now if now is not None else time.time()) - window) // self.bucket_seconds)
+            return [channel_id for bucket, members in self.buckets.items() if bucket >= first for channel_id in members]
+
+    def take_deltas(self):
+        """(added, removed, full) since the last call; full means added is the whole set"""
+        with self.lock:
+            if self.full:
+                delta = (list(self.bucket_of), [], True)
+            else:
+                delta = (list(self.added), list(self.removed), False)
+            self.added, self.removed, self.full = set(), set(), False
+        return delta
+
+    def mark_full(self):
+        """Delivery failed, send the complete set next time"""
+        with self.lock:
+            self.full = True
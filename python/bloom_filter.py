@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Scalable Bloom filter for "definitely new" checks on huge audiences
+A chain of fixed-size filters (Almeida et al.): when one fills up, the next
+is twice as large with a tighter error rate, so the total false-positive
+rate stays bounded however many keys arrive.
+"""
+
+import math
+from hashlib import blake2b
+
+LN2 = math.log(2)
+
+
+def key_hashes(key):
+    """Two 64-bit hashes of a string, combined into k positions by double hashing"""
+    digest = blake2b(key.encode('utf-8'), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+class BloomFilter:
+    """Fixed-capacity filter sized for `error_rate` at `capacity` keys"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(64, int(math.ceil(-capacity * math.log(error_rate) / (LN2 * LN2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * LN2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def contains(self, hashes):
+        h1, h2 = hashes
+        bits = self.bits
+        m = self.num_bits
+        for i in range(self.num_hashes):
+            position = (h1 + i * h2) % m
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add(self, hashes):
+        h1, h2 = hashes
+        bits = self.bits
+        m = self.num_bits
+        for i in range(self.num_hashes):
+            position = (h1 + i * h2) % m
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+
+class ScalableBloomFilter:
+    def __init__(self, initial_capacity=100000, error_rate=0.001, growth=2, tightening=0.5):
+        if not 0 < error_rate < 1:
+            raise ValueError(f"error_rate must be between 0 and 1, got {error_rate}")
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate  # Bound on the whole chain's false-positive rate
+        self.growth = growth
+        self.tightening = tightening
+        self.filters = []
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        hashes = key_hashes(key)
+        return any(f.contains(hashes) for f in self.filters)
+
+    def add(self, key):
+        """Add a key, returns False if it may have been added before"""
+        hashes = key_hashes(key)
+        for f in self.filters:
+            if f.contains(hashes):
+                return False
+        if not self.filters or self.filters[-1].count >= self.filters[-1].capacity:
+            self.grow()
+        self.filters[-1].add(hashes)
+        self.count += 1
+        return True
+
+    def grow(self):
+        # Error rates p0 * r^i sum to at most p0 / (1 - r), p0 is chosen so that equals error_rate
+        index = len(self.filters)
+        capacity = self.initial_capacity * self.growth ** index
+        rate = self.error_rate * (1 - self.tightening) * self.tightening ** index
+        self.filters.append(BloomFilter(capacity, rate))
+
+    @property
+    def nbytes(self):
+        return sum(len(f.bits) for f in self.filters)
+
+    def stats(self):
+        return {
+            'keys': self.count,
+            'filters': len(self.filters),
+            'bytes': self.nbytes,
+            'error_rate': self.error_rate
+        }
@@ -5,16 +5,67 @@ import requests
 import time
 import signal
 import threading
+import uuid
+
+from poll_scheduler import Backoff, PollScheduler
 
 def fetch_chat_participants(video_id, server_url="http://localhost:3001"):
     participants = {}
     error_count = 0
     max_errors = 5
 
-    # Handle signal interrupts better on Windows
+    # Delta uploads: only participants the server has not acknowledged yet.
+    # A batch keeps its seq and contents until acknowledged, so a failed post
+    # is resent as the same batch instead of leaving a gap the server resyncs on
+    upload = {'session': uuid.uuid4().hex, 'seq': 0, 'unacked': {}, 'inflight': None}
+
+    def send_update():
+        full = upload.get('resync', False)
+        if full:
+            seq, batch = upload['seq'] + 1, list(participants.values())
+        else:
+            if upload['inflight'] is None:
+                upload['inflight'] = (upload['seq'] + 1, list(upload['unacked'].values()))
+                upload['unacked'] = {}
+            seq, batch = upload['inflight']
+        try:
+            response = requests.post(
+                f"{server_url}/api/chat-participants",
+                json={
+                    "videoId": video_id,
+                    "session": upload['session'],
+                    "seq": seq,
+                    "full": full,
+                    "participants": batch
+                },
+                timeout=5  # Increased timeout
+            )
+            reply = response.json()
+            if reply.get('success') and reply.get('ackSeq', 0) >= seq:
+                upload['seq'] = seq
+                upload['inflight'] = None
+                upload['resync'] = False
+                if full:
+                    upload['unacked'] = {}  # All of them went out with the roster
+                elif upload['unacked']:
+                    send_update()  # Queued while this batch was being retried
+            elif reply.get('resync'):
+                upload['resync'] = True
+                if not full:
+                    send_update()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # Nothing advances, the same batch goes out again next time
+            print(f"Failed to send to server: {e}", flush=True)
+
+    # Handle signal interrupts better on Windows: stop polling, the loop then
+    # sends what the server has not acknowledged yet before exiting
+    stopping = threading.Event()
+
     def signal_handler(signum, frame):
+        if stopping.is_set():
+            sys.exit(1)
         print("Chat fetcher stopped by signal", flush=True)
-        sys.exit(0)
+        stopping.set()
 
     signal.signal(signal.SIGINT, signal_handler)
     if hasattr(signal, 'SIGTERM'):
@@ -25,20 +76,23 @@ def fetch_chat_participants(video_id, server_url="http://localhost:3001"):
         chat = pytchat.create(video_id=video_id, interruptable=False)
         print(f"Connected to chat: {video_id}", flush=True)
 
-        # Keep-alive mechanism
+        # Keep-alive mechanism: poll cadence and the no-activity timeout adapt to the chat rate
         last_activity = time.time()
-        timeout_seconds = 30  # Reconnect if no activity for 30 seconds
+        scheduler = PollScheduler()
+        backoff = Backoff()
 
-        while chat.is_alive():
+        while chat.is_alive() and not stopping.is_set():
             try:
                 # Get messages with timeout
                 messages = chat.get()
+                items = getattr(messages, 'items', None) or []
+                scheduler.observe(len(items), getattr(messages, 'interval', None))
+                error_count = 0  # Reset error count on successful message retrieval
 
-                if messages:
+                if items:
                     last_activity = time.time()
-                    error_count = 0  # Reset error count on successful message retrieval
 
-                    for c in messages.sync_items():
+                    for c in items:
                         # GET THE CHANNEL ID!
                         channel_id = c.author.channelId if hasattr(c.author, 'channelId') else None
                         author_name = c.author.name
@@ -57,25 +111,19 @@ def fetch_chat_participants(video_id, server_url="http://localhost:3001"):
                             print(f"New: {author_name} -> {channel_id}", flush=True)
 
                             # Send to server with better error handling
-                            try:
-                                requests.post(
-                                    f"{server_url}/api/chat-participants",
-                                    json={
-                                        "videoId": video_id,
-                                        "participants": list(participants.values())
-                                    },
-                                    timeout=5  # Increased timeout
-                                )
-                            except requests.exceptions.RequestException as e:
-                                print(f"Failed to send to server: {e}", flush=True)
+                            upload['unacked'][channel_id] = participants[channel_id]
+                            send_update()
 
                 # Check for timeout
+                timeout_seconds = scheduler.stale_after()
                 if time.time() - last_activity > timeout_seconds:
-                    print(f"No activity for {timeout_seconds} seconds, reconnecting...", flush=True)
+                    print(f"No activity for {timeout_seconds:.0f} seconds, reconnecting...", flush=True)
                     chat.terminate()
-                    time.sleep(2)
+                    if stopping.wait(backoff.next()):
+                        break
                     chat = pytchat.create(video_id=video_id, interruptable=False)
                     last_activity = time.time()
+                    backoff.reset()
                     print(f"Reconnected to chat: {video_id}", flush=True)
 
             except Exception as e:
@@ -89,18 +137,20 @@ def fetch_chat_participants(video_id, server_url="http://localhost:3001"):
                     except:
                         pass
 
-                    time.sleep(5)
+                    if stopping.wait(backoff.next()):
+                        break
 
                     try:
                         chat = pytchat.create(video_id=video_id, interruptable=False)
                         error_count = 0
+                        backoff.reset()
                         print(f"Successfully reconnected to chat: {video_id}", flush=True)
                     except Exception as reconnect_error:
                         print(f"Failed to reconnect: {reconnect_error}", flush=True)
                         break
 
-            # Small delay to prevent CPU overuse
-            time.sleep(0.5)
+            # Wait for the next poll: sooner when chat is busy, up to YouTube's hint when quiet
+            stopping.wait(scheduler.wait_time())
 
     except Exception as e:
         print(f"Fatal error: {e}", flush=True)
@@ -111,6 +161,10 @@ def fetch_chat_participants(video_id, server_url="http://localhost:3001"):
         except:
             pass
 
+        # Final flush of participants the server has not acknowledged
+        if upload['unacked'] or upload['inflight'] or upload.get('resync'):
+            send_update()
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python chat_fetcher.py <video_id>")
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+asyncio-based YouTube Chat Fetcher
+Fetching, health monitoring, heartbeats and uploads run as cooperative tasks
+on a single event loop. Several streams can be multiplexed in one process,
+each with its own connection, sharing one deduplicated participant index.
+"""
+
+import argparse
+import asyncio
+import signal
+import sys
+import threading
+import time
+import traceback
+
+from chat_fetcher_robust import (PROCESS_STARTED, RobustChatFetcher, add_channel_arguments, channel_options,
+                                 load_pytchat)
+from event_channel import LOG_ERROR, LOG_INFO
+from poll_scheduler import Backoff, PollScheduler
+
+
+class ChatStream:
+    """One live chat connection, owned by its own fetch task"""
+
+    def __init__(self, fetcher, video_id):
+        self.fetcher = fetcher
+        self.video_id = video_id
+        self.chat = None
+        self.task = None
+        self.last_message_time = time.time()
+        self.reconnect_event = asyncio.Event()
+        self.stop_event = asyncio.Event()
+        self.outage_started = None  # Monotonic time the connection was lost
+
+        # pytchat's listener follows YouTube's timeout hints itself; the
+        # scheduler's rate estimate sets this stream's staleness threshold
+        self.scheduler = PollScheduler()
+        self.backoff = Backoff(base=1.0, cap=60.0)
+
+        # Per-stream statistics
+        self.stats = {
+            'messages_processed': 0,
+            'participants_found': 0,
+            'errors': 0,
+            'reconnects': 0
+        }
+
+    def log(self, message, level=LOG_INFO):
+        self.fetcher.log(f"[{self.video_id}] {message}", level)
+
+    def set_state(self, state, **fields):
+        self.fetcher.set_state(state, videoId=self.video_id, **fields)
+
+    def start(self):
+        self.task = asyncio.ensure_future(self.run())
+
+    def stop(self):
+        self.stop_event.set()
+
+    @property
+    def stopping(self):
+        return self.stop_event.is_set() or self.fetcher.stop_event.is_set()
+
+    async def wait_or_stop(self, seconds):
+        """Sleep for up to `seconds`, returns True if this stream should stop"""
+        stop_wait = asyncio.ensure_future(self.stop_event.wait())
+        fetcher_stop_wait = asyncio.ensure_future(self.fetcher.stop_event.wait())
+        await asyncio.wait({stop_wait, fetcher_stop_wait}, timeout=seconds, return_when=asyncio.FIRST_COMPLETED)
+        stop_wait.cancel()
+        fetcher_stop_wait.cancel()
+        return self.stopping
+
+    async def connect(self):
+        """Open a new chat listener, with jittered exponential backoff"""
+        max_retries = 5
+
+        for attempt in range(max_retries):
+            if self.stopping:
+                return False
+            try:
+                self.log(f"Connecting to chat (attempt {attempt + 1}/{max_retries})...")
+                self.set_state('connecting', attempt=attempt + 1)
+
+                # Every listener closes its client when it ends, so each
+                # connection gets a fresh one; httpx comes with pytchat
+                pytchat = load_pytchat()
+                import httpx
+                self.chat = pytchat.LiveChatAsync(
+                    self.video_id,
+                    client=httpx.AsyncClient(http2=True),
+                    interruptable=False,
+                    seektime=0,
+                    force_replay=False
+                )
+
+                if self.chat.is_alive():
+                    self.log("[OK] Successfully connected to chat")
+                    self.fetcher.mark_connected()
+                    self.set_state('connected')
+                    self.backoff.reset()
+                    if self.outage_started is not None:
+                        self.fetcher.metrics['reconnect_seconds'].record(time.monotonic() - self.outage_started)
+                        self.outage_started = None
+                    self.last_message_time = time.time()
+                    return True
+
+            except Exception as e:
+                self.log(f"Connection attempt {attempt + 1} failed: {e}")
+
+            if attempt < max_retries - 1:
+                if await self.wait_or_stop(self.backoff.next()):
+                    return False
+
+        return False
+
+    def disconnect(self):
+        """Retire the current listener (fetch task only)"""
+        if self.chat:
+            if self.outage_started is None and not self.stopping:
+                self.outage_started = time.monotonic()
+            try:
+                self.chat.terminate()
+            except Exception:
+                pass
+            self.chat = None
+
+    def count_reconnect(self):
+        self.stats['reconnects'] += 1
+        self.fetcher.reconnect_count += 1
+        self.fetcher.stats['reconnects'] += 1
+
+    async def run(self):
+        """Read chat chunks as soon as the listener buffers them"""
+        stop_wait = asyncio.ensure_future(self.stop_event.wait())
+        fetcher_stop_wait = asyncio.ensure_future(self.fetcher.stop_event.wait())
+        error_count = 0
+        max_consecutive_errors = 10
+
+        try:
+            while not self.stopping:
+                if not self.chat or not self.chat.is_alive():
+                    self.disconnect()
+                    if not await self.connect():
+                        if await self.wait_or_stop(self.backoff.next()):
+                            break
+                        continue
+                    self.reconnect_event.clear()
+
+                # Wait for data, a reconnect request or shutdown - whichever comes first
+                reconnect_wait = asyncio.ensure_future(self.reconnect_event.wait())
+                get_started = time.monotonic()
+                get_task = asyncio.ensure_future(self.chat.get())
+                await asyncio.wait(
+                    {get_task, reconnect_wait, stop_wait, fetcher_stop_wait},
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                reconnect_wait.cancel()
+
+                if not get_task.done():
+                    get_task.cancel()
+                    if self.reconnect_event.is_set():
+                        self.set_state('reconnecting', reason='stale')
+                        self.disconnect()
+                        self.count_reconnect()
+                    continue
+
+                try:
+                    messages = get_task.result()
+                    self.fetcher.metrics['chat_get_seconds'].record(time.monotonic() - get_started)
+                    items = getattr(messages, 'items', None) or []
+                    error_count = 0
+
+                    # Empty polls too, or the rate (and stale threshold) never decays
+                    self.scheduler.observe(len(items), getattr(messages, 'interval', None))
+                    if items:
+                        self.last_message_time = time.time()
+                    new_participants = self.fetcher.process_batch(items, source=self.fetcher.source_tag(self.video_id))
+                    self.stats['messages_processed'] += len(items)
+                    if new_participants:
+                        self.stats['participants_found'] += new_participants
+                        self.fetcher.upload_event.set()
+
+                except Exception as e:
+                    error_count += 1
+                    self.stats['errors'] += 1
+                    self.fetcher.stats['errors'] += 1
+                    self.log(f"Error in fetch loop ({error_count}/{max_consecutive_errors}): {e}", LOG_ERROR)
+
+                    if error_count >= max_consecutive_errors:
+                        self.log("Too many consecutive errors, forcing reconnect...")
+                        self.set_state('reconnecting', reason='errors')
+                        self.disconnect()
+                        self.count_reconnect()
+                        error_count = 0
+                        if await self.wait_or_stop(self.backoff.next()):
+                            break
+        finally:
+            stop_wait.cancel()
+            fetcher_stop_wait.cancel()
+            self.disconnect()
+
+
+class AsyncChatFetcher(RobustChatFetcher):
+    def __init__(self, video_ids, server_url="http://localhost:3001", upload_options=None, journal_options=None,
+                 **channel_options):
+        if isinstance(video_ids, str):
+            video_ids = [video_ids]
+        # Participants from every stream are uploaded under the first (primary) video ID
+        super().__init__(video_ids[0], server_url, upload_options, journal_options, **channel_options)
+        self.initial_video_ids = list(dict.fromkeys(video_ids))
+        self.streams = {}
+        self.loop = None
+        self.stop_event = None
+        self.upload_event = None
+
+    def source_tag(self, video_id):
+        """Only tag participants with their stream when several are multiplexed"""
+        return video_id if len(self.streams) > 1 or video_id != self.video_id else None
+
+    def signal_handler(self, signum=None, frame=None):
+        """Ask every task to wind down, the run loop does the cleanup"""
+        super().signal_handler(signum, frame)
+
+    def request_stop(self, reason):
+        """Also wake the event loop, every task watches stop_event"""
+        super().request_stop(reason)
+        if self.loop and self.stop_event:
+            self.loop.call_soon_threadsafe(self.stop_event.set)
+
+    def install_signal_handlers(self):
+        """Route shutdown signals into the event loop"""
+        for signame in ('SIGINT', 'SIGTERM'):
+            signum = getattr(signal, signame, None)
+            if signum is None:
+                continue
+            try:
+                self.loop.add_signal_handler(signum, self.signal_handler)
+            except NotImplementedError:
+                # Windows event loops have no add_signal_handler
+                signal.signal(signum, self.signal_handler)
+
+    async def wait_or_stop(self, seconds):
+        """Sleep for up to `seconds`, returns True if shutdown was requested"""
+        try:
+            await asyncio.wait_for(self.stop_event.wait(), timeout=seconds)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def add_stream(self, video_id):
+        """Start reading another stream (event loop thread only)"""
+        if video_id in self.streams:
+            self.log(f"Stream already running: {video_id}")
+            return False
+        stream = ChatStream(self, video_id)
+        self.streams[video_id] = stream
+        stream.start()
+        self.log(f"Stream added: {video_id} ({len(self.streams)} active)")
+        return True
+
+    def remove_stream(self, video_id):
+        """Stop reading a stream, its participants stay in the index (event loop thread only)"""
+        stream = self.streams.pop(video_id, None)
+        if not stream:
+            self.log(f"Unknown stream: {video_id}", LOG_ERROR)
+            return False
+        stream.stop()
+        self.log(f"Stream removed: {video_id} ({len(self.streams)} active)")
+        return True
+
+    def handle_command(self, line):
+        """Apply one control command: 'add <id>', 'remove <id>', 'streams' or any of the base commands"""
+        parts = line.split()
+        if not parts:
+            return False
+        command, args = parts[0].lower(), parts[1:]
+
+        if command == 'add' and args:
+            ok = all([self.add_stream(video_id) for video_id in args])
+        elif command == 'remove' and args:
+            ok = all([self.remove_stream(video_id) for video_id in args])
+        elif command == 'streams':
+            self.log(f"Active streams: {', '.join(self.streams) or 'none'}")
+            self.emit('streams', videoIds=list(self.streams))
+            ok = True
+        elif command == 'stop':
+            self.request_stop('stop command')
+            ok = True
+        elif command == 'reload':
+            # Blocking HTTP, keep it off the event loop
+            self.loop.run_in_executor(None, self.reload_entry_rules)
+            ok = True
+        else:
+            ok = super().handle_command(line)
+            if command == 'resync':
+                self.upload_event.set()
+            return ok
+
+        self.emit('command', command=command, ok=ok)
+        return ok
+
+    def read_commands(self):
+        """Forward stdin lines to the event loop (daemon thread, never blocks shutdown)"""
+        for line in sys.stdin:
+            if self.stop_event.is_set():
+                break
+            self.loop.call_soon_threadsafe(self.handle_command, line)
+
+    def heartbeat_payload(self):
+        payload = super().heartbeat_payload()
+        payload.pop("poll", None)  # Polling is per stream here
+        payload["streams"] = {video_id: dict(stream.stats, poll=stream.scheduler.snapshot())
+                              for video_id, stream in self.streams.items()}
+        return payload
+
+    async def health_loop(self):
+        """Flag stale streams for their fetch tasks, never touches a connection itself"""
+        while not await self.wait_or_stop(5):
+            now = time.time()
+            for stream in list(self.streams.values()):
+                # Each stream's threshold follows its own chat rate
+                stale_after = stream.scheduler.stale_after()
+                if now - stream.last_message_time > stale_after and not stream.reconnect_event.is_set():
+                    stream.log(f"⚠ No messages for {stale_after:.0f}s, reconnecting...")
+                    stream.last_message_time = now
+                    stream.reconnect_event.set()
+
+    async def heartbeat_loop(self):
+        """Send a heartbeat every heartbeat_interval seconds"""
+        while not await self.wait_or_stop(self.heartbeat_interval):
+            await self.loop.run_in_executor(None, self.send_heartbeat)
+            self.last_heartbeat = time.time()
+
+    async def upload_loop(self):
+        """Flush new participants when they appear, batched by the uploader window"""
+        uploader = self.uploader
+        stop_wait = asyncio.ensure_future(self.stop_event.wait())
+
+        try:
+            while not self.stop_event.is_set():
+                upload_wait = asyncio.ensure_future(self.upload_event.wait())
+                await asyncio.wait({upload_wait, stop_wait}, return_when=asyncio.FIRST_COMPLETED)
+                upload_wait.cancel()
+                if self.stop_event.is_set():
+                    break
+
+                # Give the batch window a chance to fill unless it is already full
+                if uploader.queue_depth < uploader.flush_size:
+                    await self.wait_or_stop(uploader.flush_interval)
+                self.upload_event.clear()
+
+                uploader.drain()
+                # requests is blocking, so the HTTP round-trip runs in a worker thread;
+                # it retries through the shared backoff until shutdown starts
+                flush = self.loop.run_in_executor(None, uploader.flush)
+                await asyncio.wait({flush, stop_wait}, return_when=asyncio.FIRST_COMPLETED)
+                if self.stop_event.is_set():
+                    uploader.stopping.set()
+                if not await flush:
+                    await self.wait_or_stop(uploader.flush_interval)
+                    self.upload_event.set()  # Retry what is still unacknowledged
+        finally:
+            stop_wait.cancel()
+            # Final flush within the shutdown deadline, one attempt per batch;
+            # cleanup reports what is left
+            uploader.stopping.set()
+            uploader.drain()
+            deadline = (self.shutdown_started or time.monotonic()) + self.drain_timeout
+            try:
+                await asyncio.wait_for(self.loop.run_in_executor(None, uploader.flush, False), self.remaining(deadline))
+            except asyncio.TimeoutError:
+                self.log("Final upload did not finish before the drain deadline", LOG_ERROR)
+
+    async def run_async(self):
+        """Start all tasks and wait for them to finish"""
+        self.loop = asyncio.get_running_loop()
+        self.stop_event = asyncio.Event()
+        self.upload_event = asyncio.Event()
+        self.install_signal_handlers()
+
+        self.log(f"Starting Async Chat Fetcher for: {', '.join(self.initial_video_ids)}")
+        self.start_metrics_server()
+        self.set_state('starting', transport=self.transport, videoIds=self.initial_video_ids)
+        await self.loop.run_in_executor(None, self.client.negotiate)
+        self.restore_participants()
+        if self.uploader.resync_requested:
+            self.upload_event.set()
+
+        for video_id in self.initial_video_ids:
+            self.add_stream(video_id)
+
+        threading.Thread(target=self.read_commands, name='control-stdin', daemon=True).start()
+
+        tasks = [
+            asyncio.ensure_future(self.health_loop()),
+            asyncio.ensure_future(self.heartbeat_loop()),
+            asyncio.ensure_future(self.upload_loop())
+        ]
+
+        try:
+            await self.stop_event.wait()
+        finally:
+            if self.shutdown_started is None:
+                self.shutdown_started = time.monotonic()
+            self.running = False
+            self.stop_event.set()
+            stream_tasks = [stream.task for stream in self.streams.values() if stream.task]
+            await asyncio.gather(*stream_tasks, *tasks, return_exceptions=True)
+
+    def run(self):
+        """Main execution entry point"""
+        try:
+            asyncio.run(self.run_async())
+        finally:
+            self.cleanup()
+
+    def cleanup(self):
+        super().cleanup()
+        for video_id, stream in self.streams.items():
+            stats = stream.stats
+            print(f"  - [{video_id}] messages: {stats['messages_processed']}, participants: {stats['participants_found']}, "
+                  f"errors: {stats['errors']}, reconnects: {stats['reconnects']}", flush=True)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="asyncio-based YouTube Chat Fetcher")
+    parser.add_argument('video_ids', help="one or more comma-separated video IDs")
+    add_channel_arguments(parser)
+    args = parser.parse_args()
+
+    video_ids = [video_id for video_id in args.video_ids.split(',') if video_id]
+    fetcher = AsyncChatFetcher(video_ids, args.server_url, started_at=PROCESS_STARTED, **channel_options(args))
+
+    try:
+        fetcher.run()
+    except Exception as e:
+        print(f"Fatal error: {e}", flush=True)
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
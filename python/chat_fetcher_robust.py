@@ -5,30 +5,82 @@ Robust YouTube Chat Fetcher with multiple fallback mechanisms
 Designed for production use during live streams
 """
 
-import pytchat
-import sys
-import requests
 import time
+
+PROCESS_STARTED = time.monotonic()  # Before the imports below, for time-to-first-participant
+
+import argparse
+import sys
 import signal
 import threading
 import json
 import os
-from datetime import datetime
 import traceback
 import io
 
+from activity_window import ActivityWindow
+from chat_readers import READER_TOP, MessageMerger, ReaderPool, parse_readers
+from fetcher_metrics import FetcherMetrics, MetricsServer
+from likes_tracker import LikesTracker
+from request_budget import (PRIORITY_CHAT, PRIORITY_HEARTBEAT, PRIORITY_LIKES, PRIORITY_UPLOAD, SERVER, YOUTUBE,
+                            RequestBudget, parse_rates)
+from runtime_profiler import DEFAULT_PROFILE_DIR, SamplingProfiler, TimingHooks
+from event_channel import (EventChannel, StdioClient, LOG_DEBUG, LOG_ERROR, LOG_INFO,
+                           TRANSPORT_HTTP, TRANSPORT_STDIO, TRANSPORTS)
+from participant_journal import ParticipantJournal
+from entry_rules import EntryRules
+from participant_spill import SpillingParticipantStore
+from participant_store import ParticipantStore, message_flags
+from participant_uploader import ParticipantUploader
+from poll_scheduler import PollScheduler
+from server_client import ServerClient
+
 # Force UTF-8 encoding for Windows
 if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
     os.environ['PYTHONIOENCODING'] = 'utf-8'
 
+pytchat = None  # Imported on first connect, it dominates startup time
+
+
+def load_pytchat():
+    """Import pytchat once, at the first connect or while warming a standby"""
+    global pytchat
+    if pytchat is None:
+        import pytchat as module
+        pytchat = module
+    return pytchat
+
+
 class RobustChatFetcher:
-    def __init__(self, video_id, server_url="http://localhost:3001"):
+    def __init__(self, video_id, server_url="http://localhost:3001", upload_options=None, journal_options=None,
+                 events=None, transport=TRANSPORT_HTTP, verbosity=None, metrics_port=None, drain_timeout=10.0,
+                 client=None, started_at=None, readers=None, spill_options=None, lean=False,
+                 likes=False, budget_rates=None, profile_dir=None):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Unknown transport: {transport}")
+        if transport == TRANSPORT_STDIO and events is None:
+            raise ValueError("The stdio transport needs an event channel")
+
         self.video_id = video_id
         self.server_url = server_url
-        self.participants = {}
+        # Process start, or the attach command for a warm standby
+        self.started_at = started_at if started_at is not None else time.monotonic()
+
+        # Optional JSON-lines event channel; with it, per-participant log lines
+        # are off by default since participants arrive as batches anyway
+        self.events = events
+        self.transport = transport
+        self.verbosity = verbosity if verbosity is not None else (LOG_INFO if events else LOG_DEBUG)
+        # Streams with millions of chatters keep only hot records in RAM, the rest spill to disk
+        self.participants = SpillingParticipantStore(**spill_options) if spill_options else ParticipantStore()
         self.running = True
+        # Orderly shutdown: a signal or 'stop' only ends intake, cleanup then
+        # drains uploads and the journal within drain_timeout seconds
+        self.stop_requested = threading.Event()
+        self.shutdown_started = None
+        self.drain_timeout = drain_timeout
         self.chat = None
         self.reconnect_count = 0
         self.max_reconnects = 100  # Very high limit for production
@@ -36,140 +88,707 @@ class RobustChatFetcher:
         self.heartbeat_interval = 10  # Send heartbeat every 10 seconds
         self.last_heartbeat = time.time()
 
+        # Latency histograms and rates, in heartbeats and optionally on /metrics
+        self.metrics = FetcherMetrics()
+        self.metrics_port = metrics_port
+        self.metrics_server = None
+        self.outage_started = None  # Monotonic time the current chat connection was lost
+
+        # Make-before-break reconnects: a replacement connection is opened in the
+        # background and polled alongside the old one for handover_overlap
+        # seconds; the merger drops messages both of them delivered
+        self.replacement = None
+        self.handover_thread = None
+        self.retiring = None  # Old connection still polled during the overlap
+        self.retire_at = None
+        self.handover_overlap = 3.0
+        self.merger = MessageMerger(capacity=20000)
+        self.last_poll_success = None  # Monotonic time any connection last answered
+        self.gap_pending = False  # Record the ingestion gap at the new connection's first answer
+
+        # Poll cadence and staleness follow the chat rate
+        self.scheduler = PollScheduler()
+        # All outbound traffic takes a token per destination first, by priority;
+        # reconnects and retries share one jittered backoff per destination
+        self.budget = RequestBudget(rates=budget_rates, metrics=self.metrics)
+
+        # Optional parallel readers (e.g. ['live', 'top']) instead of the
+        # single connection, each on its own thread with its own connection
+        self.reader_kinds = readers
+        self.pool = None
+        # Lean mode parses only the fields we read from the raw continuation JSON
+        self.lean = lean
+
+        # One pooled keep-alive session for all traffic to the server, or the
+        # event channel itself when data should skip the HTTP round-trip; a
+        # standby passes in the one it already warmed up
+        self.client = client or make_client(server_url, events, transport)
+
+        # Participant uploads run on their own thread, batched by time/size
+        self.uploader = ParticipantUploader(
+            video_id,
+            self.client,
+            roster=self.participants.to_wire,
+            log=self.log,
+            metrics=self.metrics,
+            budget=self.budget,
+            **(upload_options or {})
+        )
+
+        # Optional like-count polling, results go out over the same client as
+        # participants. The tracker keeps its own session: it drops the
+        # connection on every early exit and would churn the server's pool
+        self.likes_tracker = None
+        if likes:
+            self.likes_tracker = LikesTracker(
+                video_id,
+                on_likes=self.send_likes,
+                log=self.log,
+                metrics=self.metrics,
+                budget=self.budget
+            )
+
+        # Who chatted recently, for giveaways limited to an activity window;
+        # the server can change the window in its eligibility replies
+        self.activity = ActivityWindow()
+
+        # Optional entry rules (keywords, exclusions), published by the server
+        self.entry_rules = None
+        self.entry_rules_version = 0
+
+        # Participants survive restarts through an on-disk journal
+        self.journal = ParticipantJournal(
+            video_id,
+            roster=self.participants.to_wire,
+            log=self.log,
+            **(journal_options or {})
+        )
+
+        # On-demand diagnostics for a lagging fetcher, both off until a signal
+        # or stdin command turns them on: a sampling profiler writing collapsed
+        # stacks, and timers installed on the hot-path methods only while enabled
+        self.profiler = SamplingProfiler(
+            profile_dir or DEFAULT_PROFILE_DIR,
+            name=video_id,
+            log=self.log,
+            on_written=lambda path, samples: self.emit('profile', path=path, samples=samples)
+        )
+        self.timings = TimingHooks()
+        self.timings.register('chat_get', self, 'read_chat')
+        self.timings.register('process_batch', self, 'process_batch')
+        self.timings.register('index_lookup', self.participants, 'missing')
+        self.timings.register('index_insert', self.participants, 'add')
+        self.timings.register('upload_seal', self.uploader, 'seal')
+        if hasattr(self.client, 'encode'):
+            self.timings.register('upload_encode', self.client, 'encode')
+
         # Statistics for monitoring
         self.stats = {
-            'start_time': datetime.now(),
+            'start_time': time.time(),  # Epoch seconds, keeps stats JSON-serializable
             'messages_processed': 0,
             'participants_found': 0,
+            'participants_restored': 0,
+            'messages_filtered': 0,
             'errors': 0,
-            'reconnects': 0
+            'reconnects': 0,
+            'duplicates_dropped': 0,  # Seen on both connections during a handover
+            'connect_seconds': None,  # Start to chat connected
+            'first_participant_seconds': None  # Start to first new participant
         }
 
         # Setup signal handlers
         signal.signal(signal.SIGINT, self.signal_handler)
         if hasattr(signal, 'SIGTERM'):
             signal.signal(signal.SIGTERM, self.signal_handler)
+        # SIGUSR1 toggles the profiler, SIGUSR2 the timing hooks (POSIX only)
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.profiler.toggle())
+            signal.signal(signal.SIGUSR2, lambda signum, frame: self.set_timings(not self.timings.enabled))
 
     def signal_handler(self, signum, frame):
-        """Handle shutdown signals gracefully"""
-        print(f"[{self.get_timestamp()}] Shutting down gracefully...", flush=True)
+        """Handle shutdown signals: the first one drains, a second one exits right away"""
+        if self.shutdown_started is not None:
+            self.log("Second shutdown signal, exiting without draining", LOG_ERROR)
+            sys.exit(1)
+        self.request_stop('signal')
+
+    def request_stop(self, reason):
+        """Stop taking in chat, the run loop finishes the current batch and cleans up"""
+        if self.shutdown_started is not None:
+            return
+        self.shutdown_started = time.monotonic()
+        self.log(f"Shutting down gracefully ({reason})...")
         self.running = False
-        self.cleanup()
-        sys.exit(0)
+        self.stop_requested.set()
+
+    def wait(self, seconds):
+        """Sleep that ends early on shutdown, returns True if stopping"""
+        return self.stop_requested.wait(max(0.0, seconds))
+
+    def remaining(self, deadline):
+        return max(0.0, deadline - time.monotonic())
 
     def get_timestamp(self):
         """Get current timestamp for logging"""
-        return datetime.now().strftime("%H:%M:%S")
+        return time.strftime("%H:%M:%S")
+
+    def log(self, message, level=LOG_INFO):
+        """Print a timestamped log line, errors also go out as events"""
+        if level <= self.verbosity:
+            print(f"[{self.get_timestamp()}] {message}", flush=True)
+        if level == LOG_ERROR and self.events:
+            self.events.emit('error', message=message)
+
+    def emit(self, event, **fields):
+        """Write a machine-readable event when the event channel is enabled"""
+        if self.events:
+            self.events.emit(event, **fields)
+
+    def set_state(self, state, **fields):
+        """Announce a lifecycle change (connecting, connected, reconnecting, stopped...)"""
+        fields.setdefault('videoId', self.video_id)
+        self.emit('state', state=state, **fields)
+
+    def heartbeat_payload(self):
+        """Build the body of an 'alive' heartbeat"""
+        return {
+            "videoId": self.video_id,
+            "status": "alive",
+            "stats": self.stats,
+            "uptime_seconds": round(time.time() - self.stats['start_time'], 1),
+            "metrics": self.metrics.snapshot(self.stats),
+            "participants_count": len(self.participants),
+            "poll": self.scheduler.snapshot() if self.pool is None else None,
+            "readers": self.pool.snapshot() if self.pool else None,
+            "spill": self.participants.memory_stats() if isinstance(self.participants, SpillingParticipantStore) else None,
+            "upload_queue_depth": self.uploader.queue_depth,
+            "upload_stats": self.uploader.stats,
+            "http_stats": self.client.stats,
+            "budget": self.budget.snapshot(),
+            "likes": self.likes_tracker.snapshot() if self.likes_tracker else None,
+            "timings": self.timings.snapshot() if self.timings.enabled else None
+        }
+
+    def prometheus_text(self):
+        """Current metrics for the /metrics endpoint"""
+        gauges = {
+            'chat_participants': len(self.participants),
+            'chat_upload_queue_depth': self.uploader.queue_depth,
+            'chat_upload_backlog': self.uploader.backlog,
+            'chat_uptime_seconds': round(time.time() - self.stats['start_time'], 1)
+        }
+        for key in ('connect_seconds', 'first_participant_seconds'):
+            if self.stats[key] is not None:
+                gauges[f"chat_{key}"] = self.stats[key]
+        return self.metrics.prometheus_text(dict(self.stats, **self.budget.totals()), gauges=gauges)
+
+    def start_metrics_server(self):
+        """Serve Prometheus metrics on localhost when a port was given"""
+        if not self.metrics_port:
+            return
+        try:
+            self.metrics_server = MetricsServer(self.prometheus_text, self.metrics_port)
+            port = self.metrics_server.start()
+            self.log(f"Metrics available at http://127.0.0.1:{port}/metrics")
+        except OSError as e:
+            self.metrics_server = None
+            self.log(f"Metrics endpoint disabled: {e}", LOG_ERROR)
+
+    def post_heartbeat(self, payload, timeout=None):
+        """Heartbeats are telemetry, they go out as 'stats' events when the channel is on"""
+        if self.events:
+            self.events.emit('stats', **payload)
+            return
+        try:
+            self.client.post('/api/chat-heartbeat', payload, timeout=timeout)
+        except Exception:
+            self.budget.failed(SERVER)  # Heartbeat is not critical, but the server is struggling
 
     def send_heartbeat(self):
         """Send heartbeat to server to indicate we're still alive"""
+        # Lowest priority: skipped rather than queued while the server is busy or backing off
+        if self.budget.acquire(SERVER, PRIORITY_HEARTBEAT, timeout=0):
+            self.post_heartbeat(self.heartbeat_payload())
+
+        self.send_weight_updates()
+        self.send_eligibility_updates()
+
+    def send_eligibility_updates(self):
+        """Expire the activity window and send who entered or left it"""
+        self.activity.expire()
+        if not self.budget.acquire(SERVER, PRIORITY_UPLOAD, timeout=1.0, cancel=self.stop_requested):
+            return  # Deltas keep until the next heartbeat
+        added, removed, full = self.activity.take_deltas()
         try:
-            requests.post(
-                f"{self.server_url}/api/chat-heartbeat",
-                json={
-                    "videoId": self.video_id,
-                    "status": "alive",
-                    "stats": self.stats,
-                    "participants_count": len(self.participants)
-                },
-                timeout=2
-            )
-        except:
-            pass  # Heartbeat is not critical
+            response = self.client.post('/api/chat-eligibility', {
+                "videoId": self.video_id,
+                "window": self.activity.window_seconds,
+                "full": full,
+                "added": added,
+                "removed": removed
+            })
+            reply = response.json() if response.status_code == 200 else {}
+        except Exception:
+            reply = {}
+
+        if not reply.get('success'):
+            self.activity.mark_full()
+            return
+
+        # Entry rules changed on the server (replies over stdio carry no version,
+        # rules arrive there as a command)
+        version = reply.get('entryRulesVersion')
+        if version is not None and version != self.entry_rules_version:
+            self.reload_entry_rules()
+
+        # The server decides the window
+        self.set_activity_window(reply.get('window'))
+
+    def set_activity_window(self, window):
+        """Resize the activity window, rebuilt from last-seen times when it changes"""
+        if window and window != self.activity.window_seconds:
+            self.log(f"Activity window changed to {window}s")
+            self.activity.configure(window)
+            for participant in list(self.participants.values()):
+                self.activity.touch(participant.id, participant.last_seen)
+
+    def reload_entry_rules(self):
+        """Fetch and compile the server's entry rules"""
+        try:
+            response = self.client.get('/api/chat-entry-rules')
+            data = response.json()
+        except Exception as e:
+            self.log(f"Failed to load entry rules: {e}", LOG_ERROR)
+            return False
+        return self.apply_entry_rules(data)
+
+    def apply_entry_rules(self, data):
+        """Compile {version, rules} and swap them in atomically"""
+        version = data.get('version', 0)
+        try:
+            self.entry_rules = EntryRules.from_dict(data.get('rules'), version)
+        except (TypeError, ValueError, AttributeError) as e:
+            self.log(f"Invalid entry rules, keeping the previous ones: {e}", LOG_ERROR)
+            return False
+        else:
+            rules = self.entry_rules
+            self.log(f"Entry rules v{version}: " + (
+                f"{len(rules.keywords)} keywords, {len(rules.blocked_channels)} blocked channels" if rules else "everyone enters"
+            ))
+        self.entry_rules_version = version
+        return True
+
+    def send_likes(self, likes):
+        """Likes tracker callback, returns True once the server has the count"""
+        if not self.budget.acquire(SERVER, PRIORITY_LIKES, timeout=1.0, cancel=self.stop_requested):
+            return False
+        try:
+            response = self.client.post('/api/chat-likes', {
+                "videoId": self.video_id,
+                "likes": likes,
+                "poll": self.likes_tracker.snapshot()
+            })
+            reply = response.json() if response.status_code == 200 else {}
+        except Exception:
+            return False
+        # The reply carries the next reward target (over stdio it arrives as a command)
+        if 'nextTarget' in reply:
+            self.likes_tracker.set_target(reply['nextTarget'])
+        return bool(reply.get('success'))
+
+    def send_weight_updates(self):
+        """Send draw weights that changed since the last update"""
+        weights = self.participants.take_weight_updates()
+        if not weights:
+            return
+        if not self.budget.acquire(SERVER, PRIORITY_UPLOAD, timeout=1.0, cancel=self.stop_requested):
+            self.participants.restore_weight_updates(weights)
+            return
+        try:
+            response = self.client.post('/api/chat-weights', {
+                "videoId": self.video_id,
+                "weights": weights
+            })
+            if response.status_code == 200:
+                return
+        except Exception:
+            pass
+        # Keep them for the next round
+        self.participants.restore_weight_updates(weights)
+
+    def handle_command(self, line):
+        """Apply one control command, returns True if it was understood
+
+        stop | resync | reload | rules <json> | window <seconds> | target <likes|none> | streams
+        | profile [start [seconds]|stop] | timings [on|off]
+        """
+        command, _, argument = line.strip().partition(' ')
+        command = command.lower()
+        argument = argument.strip()
+        ok = True
+
+        if command == 'stop':
+            self.request_stop('stop command')
+        elif command == 'resync':
+            # Server lost track: resend the roster and the eligible set
+            self.uploader.resync_requested = True
+            self.uploader.request_flush()
+            self.activity.mark_full()
+        elif command == 'reload':
+            ok = self.reload_entry_rules()
+        elif command == 'rules':
+            try:
+                ok = self.apply_entry_rules(json.loads(argument) if argument else {})
+            except ValueError as e:
+                self.log(f"Invalid rules command: {e}", LOG_ERROR)
+                ok = False
+        elif command == 'window':
+            try:
+                self.set_activity_window(int(argument))
+            except ValueError:
+                self.log(f"Invalid window: {argument}", LOG_ERROR)
+                ok = False
+        elif command == 'target':
+            try:
+                if self.likes_tracker:
+                    self.likes_tracker.set_target(None if argument in ('', 'none', 'null') else int(argument))
+            except ValueError:
+                self.log(f"Invalid target: {argument}", LOG_ERROR)
+                ok = False
+        elif command == 'profile':
+            action, _, seconds = argument.partition(' ')
+            try:
+                if not action:
+                    self.profiler.toggle()
+                elif action == 'start':
+                    ok = self.profiler.start(float(seconds) if seconds else None)
+                elif action == 'stop':
+                    ok = self.profiler.stop()
+                else:
+                    raise ValueError(action)
+            except ValueError:
+                self.log(f"Invalid profile command: {argument}", LOG_ERROR)
+                ok = False
+        elif command == 'timings':
+            if argument in ('', 'on', 'off'):
+                self.set_timings(argument == 'on' if argument else not self.timings.enabled)
+            else:
+                self.log(f"Invalid timings command: {argument}", LOG_ERROR)
+                ok = False
+        elif command == 'streams':
+            self.log(f"Active streams: {self.video_id}")
+        elif command in ('add', 'remove'):
+            self.log(f"'{command}' needs the multi-stream fetcher (chat_fetcher_async.py)", LOG_ERROR)
+            ok = False
+        elif command:
+            self.log(f"Unknown command: {line.strip()}", LOG_ERROR)
+            ok = False
+        else:
+            return False
+
+        self.emit('command', command=command, ok=ok)
+        return ok
+
+    def set_timings(self, enabled):
+        """Install or remove the hot-path timers, their summary is logged when they come off"""
+        if enabled:
+            self.timings.enable()
+            self.log("Timing hooks on")
+        elif self.timings.enabled:
+            self.timings.disable()
+            self.log(f"Timing hooks off: {json.dumps(self.timings.snapshot())}")
+
+    def read_commands(self):
+        """Apply stdin lines as commands (daemon thread, never blocks shutdown)"""
+        for line in sys.stdin:
+            if not self.running:
+                break
+            self.handle_command(line)
+
+    def restore_participants(self):
+        """Warm restart: rebuild the index from the journal and start journaling"""
+        restored = self.participants.load_wire(self.journal.load().values())
+        if restored:
+            self.stats['participants_restored'] = restored
+            self.log(f"Restored {restored} participants from journal in {self.journal.stats['restore_seconds']}s")
+            # Replay everything to the server as one bulk load
+            self.uploader.resync_requested = True
+
+        try:
+            self.journal.start()
+        except OSError as e:
+            self.log(f"Participant journal disabled: {e}")
 
     def connect_to_chat(self):
         """Establish connection to YouTube chat with retry logic"""
         max_retries = 5
-        retry_delay = 2
 
         for attempt in range(max_retries):
+            # Every attempt after a failure waits out the shared YouTube backoff
+            if not self.budget.acquire(YOUTUBE, PRIORITY_CHAT, cancel=self.stop_requested, retry=True):
+                return False
             try:
-                print(f"[{self.get_timestamp()}] Connecting to chat (attempt {attempt + 1}/{max_retries})...", flush=True)
+                self.log(f"Connecting to chat (attempt {attempt + 1}/{max_retries})...")
+                self.set_state('connecting', attempt=attempt + 1)
 
                 # Try to create chat connection
-                self.chat = pytchat.create(
-                    video_id=self.video_id,
-                    interruptable=False,  # More stable on Windows
-                    seektime=0,  # Start from live position
-                    force_replay=False  # We want live chat
-                )
+                self.chat = self.open_chat()
 
                 if self.chat and self.chat.is_alive():
-                    print(f"[{self.get_timestamp()}] [OK] Successfully connected to chat: {self.video_id}", flush=True)
+                    self.log(f"[OK] Successfully connected to chat: {self.video_id}")
+                    self.mark_connected()
+                    self.set_state('connected')
                     self.last_message_time = time.time()
+                    self.budget.succeeded(YOUTUBE)
                     return True
 
             except Exception as e:
-                print(f"[{self.get_timestamp()}] Connection attempt {attempt + 1} failed: {e}", flush=True)
+                self.log(f"Connection attempt {attempt + 1} failed: {e}")
 
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                    retry_delay *= 2  # Exponential backoff
+            self.budget.failed(YOUTUBE)
 
         return False
 
-    def process_message(self, message):
-        """Process a single chat message"""
-        try:
-            # Extract participant info
-            channel_id = getattr(message.author, 'channelId', None)
-            author_name = message.author.name
+    def chat_api(self):
+        """pytchat, or lean_chat with the same create() in lean mode"""
+        if self.lean:
+            import lean_chat
+            return lean_chat
+        return load_pytchat()
 
-            if not channel_id:
-                channel_id = f"no_id_{author_name}"
+    def open_chat(self):
+        """A new chat connection at the live position"""
+        return self.chat_api().create(
+            video_id=self.video_id,
+            interruptable=False,  # More stable on Windows
+            seektime=0,  # Start from live position
+            force_replay=False  # We want live chat
+        )
 
-            # Check if new participant
-            if channel_id not in self.participants:
-                self.participants[channel_id] = {
-                    'name': author_name,
-                    'id': channel_id,
-                    'url': getattr(message.author, 'channelUrl', ''),
-                    'first_seen': datetime.now().isoformat()
-                }
+    def start_handover(self, reason):
+        """Make-before-break: open a replacement in the background, the old connection keeps being read"""
+        if self.handover_thread and self.handover_thread.is_alive():
+            return
+        self.log(f"Opening a replacement chat connection ({reason})...")
+        self.set_state('reconnecting', reason=reason)
+        if self.outage_started is None:
+            self.outage_started = time.monotonic()
+        self.handover_thread = threading.Thread(target=self.open_replacement, name='chat-handover', daemon=True)
+        self.handover_thread.start()
 
-                print(f"[{self.get_timestamp()}] New participant: {author_name} -> {channel_id}", flush=True)
-                self.stats['participants_found'] += 1
+    def open_replacement(self):
+        """Handover thread: retry with backoff until a replacement is alive or we stop
 
-                # Send update to server
-                self.send_participants_update()
+        The first attempt skips the shared backoff: it was opened by the
+        primary's failures, which the replacement is there to cover.
+        """
+        attempt = 0
+        while self.budget.acquire(YOUTUBE, PRIORITY_CHAT, cancel=self.stop_requested, retry=attempt > 0):
+            attempt += 1
+            try:
+                chat = self.open_chat()
+                if chat and chat.is_alive():
+                    self.budget.succeeded(YOUTUBE)
+                    self.replacement = chat  # The main loop adopts it
+                    return
+            except Exception as e:
+                self.log(f"Replacement attempt {attempt} failed: {e}")
+            self.budget.failed(YOUTUBE)
 
-            self.stats['messages_processed'] += 1
-            self.last_message_time = time.time()
+    def adopt_replacement(self):
+        """Main loop only: make the replacement primary, keep reading the old one for the overlap"""
+        chat, self.replacement = self.replacement, None
+        self.retire()  # At most one connection overlaps
+        if self.chat is not None and self.chat.is_alive():
+            self.retiring = self.chat
+            self.retire_at = time.monotonic() + self.handover_overlap
+        self.chat = chat
+        self.gap_pending = True
+        self.last_message_time = time.time()
+        self.metrics['reconnect_seconds'].record(time.monotonic() - self.outage_started)
+        self.outage_started = None
+        self.reconnect_count += 1
+        self.stats['reconnects'] += 1
+        self.log(f"[OK] Switched to a new chat connection (#{self.reconnect_count})")
+        self.set_state('connected')
+
+    def retire(self):
+        """Close the connection kept for the overlap"""
+        if self.retiring is not None:
+            try:
+                self.retiring.terminate()
+            except:
+                pass
+            self.retiring = None
+            self.retire_at = None
+
+    def poll(self, chat, retry=False):
+        """One get() on a connection, returns its items (None when stopping first)"""
+        if not self.budget.acquire(YOUTUBE, PRIORITY_CHAT, cancel=self.stop_requested, retry=retry):
+            return None
+        started = time.monotonic()
+        messages = self.read_chat(chat)
+        now = time.monotonic()
+        self.metrics['chat_get_seconds'].record(now - started)
+        if chat is self.chat and self.gap_pending:
+            # How long no connection was delivering, ~0 when the old one stayed up
+            self.gap_pending = False
+            self.metrics['ingestion_gap_seconds'].record(max(0.0, started - (self.last_poll_success or started)))
+        self.last_poll_success = now
+        return messages
+
+    def read_chat(self, chat):
+        """chat.get() on its own, for the timing hooks"""
+        return chat.get()
+
+    def mark_connected(self):
+        """Record time-to-connect for the first connection"""
+        if self.stats['connect_seconds'] is None:
+            self.stats['connect_seconds'] = round(time.monotonic() - self.started_at, 3)
+
+    def mark_first_participant(self):
+        """Record time-to-first-participant, the cold start cost viewers notice"""
+        self.stats['first_participant_seconds'] = seconds = round(time.monotonic() - self.started_at, 3)
+        self.log(f"First participant after {seconds}s")
+        self.emit('first_participant', seconds=seconds, connectSeconds=self.stats['connect_seconds'])
+
+    def process_message(self, message, source=None):
+        """Process a single chat message, returns True for a new participant"""
+        return self.process_batch((message,), source) > 0
+
+    def process_batch(self, messages, source=None):
+        """Process one chunk from chat.get(), returns the number of new participants
+
+        Author keys are extracted in one pass, new authors found with one set
+        difference against the store, and the clock, stats, journal and
+        activity updates happen once per chunk (once per author for activity).
+        """
+        entries = []
+        for message in messages:
+            try:
+                author = message.author
+                author_name = author.name
+                channel_id = getattr(author, 'channelId', None) or f"no_id_{author_name}"
+                entries.append((channel_id, author_name, message_flags(message), message))
+            except Exception as e:
+                self.log(f"Error processing message: {e}", LOG_ERROR)
+                self.stats['errors'] += 1
+        if not entries:
+            return 0
+
+        now = time.time()
+        participants = self.participants
+        added = []  # (record, chat timestamp in epoch milliseconds)
+        try:
+            new_ids = participants.missing({entry[0] for entry in entries})
+            rules = self.entry_rules
+            active = {}  # channel ID -> [record, messages, flags] for this chunk
+            filtered = 0
+            for channel_id, author_name, flags, message in entries:
+                seen = active.get(channel_id)
+                if seen is None:
+                    if channel_id in new_ids:
+                        # Entry rules only decide who gets into the draw
+                        if rules is not None and not rules.allows(channel_id, flags, getattr(message, 'message', '')):
+                            filtered += 1
+                            continue
+                        record = participants.add(channel_id, author_name, first_seen=now, video_id=source)
+                        added.append((record, getattr(message, 'timestamp', None)))
+                    else:
+                        record = participants.get(channel_id)
+                    active[channel_id] = seen = [record, 0, 0]
+                seen[1] += 1
+                seen[2] |= flags
+
+            # Activity counters drive the weighted draw and the eligibility window
+            participants.record_activity_batch(active.values(), now)
+            self.activity.touch_many(active.keys(), now)
+
+            if added:
+                self.stats['participants_found'] += len(added)
+                if self.stats['first_participant_seconds'] is None:
+                    self.mark_first_participant()
+                if self.verbosity >= LOG_DEBUG:
+                    for record, _ in added:
+                        self.log(f"New participant: {record.name} -> {record.id}", LOG_DEBUG)
+
+                # Hand off to the journal and the background uploader, both
+                # serialize the records only when they write them out
+                self.journal.extend([record for record, _ in added])
+                for record, timestamp in added:
+                    self.uploader.submit(record, chat_time=timestamp / 1000 if timestamp else None)
+
+            self.stats['messages_processed'] += len(entries)
+            self.stats['messages_filtered'] += filtered
+            self.last_message_time = now
 
         except Exception as e:
-            print(f"[{self.get_timestamp()}] Error processing message: {e}", flush=True)
+            self.log(f"Error processing messages: {e}", LOG_ERROR)
             self.stats['errors'] += 1
 
-    def send_participants_update(self):
-        """Send participants update to server with retry"""
-        max_retries = 3
+        return len(added)
 
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(
-                    f"{self.server_url}/api/chat-participants",
-                    json={
-                        "videoId": self.video_id,
-                        "participants": list(self.participants.values())
-                    },
-                    timeout=5
-                )
-
-                if response.status_code == 200:
-                    return True
+    def open_reader_chat(self, kind):
+        """A connection for one parallel reader, with its own HTTP client and
+        processor since pytchat's defaults are shared between instances
 
-            except requests.exceptions.RequestException as e:
-                if attempt == max_retries - 1:
-                    print(f"[{self.get_timestamp()}] Failed to send update after {max_retries} attempts", flush=True)
+        pytchat's terminate() leaves the client open, so it rides along as
+        chat.http_client for ChatReader.disconnect() to close.
+        """
+        api = self.chat_api()
+        import httpx
+        client = httpx.Client(http2=True)
+        try:
+            chat = api.create(
+                video_id=self.video_id,
+                interruptable=False,
+                seektime=0,
+                force_replay=False,
+                processor=api.LeanProcessor() if self.lean else api.DefaultProcessor(),
+                client=client
+            )
+            chat.http_client = client
+            if kind == READER_TOP:
+                chat.continuation = self.top_chat_continuation(client)
+        except BaseException:
+            client.close()
+            raise
+        self.mark_connected()
+        return chat
 
-            time.sleep(0.5)
+    def top_chat_continuation(self, client):
+        """First continuation of the live "top chat" view
 
-        return False
+        pytchat 0.5.5 only passes topchat_only on to archive continuations, a
+        live stream always starts on the full chat; later continuations come
+        from YouTube and stay on whichever view the first one asked for.
+        """
+        from pytchat import util
+        from pytchat.paramgen import liveparam
+        video_id = util.extract_video_id(self.video_id)
+        return liveparam.getparam(video_id, channel_id=util.get_channelid(client, video_id),
+                                  past_sec=3, topchat_only=True)
+
+    def read_pool(self):
+        """Parallel readers mode: process merged chunks on this thread"""
+        self.pool.start()
+        while self.running:
+            self.process_chunk(self.pool.next_messages())
+
+        # Stop intake, then finish the chunks the readers already fetched
+        self.pool.stop(timeout=2.0)
+        while not self.pool.queue.empty():
+            self.process_chunk(self.pool.next_messages(timeout=0))
+
+    def process_chunk(self, chunk):
+        """Process one deduplicated chunk, crediting its reader with new authors"""
+        if chunk is None:
+            return
+        reader, messages = chunk
+        reader.stats['unique_authors'] += self.process_batch(messages)
 
     def monitor_health(self):
         """Monitor chat health and reconnect if needed"""
-        timeout_seconds = 45  # Reconnect if no messages for 45 seconds
-
         while self.running:
             try:
                 current_time = time.time()
@@ -179,147 +798,316 @@ class RobustChatFetcher:
                     self.send_heartbeat()
                     self.last_heartbeat = current_time
 
-                # Check if chat is stale
-                if current_time - self.last_message_time > timeout_seconds:
-                    print(f"[{self.get_timestamp()}] ⚠ No messages for {timeout_seconds}s, reconnecting...", flush=True)
-
-                    # Terminate old connection
-                    if self.chat:
-                        try:
-                            self.chat.terminate()
-                        except:
-                            pass
-
-                    # Reconnect
-                    if self.connect_to_chat():
-                        self.reconnect_count += 1
-                        self.stats['reconnects'] += 1
-                        print(f"[{self.get_timestamp()}] [OK] Reconnected successfully (#{self.reconnect_count})", flush=True)
-                    else:
-                        print(f"[{self.get_timestamp()}] [ERROR] Reconnection failed, will retry...", flush=True)
-                        time.sleep(5)
+                # Check if chat is stale, quiet streams get more slack than busy
+                # ones; parallel readers watch their own connections
+                timeout_seconds = self.scheduler.stale_after()
+                if self.pool is None and current_time - self.last_message_time > timeout_seconds:
+                    self.log(f"⚠ No messages for {timeout_seconds:.0f}s, reconnecting...")
+                    # The stale connection stays in use until its replacement is up
+                    self.start_handover('stale')
 
-                time.sleep(5)  # Check every 5 seconds
+                self.wait(5)  # Check every 5 seconds
 
             except Exception as e:
-                print(f"[{self.get_timestamp()}] Monitor error: {e}", flush=True)
-                time.sleep(5)
+                self.log(f"Monitor error: {e}", LOG_ERROR)
+                self.wait(5)
 
     def run(self):
         """Main execution loop"""
-        print(f"[{self.get_timestamp()}] Starting Robust Chat Fetcher for video: {self.video_id}", flush=True)
+        self.log(f"Starting Robust Chat Fetcher for video: {self.video_id}")
+        self.set_state('starting', transport=self.transport)
 
-        # Initial connection
-        if not self.connect_to_chat():
-            print(f"[{self.get_timestamp()}] [ERROR] Failed to establish initial connection", flush=True)
+        self.restore_participants()
+
+        # Control commands from the server, already during the first connect
+        threading.Thread(target=self.read_commands, name='control-stdin', daemon=True).start()
+
+        # Initial connection; parallel readers connect on their own threads
+        if self.reader_kinds:
+            self.pool = ReaderPool(self.reader_kinds, self.open_reader_chat, log=self.log, metrics=self.metrics,
+                                   budget=self.budget)
+            self.log(f"Reading with {len(self.reader_kinds)} parallel connections: {', '.join(self.reader_kinds)}")
+        elif not self.connect_to_chat():
+            self.log("[ERROR] Failed to establish initial connection", LOG_ERROR)
+            self.set_state('stopped', reason='connect_failed')
             return
 
+        # Find out which body encodings the server accepts
+        self.client.negotiate()
+
+        # Start background participant uploads
+        self.uploader.start()
+        if self.likes_tracker:
+            self.likes_tracker.start()
+        self.start_metrics_server()
+
         # Start health monitor in background
         monitor_thread = threading.Thread(target=self.monitor_health, daemon=True)
         monitor_thread.start()
 
+        if self.pool:
+            self.read_pool()
+            self.cleanup()
+            return
+
         # Main message processing loop
         error_count = 0
-        max_consecutive_errors = 10
+        max_consecutive_errors = 3  # Then a replacement is opened, the old connection is still read
 
         while self.running:
             try:
+                if self.replacement is not None:
+                    self.adopt_replacement()
+                elif self.retiring is not None and time.monotonic() >= self.retire_at:
+                    self.retire()
+
                 if not self.chat or not self.chat.is_alive():
-                    print(f"[{self.get_timestamp()}] Chat connection lost, attempting to reconnect...", flush=True)
-                    if not self.connect_to_chat():
-                        time.sleep(5)
+                    # Nothing left to read from, wait for the replacement
+                    if self.retiring is None:
+                        if not (self.handover_thread and self.handover_thread.is_alive()):
+                            self.log("Chat connection lost, attempting to reconnect...")
+                        self.start_handover('connection_lost')
+                        self.wait(0.25)
                         continue
+                    self.chat, self.retiring = self.retiring, None
 
-                # Get messages
-                messages = self.chat.get()
+                # During a handover the old connection is read too, first so the
+                # new one takes over without a gap; whichever delivers a message
+                # first wins
+                overlap = []
+                if self.retiring is not None:
+                    try:
+                        overlap = getattr(self.poll(self.retiring), 'items', None) or []
+                    except Exception:
+                        self.retire()
 
-                if messages:
-                    error_count = 0  # Reset error count on success
+                # Get messages, after errors as a retry that waits out the backoff
+                messages = self.poll(self.chat, retry=error_count > 0)
 
-                    # Process each message
-                    for message in messages.sync_items():
-                        self.process_message(message)
+                if error_count:
+                    self.budget.succeeded(YOUTUBE)
+                error_count = 0  # Reset error count on success
+                items = getattr(messages, 'items', None) or []
+                self.scheduler.observe(len(items), getattr(messages, 'interval', None))
+                if overlap:
+                    items = overlap + items
 
-                # Small delay to prevent CPU overuse
-                time.sleep(0.2)
+                # Process the whole chunk right away; sync_items() would spread it
+                # over the chat timestamps and sleep at least a second. A chunk
+                # already fetched is always finished, even during shutdown
+                self.process_batch(self.merger.fresh(items, self.stats, 'duplicates_dropped'))
+
+                # Wait for the next poll, sooner when chat is busy
+                self.wait(self.scheduler.wait_time())
 
             except KeyboardInterrupt:
-                print(f"[{self.get_timestamp()}] Interrupted by user", flush=True)
+                self.log("Interrupted by user")
                 break
 
             except Exception as e:
                 error_count += 1
                 self.stats['errors'] += 1
 
-                print(f"[{self.get_timestamp()}] Error in main loop ({error_count}/{max_consecutive_errors}): {e}", flush=True)
+                self.log(f"Error in main loop ({error_count}/{max_consecutive_errors}): {e}", LOG_ERROR)
 
                 if error_count >= max_consecutive_errors:
-                    print(f"[{self.get_timestamp()}] Too many consecutive errors, forcing reconnect...", flush=True)
+                    # Keep trying the failing connection until its replacement is up
+                    self.log("Too many consecutive errors, forcing reconnect...")
+                    self.start_handover('errors')
+                    error_count = 0
 
-                    # Force reconnection
-                    if self.chat:
-                        try:
-                            self.chat.terminate()
-                        except:
-                            pass
+                # A dead connection is replaced at the top of the loop right away,
+                # a live one is retried after the shared backoff
+                if self.chat is not None and self.chat.is_alive():
+                    self.budget.failed(YOUTUBE)
 
-                    time.sleep(5)
+        # Close everything but self.chat, cleanup takes care of that one
+        self.retire()
+        if self.replacement is not None:
+            self.retiring, self.replacement = self.replacement, None
+            self.retire()
+        self.cleanup()
 
-                    if self.connect_to_chat():
-                        error_count = 0
-                        self.reconnect_count += 1
-                        self.stats['reconnects'] += 1
-                    else:
-                        print(f"[{self.get_timestamp()}] [CRITICAL] Unable to reconnect", flush=True)
-                        time.sleep(10)
+    def drain_uploads(self, deadline):
+        """Deliver everything still queued before the deadline, returns how many are left"""
+        return self.uploader.stop(timeout=self.remaining(deadline))
 
-                time.sleep(1)
+    def cleanup(self):
+        """Drain and shut down: stop intake, flush uploads, checkpoint the journal, report"""
+        if self.shutdown_started is None:
+            self.shutdown_started = time.monotonic()
+        self.running = False
+        self.stop_requested.set()
+        deadline = self.shutdown_started + self.drain_timeout
+        self.log("Cleaning up...")
+        self.set_state('draining', backlog=self.uploader.backlog)
+        if self.likes_tracker:
+            self.likes_tracker.stop()
+        # A profile still running is written out, timings are logged
+        if self.profiler.stop():
+            self.profiler.thread.join(self.remaining(deadline))
+        self.set_timings(False)
 
-        self.cleanup()
+        # Stop intake first so nothing new arrives while draining
+        if self.chat:
+            try:
+                self.chat.terminate()
+            except:
+                pass
 
-    def cleanup(self):
-        """Clean up resources"""
-        print(f"[{self.get_timestamp()}] Cleaning up...", flush=True)
+        # Deliver the upload backlog, then checkpoint the journal so a restart
+        # loads one snapshot; whatever did not make it is still in there
+        unsent = self.drain_uploads(deadline)
+        try:
+            self.journal.stop(checkpoint=True)
+        except OSError as e:
+            self.log(f"Journal checkpoint failed: {e}", LOG_ERROR)
+        if unsent:
+            self.log(f"{unsent} participants not acknowledged within {self.drain_timeout}s, kept in the journal", LOG_ERROR)
 
         # Print final statistics
-        print(f"[{self.get_timestamp()}] Final Statistics:", flush=True)
+        self.log("Final Statistics:")
         print(f"  - Messages processed: {self.stats['messages_processed']}", flush=True)
         print(f"  - Participants found: {self.stats['participants_found']}", flush=True)
         print(f"  - Total errors: {self.stats['errors']}", flush=True)
         print(f"  - Reconnections: {self.stats['reconnects']}", flush=True)
+        print(f"  - Upload queue drops: {self.uploader.stats['dropped']}", flush=True)
+        delivery = self.metrics['delivery_seconds']
+        if delivery.count:
+            print(f"  - Chat-to-server latency: p50 {delivery.percentile(50):.2f}s, p99 {delivery.percentile(99):.2f}s", flush=True)
 
-        # Terminate chat connection
-        if self.chat:
-            try:
-                self.chat.terminate()
-            except:
-                pass
+        # Terminal batch: last weights and the final stats, skipped once the deadline has passed
+        drain_seconds = round(time.monotonic() - self.shutdown_started, 3)
+        if self.remaining(deadline) > 0:
+            self.send_weight_updates()
+            self.post_heartbeat({
+                "videoId": self.video_id,
+                "status": "terminated",
+                "stats": self.stats,
+                "participants_count": len(self.participants),
+                "shutdown": {'drain_seconds': drain_seconds, 'unsent': unsent},
+                "upload_stats": self.uploader.stats
+            }, timeout=max(0.5, self.remaining(deadline)))
+
+        shutdown_seconds = round(time.monotonic() - self.shutdown_started, 3)
+        self.log(f"Shutdown complete in {shutdown_seconds}s ({unsent} participants unsent)")
+        self.set_state('stopped', shutdown_seconds=shutdown_seconds, unsent=unsent)
+
+        self.client.close()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if isinstance(self.participants, SpillingParticipantStore):
+            self.participants.close()
+
+def make_client(server_url, events=None, transport=TRANSPORT_HTTP):
+    """ServerClient, or the event channel for the stdio transport"""
+    return StdioClient(events) if transport == TRANSPORT_STDIO else ServerClient(server_url)
+
+
+def standby(server_url, options):
+    """Warm standby: load pytchat, open the server connection, then wait for
+    'attach <video_id>' on stdin; returns the attached fetcher, or None on 'stop'/EOF
+
+    Commands that arrive before the attach (window, rules...) are applied to
+    the fetcher once it exists.
+    """
+    events = options.get('events')
+    started = time.monotonic()
+    load_pytchat()
+    if options.get('lean'):
+        import lean_chat  # Warm the lean parser too
+    client = make_client(server_url, events, options.get('transport', TRANSPORT_HTTP))
+    client.negotiate()  # Pool connection and body encodings ready before the first upload
+    warmup = round(time.monotonic() - PROCESS_STARTED, 3)
+    print(f"[{time.strftime('%H:%M:%S')}] Standby ready in {warmup}s, waiting for 'attach <video_id>'", flush=True)
+    if events:
+        events.emit('state', state='standby', warmupSeconds=warmup, loadSeconds=round(time.monotonic() - started, 3))
+
+    queued = []
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            return None
+        command, _, argument = line.strip().partition(' ')
+        if command == 'stop':
+            return None
+        if command == 'attach' and argument.strip():
+            break
+        if command:
+            queued.append(line)
+
+    fetcher = RobustChatFetcher(argument.strip(), server_url, client=client, started_at=time.monotonic(), **options)
+    for line in queued:
+        fetcher.handle_command(line)
+    return fetcher
+
+
+def add_channel_arguments(parser):
+    """CLI options for the event channel, shared with the async fetcher"""
+    parser.add_argument('server_url', nargs='?', default="http://localhost:3001")
+    parser.add_argument('--events', action='store_true',
+                        help="JSON-lines events on stdout, human-readable logs on stderr")
+    parser.add_argument('--transport', choices=TRANSPORTS, default=TRANSPORT_HTTP,
+                        help="'stdio' sends participants as events instead of HTTP (implies --events)")
+    parser.add_argument('--verbosity', type=int, choices=(LOG_ERROR, LOG_INFO, LOG_DEBUG),
+                        help="0 errors, 1 info, 2 every participant")
+    parser.add_argument('--metrics-port', type=int, default=int(os.environ.get('CHAT_METRICS_PORT', 0)) or None,
+                        help="serve Prometheus metrics on 127.0.0.1:PORT/metrics")
+    parser.add_argument('--drain-timeout', type=float, default=float(os.environ.get('CHAT_DRAIN_TIMEOUT', 10)),
+                        help="seconds to deliver queued participants on shutdown")
+
+
+def channel_options(args):
+    """Fetcher keyword arguments for the parsed CLI options"""
+    events = None
+    if args.events or args.transport == TRANSPORT_STDIO:
+        # stdout belongs to the events from here on, stray prints land on stderr
+        events = EventChannel(sys.stdout)
+        sys.stdout = sys.stderr
+    return {'events': events, 'transport': args.transport, 'verbosity': args.verbosity,
+            'metrics_port': args.metrics_port, 'drain_timeout': args.drain_timeout}
 
-        # Send final update to server
-        try:
-            requests.post(
-                f"{self.server_url}/api/chat-heartbeat",
-                json={
-                    "videoId": self.video_id,
-                    "status": "terminated",
-                    "stats": self.stats
-                },
-                timeout=2
-            )
-        except:
-            pass
 
 def main():
     """Main entry point"""
-    if len(sys.argv) < 2:
-        print("Usage: python chat_fetcher_robust.py <video_id> [server_url]")
-        sys.exit(1)
-
-    video_id = sys.argv[1]
-    server_url = sys.argv[2] if len(sys.argv) > 2 else "http://localhost:3001"
+    parser = argparse.ArgumentParser(description="Robust YouTube Chat Fetcher")
+    parser.add_argument('video_id', help="YouTube video ID, '-' with --standby")
+    add_channel_arguments(parser)
+    parser.add_argument('--standby', action='store_true',
+                        help="load everything, then wait for 'attach <video_id>' on stdin")
+    parser.add_argument('--readers', type=parse_readers, default=os.environ.get('CHAT_READERS') or None,
+                        help="parallel connections for very busy streams, e.g. 'live,top' or 'live,live'")
+    parser.add_argument('--spill', action='store_true', default=os.environ.get('CHAT_SPILL') == '1',
+                        help="bounded-memory participant store for huge audiences (SQLite spill file)")
+    parser.add_argument('--spill-memory-mb', type=int, default=int(os.environ.get('CHAT_SPILL_MEMORY_MB', 64)),
+                        help="RAM budget for cached participants with --spill")
+    parser.add_argument('--bloom-error-rate', type=float, default=float(os.environ.get('CHAT_BLOOM_ERROR_RATE', 0.001)),
+                        help="false-positive rate of the new-author check with --spill")
+    parser.add_argument('--likes', action='store_true', default=os.environ.get('CHAT_LIKES') == '1',
+                        help="poll the video's like count here and send it with the participants")
+    parser.add_argument('--lean', action='store_true', default=os.environ.get('CHAT_LEAN') == '1',
+                        help="parse only the fields we use from the raw chat JSON (faster on busy streams)")
+    parser.add_argument('--profile-dir', default=os.environ.get('CHAT_PROFILE_DIR') or None,
+                        help="where 'profile' / SIGUSR1 writes collapsed stacks (default ~/.youtube-live-awards/profiles)")
+    parser.add_argument('--request-budget', type=parse_rates, default=os.environ.get('CHAT_REQUEST_BUDGET') or None,
+                        help="requests/s[/burst] per destination, e.g. 'youtube=20,server=50/100'")
+    args = parser.parse_args()
 
     # Create and run fetcher
-    fetcher = RobustChatFetcher(video_id, server_url)
+    options = channel_options(args)
+    options['readers'] = args.readers
+    options['lean'] = args.lean
+    options['likes'] = args.likes
+    options['budget_rates'] = args.request_budget
+    options['profile_dir'] = args.profile_dir
+    if args.spill:
+        options['spill_options'] = {'memory_mb': args.spill_memory_mb, 'error_rate': args.bloom_error_rate}
+    if args.standby:
+        fetcher = standby(args.server_url, options)
+        if fetcher is None:
+            return
+    else:
+        fetcher = RobustChatFetcher(args.video_id, args.server_url, started_at=PROCESS_STARTED, **options)
 
     try:
         fetcher.run()
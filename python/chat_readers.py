@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parallel chat readers for very high-volume streams
+Several independent connections per stream (live chat, top chat, or staggered
+copies of either) poll on their own threads; one merger drops messages that
+more than one reader delivered before they reach the fetcher.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+from poll_scheduler import PollScheduler
+from request_budget import PRIORITY_CHAT, YOUTUBE, RequestBudget
+
+READER_LIVE = 'live'  # Every message
+READER_TOP = 'top'    # YouTube's filtered "top chat" continuation
+READER_KINDS = (READER_LIVE, READER_TOP)
+
+
+def parse_readers(spec):
+    """'live,top,live' -> ['live', 'top', 'live']"""
+    kinds = [kind.strip().lower() for kind in spec.split(',') if kind.strip()]
+    unknown = [kind for kind in kinds if kind not in READER_KINDS]
+    if unknown:
+        raise ValueError(f"Unknown reader kind(s): {', '.join(unknown)} (use {', '.join(READER_KINDS)})")
+    return kinds
+
+
+def message_key(message):
+    """Message ID, or the fields that identify a message when it has none"""
+    message_id = getattr(message, 'id', None)
+    if message_id:
+        return message_id
+    return (getattr(message.author, 'channelId', None), getattr(message, 'timestamp', None),
+            getattr(message, 'message', None))
+
+
+class MessageMerger:
+    """Remembers the last `capacity` message keys, consumer thread only
+
+    Shared by the parallel readers and by make-before-break reconnects in
+    RobustChatFetcher, where two connections overlap for a few seconds.
+    """
+
+    def __init__(self, capacity=100000):
+        self.capacity = capacity
+        self.seen = set()
+        self.order = deque()
+
+    def fresh(self, items, stats, counter='duplicates'):
+        """Messages from `items` not delivered before, drops are counted in stats[counter]"""
+        seen = self.seen
+        order = self.order
+        result = []
+        for message in items:
+            key = message_key(message)
+            if key in seen:
+                stats[counter] += 1
+                continue
+            seen.add(key)
+            order.append(key)
+            if len(order) > self.capacity:
+                seen.discard(order.popleft())
+            result.append(message)
+        return result
+
+
+class ChatReader:
+    """One chat connection polled on its own thread, chunks go to the pool queue"""
+
+    def __init__(self, name, kind, open_chat, output, log, delay=0.0, metrics=None, budget=None):
+        self.name = name
+        self.kind = kind
+        self.open_chat = open_chat  # Callable(kind) -> pytchat-like chat object
+        self.output = output
+        self.log = log
+        self.delay = delay  # Stagger against other readers of the same kind
+        self.metrics = metrics
+
+        self.chat = None
+        self.scheduler = PollScheduler()
+        # Reconnects and retries share the fetcher's YouTube backoff with every other reader
+        self.budget = budget or RequestBudget()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_message_time = time.time()
+        self.outage_started = None
+
+        self.stats = {
+            'kind': kind,
+            'messages': 0,
+            'duplicates': 0,  # Already delivered by another reader
+            'unique_authors': 0,  # New participants this reader found first
+            'errors': 0,
+            'reconnects': 0
+        }
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name=f"chat-reader-{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def join(self, timeout=None):
+        if self.thread:
+            self.thread.join(timeout)
+
+    def connect(self):
+        """Open a fresh connection, returns True on success"""
+        try:
+            self.chat = self.open_chat(self.kind)
+            if self.chat and self.chat.is_alive():
+                self.log(f"[{self.name}] Connected ({self.kind} chat)")
+                self.last_message_time = time.time()
+                self.budget.succeeded(YOUTUBE)
+                if self.outage_started is not None:
+                    if self.metrics:
+                        self.metrics['reconnect_seconds'].record(time.monotonic() - self.outage_started)
+                    self.outage_started = None
+                    self.stats['reconnects'] += 1
+                return True
+        except Exception as e:
+            self.log(f"[{self.name}] Connection failed: {e}")
+        self.close_chat()
+        return False
+
+    def close_chat(self):
+        """Terminate the connection and close its own HTTP client, if it has one"""
+        chat, self.chat = self.chat, None
+        if chat is None:
+            return
+        try:
+            chat.terminate()
+        except:
+            pass
+        client = getattr(chat, 'http_client', None)
+        if client is not None:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+    def disconnect(self):
+        self.close_chat()
+        if self.outage_started is None:
+            self.outage_started = time.monotonic()
+
+    def deliver(self, items):
+        """Hand a chunk to the merger, waits while the consumer is behind"""
+        while not self.stop_event.is_set():
+            try:
+                self.output.put((self, items), timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def run(self):
+        if self.stop_event.wait(self.delay):
+            return
+        errors = 0
+
+        while not self.stop_event.is_set():
+            if self.chat is None or not self.chat.is_alive():
+                if self.chat is not None:
+                    self.disconnect()
+                if not self.budget.acquire(YOUTUBE, PRIORITY_CHAT, cancel=self.stop_event, retry=True):
+                    break
+                if not self.connect():
+                    self.budget.failed(YOUTUBE)
+                    continue
+
+            if not self.budget.acquire(YOUTUBE, PRIORITY_CHAT, cancel=self.stop_event, retry=errors > 0):
+                break
+            try:
+                started = time.monotonic()
+                data = self.chat.get()
+                if self.metrics:
+                    self.metrics['chat_get_seconds'].record(time.monotonic() - started)
+                items = getattr(data, 'items', None) or []
+                self.scheduler.observe(len(items), getattr(data, 'interval', None))
+                if errors:
+                    self.budget.succeeded(YOUTUBE)
+                errors = 0
+
+                if items:
+                    self.last_message_time = time.time()
+                    self.stats['messages'] += len(items)
+                    self.deliver(items)
+                elif time.time() - self.last_message_time > self.scheduler.stale_after():
+                    self.log(f"[{self.name}] No messages for {self.scheduler.stale_after():.0f}s, reconnecting...")
+                    self.disconnect()
+                    continue
+
+                self.stop_event.wait(self.scheduler.wait_time())
+
+            except Exception as e:
+                errors += 1
+                self.stats['errors'] += 1
+                self.log(f"[{self.name}] Error ({errors}): {e}")
+                if errors >= 5:
+                    self.disconnect()
+                    errors = 0
+                self.budget.failed(YOUTUBE)  # The next poll or connect waits it out
+
+        self.disconnect()
+
+    def snapshot(self):
+        return dict(self.stats, poll=self.scheduler.snapshot(), connected=bool(self.chat))
+
+
+class ReaderPool:
+    """Several ChatReaders for one stream feeding one queue and merger"""
+
+    def __init__(self, kinds, open_chat, log=print, metrics=None, max_chunks=1000, stagger=2.0, dedup_capacity=100000,
+                 budget=None):
+        self.queue = queue.Queue(maxsize=max_chunks)
+        self.merger = MessageMerger(dedup_capacity)
+        self.readers = []
+
+        # Readers of the same kind start `stagger` seconds apart in total, so
+        # their polls interleave instead of hitting YouTube at the same moment
+        counts = {kind: kinds.count(kind) for kind in kinds}
+        seen = {}
+        for kind in kinds:
+            index = seen[kind] = seen.get(kind, -1) + 1
+            self.readers.append(ChatReader(
+                f"{kind}-{index}", kind, open_chat, self.queue, log,
+                delay=stagger * index / counts[kind], metrics=metrics, budget=budget
+            ))
+
+    def start(self):
+        for reader in self.readers:
+            reader.start()
+
+    def stop(self, timeout=5.0):
+        """Stop every reader, waits up to `timeout` seconds in total"""
+        for reader in self.readers:
+            reader.stop()
+        deadline = time.monotonic() + timeout
+        for reader in self.readers:
+            reader.join(max(0.0, deadline - time.monotonic()))
+
+    def next_messages(self, timeout=0.5):
+        """Deduplicated messages of the next chunk as (reader, messages), or None"""
+        try:
+            reader, items = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return reader, self.merger.fresh(items, reader.stats)
+
+    def snapshot(self):
+        return {reader.name: reader.snapshot() for reader in self.readers}
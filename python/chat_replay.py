@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline replay and load generation for the chat fetcher
+Feeds recorded or synthetic chat through RobustChatFetcher's normal
+process_message and upload path, optionally against a local stand-in server,
+so throughput and latency can be measured without YouTube or network access.
+
+Usage:
+  python chat_replay.py record <video_id> <out.jsonl> [--duration S] [--raw raw.jsonl]
+  python chat_replay.py replay <chat.jsonl> [server_url] [--speed N] [--stand-in]
+  python chat_replay.py synthetic [server_url] [--rate R] [--duration S] [--authors N]
+                        [--shape steady|burst|ramp] [--speed N] [--stand-in]
+"""
+
+import argparse
+import gzip
+import json
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from chat_fetcher_robust import RobustChatFetcher
+from event_channel import LOG_INFO
+
+SHAPES = ('steady', 'burst', 'ramp')
+WORDS = ('merhaba', 'selam', 'harika', 'yayın', 'çekiliş', 'gol', 'hadi', 'abi', 'süper', 'ne', 'zaman', 'bu')
+
+
+class ReplayAuthor:
+    __slots__ = ('channelId', 'name', 'channelUrl', 'isVerified', 'isChatOwner', 'isChatSponsor', 'isChatModerator')
+
+    def __init__(self, data):
+        self.channelId = data.get('channelId')
+        self.name = data.get('name', '')
+        self.channelUrl = data.get('channelUrl', '')
+        self.isVerified = data.get('isVerified', False)
+        self.isChatOwner = data.get('isChatOwner', False)
+        self.isChatSponsor = data.get('isChatSponsor', False)
+        self.isChatModerator = data.get('isChatModerator', False)
+
+
+class ReplayMessage:
+    """The subset of pytchat's Chat item the fetcher reads"""
+    __slots__ = ('id', 'type', 'message', 'timestamp', 'author')
+
+    def __init__(self, data, timestamp):
+        self.id = data.get('id')
+        self.type = data.get('type', 'textMessage')
+        self.message = data.get('message', '')
+        self.timestamp = timestamp  # Epoch milliseconds, rewritten to replay time
+        self.author = ReplayAuthor(data.get('author') or {})
+
+
+class RecordedSource:
+    """Messages from a JSONL capture (one pytchat Chat.json() per line)"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        """Yield (offset seconds from the first message, message dict)"""
+        first = None
+        opener = gzip.open if self.path.endswith('.gz') else open
+        with opener(self.path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    continue  # Torn line at the end of a capture
+                timestamp = data.get('timestamp') or 0
+                if first is None:
+                    first = timestamp
+                yield max(0.0, (timestamp - first) / 1000), data
+
+
+class SyntheticSource:
+    """Generated chat with a configurable rate, author cardinality and burst shape"""
+
+    def __init__(self, rate=100, duration=60, authors=10000, shape='steady', burst_factor=10,
+                 burst_seconds=5, burst_period=30, skew=0.0, keyword_ratio=0.0, seed=42):
+        if shape not in SHAPES:
+            raise ValueError(f"Unknown shape: {shape}")
+        self.rate = rate  # Messages per second at the base level
+        self.duration = duration
+        self.authors = authors
+        self.shape = shape
+        self.burst_factor = burst_factor
+        self.burst_seconds = burst_seconds
+        self.burst_period = burst_period
+        self.skew = skew  # 0 = every author equally chatty, higher = a few authors dominate
+        self.keyword_ratio = keyword_ratio  # Share of messages carrying '!katil'
+        self.seed = seed
+
+    def rate_at(self, t):
+        if self.shape == 'burst' and t % self.burst_period < self.burst_seconds:
+            return self.rate * self.burst_factor
+        if self.shape == 'ramp':
+            return self.rate * 2 * t / self.duration
+        return self.rate
+
+    def __iter__(self):
+        rng = random.Random(self.seed)
+        t = 0.0
+        n = 0
+        while t < self.duration:
+            if self.skew:
+                author_id = int(self.authors * rng.random() ** (1 + self.skew))
+            else:
+                author_id = rng.randrange(self.authors)
+            words = rng.choices(WORDS, k=rng.randint(1, 8))
+            if self.keyword_ratio and rng.random() < self.keyword_ratio:
+                words.append('!katil')
+            yield t, {
+                'type': 'superChat' if rng.random() < 0.002 else 'textMessage',
+                'id': f"synthetic-{n}",
+                'message': ' '.join(words),
+                'author': {
+                    'channelId': f"UC{author_id:022d}",
+                    'name': f"Viewer {author_id}",
+                    'isChatSponsor': author_id % 11 == 0,
+                    'isChatModerator': author_id % 997 == 0
+                }
+            }
+            n += 1
+            t += 1.0 / max(self.rate_at(t), 0.01)
+
+
+class ReplayChatData:
+    """Chunk returned by ReplayChat.get(), shaped like pytchat's Chatdata"""
+
+    def __init__(self, items):
+        self.items = items
+        self.interval = 0
+
+    def sync_items(self):
+        # Pacing already happened in ReplayChat.get()
+        return iter(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+class ReplayChat:
+    """pytchat stand-in that releases messages on the source's schedule"""
+
+    def __init__(self, source, speed=1.0, chunk_limit=5000, on_finished=None):
+        self.iterator = iter(source)
+        self.on_finished = on_finished  # Called once the source runs dry
+        self.speed = speed  # 2 = twice real time, 0 = as fast as possible
+        self.chunk_limit = chunk_limit
+        self.started = None
+        self.upcoming = None  # Next (offset, message) not yet due
+        self.finished = False
+        self.delivered = 0
+
+    def is_alive(self):
+        return not self.finished
+
+    def terminate(self):
+        pass  # Keeps its position, a reconnect resumes the replay
+
+    def get(self):
+        """Every message that is due by now, waits briefly for the next one if none are"""
+        now = time.time()
+        if self.started is None:
+            self.started = now
+
+        items = []
+        while len(items) < self.chunk_limit:
+            if self.upcoming is None:
+                self.upcoming = next(self.iterator, None)
+                if self.upcoming is None:
+                    self.finished = True
+                    if self.on_finished:
+                        self.on_finished()
+                    break
+            offset, data = self.upcoming
+            due = self.started + offset / self.speed if self.speed else now
+            if due > now:
+                if not items:
+                    # Nothing ready yet: sleep until the next message, like a poll interval
+                    time.sleep(min(due - now, 0.5))
+                    now = time.time()
+                    continue
+                break
+            items.append(ReplayMessage(data, int(now * 1000)))
+            self.upcoming = None
+
+        self.delivered += len(items)
+        return ReplayChatData(items)
+
+
+class ReplayFetcher(RobustChatFetcher):
+    """RobustChatFetcher reading from a ReplayChat instead of YouTube"""
+
+    def __init__(self, source, server_url, speed=1.0, **options):
+        options.setdefault('verbosity', LOG_INFO)
+        journal_dir = None
+        if 'journal_options' not in options:
+            # Keep replays out of the real journal, the directory goes when run() returns
+            journal_dir = tempfile.TemporaryDirectory(prefix='chat-replay-')
+            options['journal_options'] = {'journal_dir': journal_dir.name}
+        super().__init__('replay', server_url, **options)
+        self.journal_dir = journal_dir
+        self.replay = ReplayChat(source, speed, on_finished=self.replay_finished)
+        self.started = None
+        self.finished = None
+
+    def run(self):
+        try:
+            super().run()
+        finally:
+            if self.journal_dir is not None:
+                self.journal_dir.cleanup()
+
+    def connect_to_chat(self):
+        if self.replay.finished:
+            self.running = False
+            return False
+        self.chat = self.replay
+        self.mark_connected()
+        self.last_message_time = time.time()
+        if self.started is None:
+            self.started = time.monotonic()
+        return True
+
+    def open_chat(self):
+        # A handover resumes the same replay, it keeps its position
+        if self.replay.finished:
+            raise ConnectionError("Replay finished")
+        return self.replay
+
+    def replay_finished(self):
+        # The main loop processes the last chunk, then stops and cleans up
+        self.finished = time.monotonic()
+        self.running = False
+
+    def report(self, server=None):
+        """Throughput and latency of the finished replay"""
+        elapsed = (self.finished or time.monotonic()) - (self.started or time.monotonic())
+        delivery = self.metrics['delivery_seconds']
+        report = {
+            'messages': self.stats['messages_processed'],
+            'participants': self.stats['participants_found'],
+            'seconds': round(elapsed, 3),
+            'first_participant_seconds': self.stats['first_participant_seconds'],
+            'messages_per_second': round(self.stats['messages_processed'] / elapsed, 1) if elapsed else 0.0,
+            'delivery_seconds': delivery.summary(),
+            'chat_get_seconds': self.metrics['chat_get_seconds'].summary(),
+            'upload': dict(self.uploader.stats),
+            'errors': self.stats['errors']
+        }
+        if server is not None:
+            report['server'] = server.summary()
+        return report
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Minimal local stand-in for the awards server's fetcher endpoints"""
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), delay=0.0):
+        super().__init__(address, StandInHandler)
+        self.delay = delay  # Seconds added to every reply, to simulate a slow server
+        self.lock = threading.Lock()
+        self.participant_ids = set()
+        self.session = None
+        self.last_seq = 0
+        self.requests = {}
+        self.bytes_received = 0
+        self.resyncs_requested = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='stand-in-server', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def summary(self):
+        with self.lock:
+            return {
+                'participants': len(self.participant_ids),
+                'requests': dict(self.requests),
+                'bytes_received': self.bytes_received,
+                'resyncs_requested': self.resyncs_requested
+            }
+
+    def ingest(self, payload):
+        """Same delta rules as server.js /api/chat-participants"""
+        session, seq = payload.get('session'), payload.get('seq')
+        with self.lock:
+            if seq is None or payload.get('full'):
+                self.participant_ids.update(p['id'] for p in payload.get('participants', []))
+                if seq is not None:
+                    self.session, self.last_seq = session, seq
+            elif session != self.session and seq != 1:
+                self.resyncs_requested += 1
+                return {'success': True, 'ackSeq': 0, 'resync': True}
+            elif session != self.session or seq == self.last_seq + 1:
+                self.session = session
+                self.participant_ids.update(p['id'] for p in payload.get('participants', []))
+                self.last_seq = seq
+            elif seq > self.last_seq + 1:
+                self.resyncs_requested += 1
+                return {'success': True, 'ackSeq': self.last_seq, 'resync': True}
+            return {'success': True, 'ackSeq': self.last_seq, 'resync': False,
+                    'count': len(self.participant_ids)}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real server
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, payload):
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def count(self, body_size=0):
+        with self.server.lock:
+            self.server.requests[self.path] = self.server.requests.get(self.path, 0) + 1
+            self.server.bytes_received += body_size
+
+    def do_GET(self):
+        self.count()
+        if self.path == '/api/chat-capabilities':
+            self.reply({'encodings': ['json', 'gzip']})
+        elif self.path == '/api/chat-entry-rules':
+            self.reply({'version': 0, 'rules': None})
+        else:
+            self.reply({'success': False})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.count(len(body))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self.reply({'success': False, 'message': 'Unsupported body'})
+            return
+
+        if self.path == '/api/chat-participants':
+            self.reply(self.server.ingest(payload))
+        elif self.path == '/api/chat-eligibility':
+            self.reply({'success': True, 'window': None, 'entryRulesVersion': 0})
+        else:
+            self.reply({'success': True})
+
+
+def record(video_id, path, duration, raw_path=None):
+    """Capture a live chat to JSONL for later replays, with `raw_path` also
+    the raw continuation responses (fixtures for the lean parser check)"""
+    import pytchat
+
+    raw_log = None
+    if raw_path:
+        import lean_chat
+        raw_log = open(raw_path, 'a', encoding='utf-8')
+        chat = lean_chat.create(video_id, interruptable=False, processor=pytchat.DefaultProcessor(), raw_log=raw_log)
+    else:
+        chat = pytchat.create(video_id=video_id, interruptable=False)
+    deadline = time.time() + duration
+    count = 0
+    with open(path, 'a', encoding='utf-8') as f:
+        while chat.is_alive() and time.time() < deadline:
+            for message in chat.get().items:
+                f.write(message.json() + '\n')
+                count += 1
+            f.flush()
+            time.sleep(1)
+    chat.terminate()
+    if raw_log:
+        raw_log.close()
+    print(f"Recorded {count} messages to {path}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline chat replay and load generation")
+    modes = parser.add_subparsers(dest='mode', required=True)
+
+    recorder = modes.add_parser('record', help="capture a live chat to JSONL")
+    recorder.add_argument('video_id')
+    recorder.add_argument('path')
+    recorder.add_argument('--duration', type=float, default=600)
+    recorder.add_argument('--raw', help="also save the raw continuation JSON here, one response per line")
+
+    replay = modes.add_parser('replay', help="replay a JSONL capture")
+    replay.add_argument('path')
+
+    synthetic = modes.add_parser('synthetic', help="generate chat")
+    synthetic.add_argument('--rate', type=float, default=100, help="messages per second")
+    synthetic.add_argument('--duration', type=float, default=60)
+    synthetic.add_argument('--authors', type=int, default=10000)
+    synthetic.add_argument('--shape', choices=SHAPES, default='steady')
+    synthetic.add_argument('--burst-factor', type=float, default=10)
+    synthetic.add_argument('--skew', type=float, default=0.0)
+    synthetic.add_argument('--seed', type=int, default=42)
+
+    for sub in (replay, synthetic):
+        sub.add_argument('server_url', nargs='?', default="http://localhost:3001")
+        sub.add_argument('--speed', type=float, default=1.0, help="N x real time, 0 = as fast as possible")
+        sub.add_argument('--stand-in', action='store_true', help="run against a local stand-in server")
+        sub.add_argument('--server-delay', type=float, default=0.0, help="stand-in reply delay in seconds")
+
+    args = parser.parse_args()
+
+    if args.mode == 'record':
+        record(args.video_id, args.path, args.duration, args.raw)
+        return
+
+    if args.mode == 'replay':
+        source = RecordedSource(args.path)
+    else:
+        source = SyntheticSource(rate=args.rate, duration=args.duration, authors=args.authors, shape=args.shape,
+                                 burst_factor=args.burst_factor, skew=args.skew, seed=args.seed)
+
+    server = None
+    server_url = args.server_url
+    if args.stand_in:
+        server = StandInServer(delay=args.server_delay).start()
+        server_url = server.url
+
+    fetcher = ReplayFetcher(source, server_url, speed=args.speed)
+    fetcher.run()
+    print(json.dumps(fetcher.report(server), indent=2), flush=True)
+    if server:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
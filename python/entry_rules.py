@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Entry rules for the giveaway draw
+Keywords, commands and hashtags are compiled once into a single regex,
+exclusions are flag masks and hash-set lookups, so a message is checked in one pass
+"""
+
+import re
+
+from participant_store import FLAG_MODERATOR, FLAG_OWNER
+
+
+class EntryRules:
+    def __init__(self, keywords=(), exclude_moderators=False, exclude_owner=False,
+                 blocked_channels=(), case_sensitive=False, version=0):
+        self.keywords = [keyword.strip() for keyword in keywords if keyword and keyword.strip()]
+        self.blocked_channels = frozenset(blocked_channels)
+        self.excluded_flags = (FLAG_MODERATOR if exclude_moderators else 0) | (FLAG_OWNER if exclude_owner else 0)
+        self.version = version
+
+        self.pattern = None
+        if self.keywords:
+            # Longest first so overlapping phrases prefer the full match; a keyword
+            # must not be glued to other word characters ("!katil" != "!katilim")
+            alternatives = '|'.join(re.escape(keyword) for keyword in sorted(self.keywords, key=len, reverse=True))
+            flags = 0 if case_sensitive else re.IGNORECASE
+            self.pattern = re.compile(rf'(?<![\w#!])(?:{alternatives})(?!\w)', flags)
+
+    @classmethod
+    def from_dict(cls, data, version=0):
+        """Build rules from the server's JSON, None when nothing is configured"""
+        if not data:
+            return None
+        rules = cls(
+            keywords=data.get('keywords', []),
+            exclude_moderators=data.get('excludeModerators', False),
+            exclude_owner=data.get('excludeOwner', False),
+            blocked_channels=data.get('blockedChannels', []),
+            case_sensitive=data.get('caseSensitive', False),
+            version=version
+        )
+        return rules if rules.active else None
+
+    @property
+    def active(self):
+        return bool(self.pattern or self.blocked_channels or self.excluded_flags)
+
+    def allows(self, channel_id, flags, text):
+        """True if a message from this author enters them into the draw"""
+        if channel_id in self.blocked_channels:
+            return False
+        if flags & self.excluded_flags:
+            return False
+        if self.pattern is not None and not (text and self.pattern.search(text)):
+            return False
+        return True
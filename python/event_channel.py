@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Machine-readable control channel for the chat fetchers
+One JSON object per line on stdout (events), plain-text commands on stdin.
+Human-readable logs go to stderr so the two never mix.
+"""
+
+import json
+import sys
+import threading
+import time
+
+import requests
+
+# Log verbosity, compared against the level passed to RobustChatFetcher.log
+LOG_ERROR = 0
+LOG_INFO = 1
+LOG_DEBUG = 2  # Per-participant lines
+
+TRANSPORT_HTTP = 'http'    # Participants, weights and eligibility are POSTed to the server
+TRANSPORT_STDIO = 'stdio'  # ...or written as events on stdout, no HTTP round-trip
+TRANSPORTS = (TRANSPORT_HTTP, TRANSPORT_STDIO)
+
+
+class EventChannel:
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.lock = threading.Lock()  # Uploader, monitor and main threads all emit
+        self.stats = {
+            'events': 0,
+            'bytes': 0,
+            'errors': 0
+        }
+
+    def emit(self, event, **fields):
+        """Write one event line, never raises"""
+        record = {'event': event, 'ts': round(time.time(), 3)}
+        record.update(fields)
+        try:
+            line = json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str) + '\n'
+            with self.lock:
+                self.stream.write(line)
+                self.stream.flush()
+        except (OSError, ValueError, TypeError):
+            self.stats['errors'] += 1  # Closed pipe or unserializable field
+            return False
+        self.stats['events'] += 1
+        self.stats['bytes'] += len(line)
+        return True
+
+
+class StdioReply:
+    """Just enough of a requests.Response for the fetcher's reply handling"""
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+class StdioClient:
+    """ServerClient stand-in that turns POSTs into events on the channel
+
+    The pipe is reliable and ordered, so a batch counts as acknowledged once it
+    is written. If the server loses state it sends a 'resync' command instead.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.encodings = {'json'}
+        self.stats = channel.stats
+
+    def negotiate(self):
+        return self.encodings
+
+    @staticmethod
+    def event_name(path):
+        # '/api/chat-participants' -> 'participants'
+        name = path.rsplit('/', 1)[-1]
+        return name[len('chat-'):] if name.startswith('chat-') else name
+
+    def post(self, path, payload, timeout=None):
+        if not self.channel.emit(self.event_name(path), **payload):
+            # Same failure type as a dead HTTP connection, callers already handle it
+            raise requests.exceptions.ConnectionError(f"Event channel closed, {path} not delivered")
+        reply = {'success': True}
+        if 'seq' in payload:
+            reply['ackSeq'] = payload['seq']
+        return StdioReply(reply)
+
+    def get(self, path, timeout=None):
+        raise requests.exceptions.InvalidURL(f"{path} is not available over stdio, the server pushes it as a command")
+
+    def close(self):
+        pass
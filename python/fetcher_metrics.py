@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fixed-memory instrumentation for the chat fetchers
+HDR-style log-linear histograms, per-heartbeat rates and an optional
+Prometheus text endpoint on localhost
+"""
+
+import threading
+import time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SUB_BUCKET_BITS = 6  # 64 linear steps per power of two, under 1.6% relative error
+
+
+class Histogram:
+    """Log-linear bucketed histogram, like HdrHistogram with ~2 significant digits
+
+    Values are scaled to integers (e.g. seconds -> microseconds with scale=1e6)
+    and clamped to max_value, so memory is fixed no matter how much is recorded.
+    """
+
+    def __init__(self, scale=1, max_value=3600 * 10 ** 6):
+        self.scale = scale
+        self.max_value = max_value
+        self.sub_buckets = 1 << SUB_BUCKET_BITS
+        self.counts = array('q', bytes(8 * (self.index(max_value) + 1)))
+        self.lock = threading.Lock()
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def index(self, value):
+        """Bucket for an integer value: exact below 2*sub_buckets, then 64 steps per octave"""
+        if value < 2 * self.sub_buckets:
+            return value
+        shift = value.bit_length() - SUB_BUCKET_BITS - 1
+        return shift * self.sub_buckets + (value >> shift)
+
+    def upper_bound(self, index):
+        """Largest integer value that lands in a bucket"""
+        if index < 2 * self.sub_buckets:
+            return index
+        shift = index // self.sub_buckets - 1
+        return ((index - shift * self.sub_buckets + 1) << shift) - 1
+
+    def record(self, value):
+        """Add one observation in the caller's unit"""
+        scaled = min(max(int(value * self.scale), 0), self.max_value)
+        with self.lock:
+            self.counts[self.index(scaled)] += 1
+            self.count += 1
+            self.total += scaled
+            if self.min is None or scaled < self.min:
+                self.min = scaled
+            if self.max is None or scaled > self.max:
+                self.max = scaled
+
+    def percentile(self, q):
+        """Value at or below which q percent of observations fall, in the caller's unit"""
+        with self.lock:
+            if not self.count:
+                return 0.0
+            target = max(1, -(-self.count * q // 100))
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= target:
+                    return min(self.upper_bound(index), self.max) / self.scale
+        return self.max / self.scale
+
+    @property
+    def sum(self):
+        return self.total / self.scale
+
+    def summary(self):
+        """Compact JSON-safe view for heartbeats"""
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count / self.scale, 6),
+            'min': self.min / self.scale,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max / self.scale
+        }
+
+
+class FetcherMetrics:
+    # name -> (help text, scale); seconds are kept in microseconds
+    HISTOGRAMS = {
+        'chat_get_seconds': ("Duration of one chat.get() call", 10 ** 6),
+        'reconnect_seconds': ("Time from losing a chat connection to being connected again", 10 ** 6),
+        'ingestion_gap_seconds': ("Time no chat connection was delivering around a reconnect", 10 ** 6),
+        'delivery_seconds': ("Chat message timestamp to server acknowledgement of the new participant", 10 ** 6),
+        'upload_batch_size': ("Participants per acknowledged upload batch", 1),
+        'likes_poll_bytes': ("Watch page bytes read per like-count poll", 1),
+        'likes_poll_cpu_seconds': ("CPU time per like-count poll", 10 ** 6),
+        'budget_wait_seconds': ("Time a request queued for the request budget", 10 ** 6)
+    }
+
+    # stats key -> Prometheus counter name
+    COUNTERS = {
+        'messages_processed': 'chat_messages_total',
+        'participants_found': 'chat_participants_total',
+        'messages_filtered': 'chat_messages_filtered_total',
+        'errors': 'chat_errors_total',
+        'reconnects': 'chat_reconnects_total',
+        'budget_throttles': 'chat_budget_throttles_total',
+        'budget_failures': 'chat_budget_failures_total',
+        'budget_timeouts': 'chat_budget_timeouts_total'
+    }
+
+    def __init__(self):
+        self.histograms = {name: Histogram(scale=scale) for name, (_, scale) in self.HISTOGRAMS.items()}
+        self.last_rates = None  # (monotonic time, messages, participants) of the previous heartbeat
+
+    def __getitem__(self, name):
+        return self.histograms[name]
+
+    def rates(self, stats):
+        """Messages/s and new participants/s since the previous call, no hot-path cost"""
+        now = time.monotonic()
+        current = (now, stats['messages_processed'], stats['participants_found'])
+        previous, self.last_rates = self.last_rates, current
+        if previous is None or now <= previous[0]:
+            return {'messages_per_second': 0.0, 'participants_per_second': 0.0}
+        elapsed = now - previous[0]
+        return {
+            'messages_per_second': round((current[1] - previous[1]) / elapsed, 2),
+            'participants_per_second': round((current[2] - previous[2]) / elapsed, 2)
+        }
+
+    def snapshot(self, stats):
+        """Heartbeat payload section"""
+        snapshot = self.rates(stats)
+        snapshot.update({name: histogram.summary() for name, histogram in self.histograms.items()})
+        return snapshot
+
+    def prometheus_text(self, stats, gauges=None):
+        """Render counters, gauges and histogram summaries in the Prometheus text format"""
+        lines = []
+        for key, name in self.COUNTERS.items():
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {stats.get(key, 0)}")
+
+        for name, value in (gauges or {}).items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+
+        for name, histogram in self.histograms.items():
+            metric = name if name.startswith('chat_') else f"chat_{name}"
+            lines.append(f"# HELP {metric} {self.HISTOGRAMS[name][0]}")
+            lines.append(f"# TYPE {metric} summary")
+            for q in (0.5, 0.9, 0.99):
+                lines.append(f'{metric}{{quantile="{q}"}} {histogram.percentile(q * 100)}')
+            lines.append(f"{metric}_sum {histogram.sum}")
+            lines.append(f"{metric}_count {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """Serves GET /metrics on localhost from a daemon thread"""
+
+    def __init__(self, render, port, host='127.0.0.1'):
+        self.render = render  # Callable returning the Prometheus text
+        self.host = host
+        self.port = port
+        self.httpd = None
+
+    def start(self):
+        render = self.render
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes would drown the fetcher log
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, name='metrics-http', daemon=True).start()
+        return self.httpd.server_address[1]
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
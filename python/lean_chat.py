@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lean chat parsing for very busy streams
+pytchat's DefaultProcessor renders every item into a full Chat object (message
+runs, emoji lists, amounts, colours, datetime strings). The fetcher only reads
+channel ID, name, message ID, text, timestamp, type and badge flags, so this
+processor extracts just those from the raw continuation JSON, decoded with
+orjson when it is installed.
+
+Only imported in lean mode, it pulls in pytchat.
+"""
+
+import json
+import time
+
+import httpx
+from pytchat import exceptions, util
+from pytchat.core.pytchat import MAX_RETRY, PytchatCore
+
+try:
+    import orjson  # Optional, several times faster than the json module on chat responses
+    loads = orjson.loads
+except ImportError:
+    orjson = None
+    loads = json.loads
+
+# Renderer key -> pytchat message type
+ITEM_TYPES = {
+    'liveChatTextMessageRenderer': 'textMessage',
+    'liveChatPaidMessageRenderer': 'superChat',
+    'liveChatPaidStickerRenderer': 'superSticker',
+    'liveChatLegacyPaidMessageRenderer': 'newSponsor',
+    'liveChatMembershipItemRenderer': 'newSponsor',
+    'liveChatDonationAnnouncementRenderer': 'donation'
+}
+# Items that make their author a member whatever the badges say
+SPONSOR_ITEMS = ('liveChatLegacyPaidMessageRenderer', 'liveChatMembershipItemRenderer')
+
+
+class LeanAuthor:
+    __slots__ = ('channelId', 'name', 'isVerified', 'isChatOwner', 'isChatSponsor', 'isChatModerator')
+
+    def __init__(self, channel_id, name):
+        self.channelId = channel_id
+        self.name = name
+        self.isVerified = False
+        self.isChatOwner = False
+        self.isChatSponsor = False
+        self.isChatModerator = False
+
+
+class LeanChat:
+    """The subset of pytchat's Chat item the fetcher reads"""
+    __slots__ = ('id', 'type', 'message', 'timestamp', 'author')
+
+    def __init__(self, message_id, message_type, message, timestamp, author):
+        self.id = message_id
+        self.type = message_type
+        self.message = message
+        self.timestamp = timestamp  # Epoch milliseconds
+        self.author = author
+
+
+class LeanChatdata:
+    """What chat.get() returns: the items and YouTube's poll interval hint"""
+    __slots__ = ('items', 'interval')
+
+    def __init__(self, items, interval):
+        self.items = items
+        self.interval = interval
+
+
+def message_text(key, renderer):
+    """Chat.message as pytchat renders it, emoji become their first shortcut"""
+    if key == 'liveChatMembershipItemRenderer':
+        header = renderer.get('headerSubtext')
+        if header is None or 'runs' not in header:
+            return 'Welcome New Member!'
+        return ''.join(run.get('text', '') for run in header['runs'])
+    if key == 'liveChatLegacyPaidMessageRenderer':
+        return renderer['eventText']['runs'][0]['text'] + ' / ' + renderer['detailText']['simpleText']
+
+    parts = []
+    for run in (renderer.get('message') or {}).get('runs', ()):
+        emoji = run.get('emoji')
+        if emoji:
+            parts.append(emoji.get('shortcuts', [''])[0])
+        else:
+            parts.append(run.get('text', ''))
+    return ''.join(parts)
+
+
+def parse_item(item):
+    """One addChatItemAction item -> LeanChat, None for items pytchat would skip"""
+    key = next(iter(item))
+    renderer = item[key]
+    message_type = ITEM_TYPES.get(key)
+    if message_type is None:
+        return None
+
+    # pytchat drops items without a channel ID or name, so do we
+    channel_id = renderer.get('authorExternalChannelId')
+    name = (renderer.get('authorName') or {}).get('simpleText')
+    if not channel_id or name is None:
+        return None
+    author = LeanAuthor(channel_id, name)
+
+    for badge in renderer.get('authorBadges', ()):
+        badge = badge['liveChatAuthorBadgeRenderer']
+        icon = badge.get('icon')
+        if icon:
+            icon_type = icon['iconType']
+            if icon_type == 'VERIFIED':
+                author.isVerified = True
+            elif icon_type == 'OWNER':
+                author.isChatOwner = True
+            elif icon_type == 'MODERATOR':
+                author.isChatModerator = True
+        if badge.get('customThumbnail'):
+            author.isChatSponsor = True
+    if key in SPONSOR_ITEMS:
+        author.isChatSponsor = True
+
+    timestamp = int(renderer.get('timestampUsec', 0)) // 1000
+    return LeanChat(renderer.get('id'), message_type, message_text(key, renderer), timestamp, author)
+
+
+class LeanProcessor:
+    """Drop-in for pytchat's DefaultProcessor, stateless so connections may share one"""
+
+    def process(self, chat_components):
+        items = []
+        timeout = 0
+        for component in chat_components:
+            if component is None:
+                continue
+            timeout += component.get('timeout', 0)
+            for action in component.get('chatdata') or ():
+                if not action:
+                    continue
+                add = action.get('addChatItemAction')
+                if add is None:
+                    continue
+                item = add.get('item')
+                if not item:
+                    continue
+                try:
+                    chat = parse_item(item)
+                except (KeyError, TypeError, ValueError):
+                    continue  # Malformed item, pytchat logs and skips it too
+                if chat is not None:
+                    items.append(chat)
+        return LeanChatdata(items, float(timeout))
+
+    def finalize(self, *args, **kwargs):
+        pass
+
+
+class LeanPytchatCore(PytchatCore):
+    """PytchatCore decoding responses with the fastest available JSON decoder
+
+    Overrides pytchat 0.5.5's private _get_livechat_json (pinned in
+    requirements.txt); the retry logic is the same. With `raw_log`, every
+    raw response is also written there as one JSON line, for fixtures.
+    """
+
+    def __init__(self, video_id, raw_log=None, **kwargs):
+        self.raw_log = raw_log
+        super().__init__(video_id, **kwargs)
+
+    def _get_livechat_json(self, continuation, client, replay, offset_ms=0):
+        livechat_json = None
+        err = None
+        param = util.get_param(continuation, dat=self._dat, replay=replay, offsetms=max(0, offset_ms))
+        for _ in range(MAX_RETRY + 1):
+            try:
+                response = client.post(self._fetch_url, json=param)
+                livechat_json = loads(response.content)
+                break
+            except (ValueError, httpx.ConnectTimeout, httpx.ReadTimeout, httpx.ConnectError) as e:
+                err = e
+                time.sleep(2)
+                continue
+        else:
+            self._logger.error(f"[{self._video_id}]Exceeded retry count. Last error: {str(err)}")
+            self._raise_exception(exceptions.RetryExceedMaxCount())
+        if self.raw_log is not None and livechat_json is not None:
+            self.raw_log.write(response.content.decode('utf-8').replace('\n', ' ') + '\n')
+        return livechat_json
+
+
+def create(video_id, **kwargs):
+    """pytchat.create() for lean mode, LeanProcessor unless another processor is given"""
+    kwargs.setdefault('processor', LeanProcessor())
+    return LeanPytchatCore(util.extract_video_id(video_id), **kwargs)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Like-count polling for the chat fetchers
+Streams the watch page and stops reading at the first "likeCount" (usually
+well before the end of a 1 MB+ page), sends conditional requests when YouTube
+hands out validators, and polls faster the closer likes get to the next
+reward target.
+"""
+
+import re
+import threading
+import time
+
+import requests
+
+from request_budget import PRIORITY_LIKES, YOUTUBE, RequestBudget
+
+WATCH_URL = 'https://www.youtube.com/watch?v={video_id}'
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+LIKE_PATTERN = re.compile(rb'"likeCount":"(\d+)"')  # Same pattern server.js matched
+PATTERN_TAIL = 64  # Bytes kept between chunks so a match split across two is still found
+
+
+class LikesTracker:
+    def __init__(self, video_id, on_likes, log=print, metrics=None, url=None, budget=None,
+                 min_interval=2.0, max_interval=30.0, default_interval=5.0, polls_per_target=3,
+                 chunk_size=16384, timeout=10):
+        self.video_id = video_id
+        self.on_likes = on_likes  # Called with the new count when it changes, returns True once delivered
+        # Its own session, not the fetcher's: leaving a page early closes the
+        # connection, which would evict pooled server connections
+        self.session = requests.Session()
+        self.log = log
+        self.metrics = metrics  # Optional FetcherMetrics: bytes and CPU per poll
+        self.url = url or WATCH_URL.format(video_id=video_id)
+        self.budget = budget or RequestBudget()  # Polls queue behind chat and uploads, share the YouTube backoff
+
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval  # Until the like rate and a target are known
+        self.polls_per_target = polls_per_target  # Polls we aim for before the target is reached
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+
+        self.likes = None
+        self.likes_at = None  # Monotonic time of the last count
+        self.rate = None  # Likes per second, EWMA
+        self.target = None  # Next reward target, set by the server
+        self.undelivered = False  # Last change has not reached the server yet
+        self.etag = None
+        self.last_modified = None
+        self.failing = False
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        self.stats = {
+            'polls': 0,
+            'not_modified': 0,
+            'failures': 0,
+            'misses': 0,  # Page read to the end without a like count
+            'bytes_read': 0,  # Off the wire, before decompression
+            'cpu_seconds': 0.0,
+            'last_bytes': 0,
+            'last_cpu_ms': 0.0
+        }
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='likes-tracker', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def set_target(self, target):
+        """Next reward target from the server, None when there is none"""
+        self.target = int(target) if target else None
+
+    def poll(self):
+        """Fetch the like count once, returns it or None (unchanged page or not found)"""
+        headers = {'User-Agent': USER_AGENT, 'Accept-Language': 'en-US,en;q=0.9'}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+
+        cpu_started = time.thread_time()
+        likes = None
+        read = 0
+        try:
+            # Leaving early closes the connection instead of returning it to the
+            # pool; reading the rest of the page would cost far more than a new one
+            with self.session.get(self.url, headers=headers, stream=True, timeout=self.timeout) as response:
+                if response.status_code == 304:
+                    self.stats['not_modified'] += 1
+                    return self.likes
+                response.raise_for_status()
+                self.etag = response.headers.get('ETag')
+                self.last_modified = response.headers.get('Last-Modified')
+
+                tail = b''
+                for chunk in response.iter_content(self.chunk_size):
+                    buffer = tail + chunk
+                    match = LIKE_PATTERN.search(buffer)
+                    if match:
+                        likes = int(match.group(1))
+                        break
+                    tail = buffer[-PATTERN_TAIL:]
+                read = response.raw.tell()
+        finally:
+            self.stats['polls'] += 1
+            cpu = time.thread_time() - cpu_started
+            self.stats['bytes_read'] += read
+            self.stats['cpu_seconds'] += cpu
+            self.stats['last_bytes'] = read
+            self.stats['last_cpu_ms'] = round(cpu * 1000, 3)
+            if self.metrics:
+                self.metrics['likes_poll_bytes'].record(read)
+                self.metrics['likes_poll_cpu_seconds'].record(cpu)
+
+        if likes is None:
+            self.stats['misses'] += 1
+        return likes
+
+    def observe(self, likes, now=None):
+        """Record a count, returns True if it changed"""
+        now = now if now is not None else time.monotonic()
+        previous, previous_at = self.likes, self.likes_at
+        self.likes, self.likes_at = likes, now
+        if previous is None:
+            return True
+        if now > previous_at:
+            sample = max(0, likes - previous) / (now - previous_at)
+            self.rate = sample if self.rate is None else 0.7 * self.rate + 0.3 * sample
+        return likes != previous
+
+    def next_delay(self):
+        """Seconds until the next poll: a few polls in the expected time to the target"""
+        if self.target is None or self.likes is None or self.rate is None:
+            return self.default_interval
+        remaining = self.target - self.likes
+        if remaining <= 0:
+            return self.min_interval
+        if self.rate <= 0:
+            return self.max_interval
+        eta = remaining / self.rate
+        return min(max(eta / self.polls_per_target, self.min_interval), self.max_interval)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if not self.budget.acquire(YOUTUBE, PRIORITY_LIKES, cancel=self.stop_event):
+                break
+            try:
+                likes = self.poll()
+            except (requests.exceptions.RequestException, OSError) as e:
+                self.stats['failures'] += 1
+                self.log(f"Likes poll failed: {e}")
+                # The next acquire waits out the backoff, a 429 counts as throttling
+                self.budget.failed(YOUTUBE, getattr(e, 'response', None))
+                self.failing = True
+                continue
+
+            if self.failing:
+                self.failing = False
+                self.budget.succeeded(YOUTUBE)
+            if likes is not None and (self.observe(likes) or self.undelivered):
+                self.undelivered = not self.deliver(likes)
+            self.stop_event.wait(self.next_delay())
+
+    def deliver(self, likes):
+        try:
+            return bool(self.on_likes(likes))
+        except Exception as e:
+            self.log(f"Likes update failed: {e}")
+            return False
+
+    def snapshot(self):
+        polls = self.stats['polls'] or 1
+        return dict(
+            self.stats,
+            likes=self.likes,
+            target=self.target,
+            failing=self.failing,
+            rate=round(self.rate, 3) if self.rate is not None else None,
+            interval=round(self.next_delay(), 2),
+            cpu_seconds=round(self.stats['cpu_seconds'], 4),
+            avg_bytes=round(self.stats['bytes_read'] / polls),
+            avg_cpu_ms=round(self.stats['cpu_seconds'] * 1000 / polls, 3)
+        )
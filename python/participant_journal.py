@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Crash-safe participant journal for the chat fetchers
+Append-only JSON-lines journal per video ID plus a periodically compacted snapshot
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+DEFAULT_JOURNAL_DIR = os.environ.get(
+    'CHAT_JOURNAL_DIR',
+    os.path.join(os.path.expanduser('~'), '.youtube-live-awards', 'journal')
+)
+
+
+class ParticipantJournal:
+    def __init__(self, video_id, roster, journal_dir=None, log=print,
+                 write_interval=0.5, fsync_interval=2.0, compact_every=50000):
+        self.video_id = video_id
+        self.roster = roster  # Callable returning the full participant list (wire format)
+        self.log = log
+        self.journal_dir = journal_dir or DEFAULT_JOURNAL_DIR
+
+        self.write_interval = write_interval  # Seconds between batched writes
+        self.fsync_interval = fsync_interval  # Seconds between fsyncs (0 = every write)
+        self.compact_every = compact_every  # Journal entries before a snapshot is written
+
+        safe_id = re.sub(r'[^A-Za-z0-9_-]', '_', video_id)
+        self.snapshot_path = os.path.join(self.journal_dir, f"{safe_id}.snapshot.json")
+        self.journal_path = os.path.join(self.journal_dir, f"{safe_id}.journal")
+
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.file = None
+        self.entries = 0  # Lines in the journal since the last snapshot
+        self.last_fsync = time.monotonic()
+        self.running = False
+        self.thread = None
+
+        self.stats = {
+            'written': 0,
+            'fsyncs': 0,
+            'compactions': 0,
+            'restored': 0,
+            'restore_seconds': 0.0
+        }
+
+    def load(self):
+        """Rebuild the participant index from snapshot plus journal tail"""
+        start = time.perf_counter()
+        participants = {}
+
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                for participant in json.loads(f.read()):
+                    participants[participant['id']] = participant
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as e:
+            self.log(f"Ignoring unreadable journal snapshot {self.snapshot_path}: {e}")
+
+        try:
+            with open(self.journal_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b''
+
+        lines = data.splitlines()
+        self.entries = len(lines)
+        if lines:
+            try:
+                # Fast path: one decoder call for the whole tail
+                tail = json.loads(b'[' + b','.join(lines) + b']')
+            except ValueError:
+                # A crash can leave a torn last line, fall back to per-line parsing
+                tail = []
+                for line in lines:
+                    try:
+                        tail.append(json.loads(line))
+                    except ValueError:
+                        continue
+            for participant in tail:
+                if isinstance(participant, dict) and 'id' in participant:
+                    participants.setdefault(participant['id'], participant)
+
+        self.stats['restored'] = len(participants)
+        self.stats['restore_seconds'] = round(time.perf_counter() - start, 4)
+        return participants
+
+    def start(self):
+        """Open the journal and start the writer thread"""
+        if self.thread:
+            return
+        os.makedirs(self.journal_dir, exist_ok=True)
+        self.file = open(self.journal_path, 'ab')
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='participant-journal', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5.0, checkpoint=False):
+        """Write and fsync everything still buffered, then close the journal
+
+        With checkpoint=True the journal is also compacted into the snapshot, so
+        the next start loads one file instead of replaying the tail.
+        """
+        self.running = False
+        self.wake.set()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+        if self.file:
+            try:
+                self.write(force_fsync=True)
+                if checkpoint and self.entries:
+                    self.compact()
+            finally:
+                self.file.close()
+                self.file = None
+
+    def append(self, participant):
+        """Buffer a new participant record for the next batched write, never touches disk"""
+        with self.lock:
+            self.buffer.append(participant)
+
+    def extend(self, participants):
+        """Buffer several new participants under one lock"""
+        with self.lock:
+            self.buffer.extend(participants)
+
+    def run(self):
+        """Writer loop: batched writes every write_interval, fsync on its own cadence"""
+        while self.running:
+            self.wake.wait(self.write_interval)
+            self.wake.clear()
+            try:
+                self.write()
+                if self.entries >= self.compact_every:
+                    self.compact()
+            except OSError as e:
+                self.log(f"Journal write failed: {e}")
+
+    def write(self, force_fsync=False):
+        """Append buffered participants as JSON lines"""
+        with self.lock:
+            batch, self.buffer = self.buffer, []
+
+        if batch:
+            lines = ''.join(
+                json.dumps(p.to_wire(), ensure_ascii=False, separators=(',', ':')) + '\n' for p in batch
+            )
+            self.file.write(lines.encode('utf-8'))
+            self.file.flush()
+            self.entries += len(batch)
+            self.stats['written'] += len(batch)
+
+        now = time.monotonic()
+        if (batch or force_fsync) and (force_fsync or now - self.last_fsync >= self.fsync_interval):
+            os.fsync(self.file.fileno())
+            self.last_fsync = now
+            self.stats['fsyncs'] += 1
+
+    def compact(self):
+        """Write the full roster as a snapshot and truncate the journal (writer thread only)"""
+        # Everything already in the journal is also in the roster, entries still
+        # buffered are written after the truncate
+        participants = self.roster()
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.journal_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(json.dumps(participants, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        self.file.truncate(0)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.entries = 0
+        self.stats['compactions'] += 1
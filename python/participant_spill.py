@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bounded-memory participant store for streams with millions of chatters
+Recently active records stay in an LRU cache, everything else lives in a
+temporary SQLite file. A scalable Bloom filter answers "definitely new"
+for first-time authors without touching the disk.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from bloom_filter import ScalableBloomFilter
+from participant_store import Participant, ParticipantStore, activity_weight
+
+# Rough RAM per cached record (Participant, interned ID, name, LRU entry)
+CACHED_RECORD_BYTES = 400
+
+
+class SpillingParticipantStore(ParticipantStore):
+    """ParticipantStore whose records spill to disk beyond `memory_mb`
+
+    The spill file is a cache, not durable state: the journal still owns
+    crash safety, so SQLite runs without its own journal or fsyncs.
+    """
+
+    def __init__(self, weight_fn=activity_weight, memory_mb=64, error_rate=0.001,
+                 bloom_capacity=100000, flush_size=2000, spill_dir=None):
+        super().__init__(weight_fn)
+        # Half the budget for hot records, half for SQLite's page cache
+        self.cache_size = max(1000, memory_mb * 1024 * 1024 // 2 // CACHED_RECORD_BYTES)
+        self.flush_size = flush_size
+        self.cache = OrderedDict()  # channel ID -> record, least recently used first
+        self.pending = {}  # channel ID -> record not yet written to SQLite
+        self.count = 0
+        self.bloom = ScalableBloomFilter(bloom_capacity, error_rate)
+        self.lock = threading.Lock()  # SQLite, pending and the cache, the roster is read from other threads
+
+        fd, self.path = tempfile.mkstemp(prefix='chat-participants-', suffix='.sqlite', dir=spill_dir)
+        os.close(fd)
+        self.db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=OFF")
+        self.db.execute("PRAGMA synchronous=OFF")
+        self.db.execute(f"PRAGMA cache_size=-{max(1024, memory_mb * 1024 // 2)}")  # KiB
+        self.db.execute(
+            "CREATE TABLE participants (slot INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, name TEXT, "
+            "first_seen REAL, video_id TEXT, messages INTEGER, last_seen REAL, flags INTEGER)"
+        )
+
+        self.stats = {
+            'cache_hits': 0,
+            'bloom_negatives': 0,  # Lookups answered "new" without the disk
+            'disk_hits': 0,
+            'false_positives': 0,  # Bloom said "maybe", the disk said no
+            'flushes': 0,
+            'weight_updates_dropped': 0  # Undelivered weights beyond cache_size, see restore_weight_updates
+        }
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, channel_id):
+        return self.get(channel_id) is not None
+
+    def __getitem__(self, channel_id):
+        record = self.get(channel_id)
+        if record is None:
+            raise KeyError(channel_id)
+        return record
+
+    def __iter__(self):
+        return (record.id for record in self.values())
+
+    def get(self, channel_id, default=None):
+        with self.lock:
+            record = self.cache.get(channel_id)
+            if record is not None:
+                self.cache.move_to_end(channel_id)
+                self.stats['cache_hits'] += 1
+                return record
+
+        if channel_id not in self.bloom:
+            self.stats['bloom_negatives'] += 1
+            return default
+
+        with self.lock:
+            record = self.pending.get(channel_id)
+            if record is None:
+                row = self.db.execute(
+                    "SELECT slot, id, name, first_seen, video_id, messages, last_seen, flags "
+                    "FROM participants WHERE id = ?", (channel_id,)
+                ).fetchone()
+                if row is None:
+                    self.stats['false_positives'] += 1
+                    return default
+                record = self.from_row(row)
+                self.stats['disk_hits'] += 1
+        self.remember(record)
+        return record
+
+    def missing(self, channel_ids):
+        """The IDs in `channel_ids` not in the store, known ones end up in the cache"""
+        return {channel_id for channel_id in channel_ids if self.get(channel_id) is None}
+
+    def add(self, channel_id, name, first_seen=None, video_id=None):
+        """Insert a participant, returns the new record or None if already known"""
+        if self.get(channel_id) is not None:
+            return None
+        record = Participant(sys.intern(channel_id), name, first_seen if first_seen is not None else time.time(), video_id)
+        self.insert(record)
+        return record
+
+    def insert(self, record):
+        record.slot = self.count
+        self.bloom.add(record.id)
+        self.count += 1
+        with self.lock:
+            self.pending[record.id] = record
+        self.remember(record)
+
+    def remember(self, record):
+        """Put a record in the LRU cache, evicted records are written back"""
+        with self.lock:
+            self.cache[record.id] = record
+            if len(self.cache) > self.cache_size:
+                _, evicted = self.cache.popitem(last=False)
+                self.pending[evicted.id] = evicted  # Activity counters changed while cached
+            full = len(self.pending) >= self.flush_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write pending records to SQLite in one transaction"""
+        with self.lock:
+            if not self.pending:
+                return
+            rows = [(r.slot, r.id, r._name, r.first_seen, r.video_id, r.messages, r.last_seen, r.flags)
+                    for r in self.pending.values()]
+            self.pending = {}
+            self.db.execute("BEGIN")
+            self.db.executemany("INSERT OR REPLACE INTO participants VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.db.execute("COMMIT")
+            self.stats['flushes'] += 1
+
+    def from_row(self, row):
+        slot, channel_id, name, first_seen, video_id, messages, last_seen, flags = row
+        record = Participant(sys.intern(channel_id), '', first_seen, video_id)
+        record._name = name
+        record.slot = slot
+        record.messages = messages
+        record.last_seen = last_seen
+        record.flags = flags
+        record.weight = self.weight_fn(record)  # Reported before it spilled, not a change
+        return record
+
+    def rows(self, batch=10000):
+        """Every record, cached ones as they are and the rest read from disk in batches"""
+        self.flush()
+        cache = self.cache
+        last_slot = -1
+        while True:
+            with self.lock:
+                rows = self.db.execute(
+                    "SELECT slot, id, name, first_seen, video_id, messages, last_seen, flags "
+                    "FROM participants WHERE slot > ? ORDER BY slot LIMIT ?", (last_slot, batch)
+                ).fetchall()
+                cached = [cache.get(row[1]) for row in rows]  # The fetcher thread moves and evicts entries
+            if not rows:
+                return
+            for row, record in zip(rows, cached):
+                yield record or self.from_row(row)
+            last_slot = rows[-1][0]
+
+    def values(self):
+        return self.rows()
+
+    def restore_weight_updates(self, changed):
+        """Put back undelivered updates, at most cache_size of them
+
+        While the server refuses updates they would otherwise pile up for every
+        participant ever active; the oldest go first. A dropped participant's
+        weight reaches the server again with its next change.
+        """
+        with self.weight_lock:
+            queued = len(self.changed_weights)  # Newer updates, made since the failed delivery
+        super().restore_weight_updates(changed)
+        with self.weight_lock:
+            excess = len(self.changed_weights) - self.cache_size
+            if excess > 0:
+                # Restored entries come after those, oldest first
+                dropped = list(self.changed_weights)[queued:queued + excess]
+                for channel_id in dropped:
+                    del self.changed_weights[channel_id]
+                self.stats['weight_updates_dropped'] += len(dropped)
+
+    def load_wire(self, participants):
+        """Merge wire-format dicts, returns how many were new"""
+        added = 0
+        for wire in participants:
+            if wire.get('id') and self.get(wire['id']) is None:
+                record = Participant.from_wire(wire)
+                self.insert(record)
+                record.messages = 1
+                self.refresh_weight(record)
+                added += 1
+        return added
+
+    def to_wire(self):
+        """Full roster in the wire format, safe to call from other threads"""
+        return [record.to_wire() for record in self.rows()]
+
+    def memory_stats(self):
+        return dict(self.stats, cached=len(self.cache), cache_size=self.cache_size,
+                    bloom=self.bloom.stats(), spill_bytes=os.path.getsize(self.path))
+
+    def close(self):
+        """Drop the spill file"""
+        with self.lock:
+            self.db.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
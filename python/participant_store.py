@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compact participant store for the chat fetchers
+Slot-based records with interned channel IDs and epoch timestamps,
+converted to the wire format only when they are sent or journaled.
+Per-participant activity sets the weights the server draws winners by.
+"""
+
+import sys
+import threading
+import time
+
+CHANNEL_URL_PREFIX = 'http://www.youtube.com/channel/'
+NO_ID_PREFIX = 'no_id_'
+
+# Participant flags, collected from every message an author sends
+FLAG_SUPERCHAT = 1
+FLAG_MEMBER = 2
+FLAG_MODERATOR = 4
+FLAG_OWNER = 8
+
+PAID_MESSAGE_TYPES = ('superChat', 'superSticker')
+
+
+def message_flags(message):
+    """Flags carried by one pytchat message"""
+    author = message.author
+    flags = 0
+    if getattr(message, 'type', None) in PAID_MESSAGE_TYPES:
+        flags |= FLAG_SUPERCHAT
+    if getattr(author, 'isChatSponsor', False):
+        flags |= FLAG_MEMBER
+    if getattr(author, 'isChatModerator', False):
+        flags |= FLAG_MODERATOR
+    if getattr(author, 'isChatOwner', False):
+        flags |= FLAG_OWNER
+    return flags
+
+
+def activity_weight(record):
+    """Default draw weight: messages sent (capped), boosted for superchats and members"""
+    weight = float(min(record.messages, 50))
+    if record.flags & FLAG_SUPERCHAT:
+        weight *= 2
+    if record.flags & FLAG_MEMBER:
+        weight *= 1.5
+    return weight
+
+
+class Participant:
+    """One chat participant, without the per-record dict and derived strings"""
+    __slots__ = ('id', '_name', 'first_seen', 'video_id', 'messages', 'last_seen', 'flags', 'weight', 'slot')
+
+    def __init__(self, channel_id, name, first_seen, video_id=None):
+        self.id = channel_id
+        # Fallback keys already contain the name, don't keep it twice
+        self._name = None if channel_id == NO_ID_PREFIX + name else name
+        self.first_seen = first_seen  # Epoch seconds
+        self.video_id = video_id
+        self.messages = 0
+        self.last_seen = first_seen
+        self.flags = 0
+        self.weight = 0.0  # Draw weight last reported to the server
+        self.slot = -1  # Insertion order, the spill store's row key
+
+    @property
+    def name(self):
+        return self._name if self._name is not None else self.id[len(NO_ID_PREFIX):]
+
+    @property
+    def url(self):
+        return '' if self.id.startswith(NO_ID_PREFIX) else CHANNEL_URL_PREFIX + self.id
+
+    def to_wire(self):
+        """Dict in the format the server expects"""
+        from datetime import datetime  # Deferred, like the fetcher's other slow imports
+        wire = {
+            'name': self.name,
+            'id': self.id,
+            'url': self.url,
+            'first_seen': datetime.fromtimestamp(self.first_seen).isoformat()
+        }
+        if self.video_id:
+            wire['videoId'] = self.video_id
+        return wire
+
+    @classmethod
+    def from_wire(cls, wire):
+        """Rebuild a record from its wire dict (journal restore)"""
+        from datetime import datetime
+        try:
+            first_seen = datetime.fromisoformat(wire['first_seen']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            first_seen = time.time()
+        return cls(sys.intern(wire['id']), wire.get('name', ''), first_seen, wire.get('videoId'))
+
+
+class ParticipantStore:
+    """Deduplicated participant index keyed by interned channel ID"""
+
+    def __init__(self, weight_fn=activity_weight):
+        self.records = {}
+        self.weight_fn = weight_fn
+        self.weight_lock = threading.Lock()
+        self.changed_weights = {}  # channel ID -> weight, not yet sent to the server
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, channel_id):
+        return channel_id in self.records
+
+    def __getitem__(self, channel_id):
+        return self.records[channel_id]
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def get(self, channel_id, default=None):
+        return self.records.get(channel_id, default)
+
+    def values(self):
+        return self.records.values()
+
+    def missing(self, channel_ids):
+        """The IDs in the set `channel_ids` not in the store, one set difference
+
+        set.difference probes the dict directly; `- records.keys()` would copy every key.
+        """
+        return channel_ids.difference(self.records)
+
+    def add(self, channel_id, name, first_seen=None, video_id=None):
+        """Insert a participant, returns the new record or None if already known"""
+        if channel_id in self.records:
+            return None
+        channel_id = sys.intern(channel_id)
+        record = Participant(channel_id, name, first_seen if first_seen is not None else time.time(), video_id)
+        self.insert(record)
+        return record
+
+    def insert(self, record):
+        record.slot = len(self.records)
+        self.records[record.id] = record
+
+    def record_activity(self, record, timestamp=None, flags=0):
+        """Count one message from a participant and refresh its draw weight"""
+        record.messages += 1
+        record.last_seen = timestamp if timestamp is not None else time.time()
+        record.flags |= flags
+        self.refresh_weight(record)
+
+    def record_activity_batch(self, activity, timestamp):
+        """record_activity() for one chunk: (record, messages, flags) triples,
+        weight changes applied under one lock"""
+        weight_fn = self.weight_fn
+        changed = []
+        for record, count, flags in activity:
+            record.messages += count
+            record.last_seen = timestamp
+            record.flags |= flags
+            weight = weight_fn(record)
+            if weight != record.weight:
+                record.weight = weight
+                changed.append((record.id, weight))
+        if changed:
+            with self.weight_lock:
+                self.changed_weights.update(changed)
+
+    def refresh_weight(self, record):
+        weight = self.weight_fn(record)
+        if weight != record.weight:
+            record.weight = weight
+            with self.weight_lock:
+                self.changed_weights[record.id] = weight
+
+    def take_weight_updates(self):
+        """Weights changed since the last call, for the server's weighted draw"""
+        with self.weight_lock:
+            changed, self.changed_weights = self.changed_weights, {}
+        return changed
+
+    def restore_weight_updates(self, changed):
+        """Put back updates that could not be delivered, newer values win"""
+        with self.weight_lock:
+            for channel_id, weight in changed.items():
+                self.changed_weights.setdefault(channel_id, weight)
+
+    def load_wire(self, participants):
+        """Merge wire-format dicts, returns how many were new"""
+        added = 0
+        for wire in participants:
+            if wire.get('id') and wire['id'] not in self.records:
+                record = Participant.from_wire(wire)
+                self.insert(record)
+                # Activity isn't journaled, restored participants start with one message
+                record.messages = 1
+                self.refresh_weight(record)
+                added += 1
+        return added
+
+    def to_wire(self):
+        """Full roster in the wire format, safe to call from other threads"""
+        # list() copies the values in one step, inserts can't break the iteration
+        return [record.to_wire() for record in list(self.records.values())]
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Background participant uploader for the chat fetchers
+Batches new participants on a dedicated thread so chat ingestion never waits on HTTP
+"""
+
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import requests
+
+from request_budget import PRIORITY_UPLOAD, SERVER, RequestBudget
+
+# What to do when the upload queue is full
+OVERFLOW_RESYNC = 'resync'  # Drop the entry, recover it later with one full resync
+OVERFLOW_DROP = 'drop'      # Drop the entry, it reaches the server only via a later resync
+OVERFLOW_BLOCK = 'block'    # Backpressure: make ingestion wait up to block_timeout
+OVERFLOW_POLICIES = (OVERFLOW_RESYNC, OVERFLOW_DROP, OVERFLOW_BLOCK)
+
+
+class ParticipantUploader:
+    def __init__(self, video_id, client, roster, log=print,
+                 flush_interval=0.25, flush_size=200, max_queue=10000,
+                 overflow_policy=OVERFLOW_RESYNC, block_timeout=1.0, metrics=None, budget=None):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+
+        self.video_id = video_id
+        self.client = client  # Shared pooled ServerClient
+        self.budget = budget or RequestBudget()  # The fetcher's, shared with all other traffic
+        self.roster = roster  # Callable returning the full participant list (wire format)
+        self.log = log
+
+        self.flush_interval = flush_interval  # Seconds before a partial batch is sent
+        self.flush_size = flush_size  # Participants that force an immediate flush
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.queue = queue.Queue(maxsize=max_queue)
+
+        # Delta upload protocol: only participants the server has not
+        # acknowledged are sent, each batch tagged with a sequence number
+        self.session = uuid.uuid4().hex
+        self.seq = 0
+        self.pending = OrderedDict()  # New, not yet assigned to a batch
+        self.inflight_batches = OrderedDict()  # seq -> participants, awaiting ack
+        self.inflight_count = 0  # Participants in inflight_batches, readable from any thread
+        self.resync_requested = False
+        self.resync_inflight = 0  # Roster size while a full resync awaits its reply
+
+        # Optional FetcherMetrics: batch sizes and chat-to-ack delivery latency
+        self.metrics = metrics
+        self.chat_times = {}  # participant ID -> chat timestamp, until sealed into a batch
+        self.batch_times = {}  # seq -> chat timestamps of the batch's participants
+
+        self.stats = {
+            'batches_sent': 0,
+            'participants_sent': 0,
+            'dropped': 0,
+            'blocked': 0,
+            'resyncs': 0,
+            'failures': 0
+        }
+
+        self.running = False
+        self.stopping = threading.Event()  # Cuts short a wait for the request budget
+        self.thread = None
+        self.flush_now = threading.Event()
+
+    @property
+    def queue_depth(self):
+        """Participants waiting to be picked up by the sender thread"""
+        return self.queue.qsize()
+
+    @property
+    def backlog(self):
+        """Everything not yet acknowledged by the server"""
+        if self.resync_inflight:
+            # The roster in flight covers every pending and in-flight participant
+            return self.queue.qsize() + self.resync_inflight
+        # A counter the sender keeps, iterating its batches here could race with it
+        return self.queue.qsize() + len(self.pending) + self.inflight_count
+
+    def start(self):
+        """Start the sender thread"""
+        if self.thread:
+            return
+        self.running = True
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name='participant-uploader', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stop the sender thread after one last flush attempt, returns the unacknowledged count
+
+        The thread gets at most `timeout` seconds; if the server is slow it is left
+        behind (daemon) and its participants count as unsent.
+        """
+        self.running = False
+        self.stopping.set()
+        self.flush_now.set()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+        return self.backlog
+
+    def submit(self, participant, chat_time=None):
+        """Queue a newly discovered participant record, never waits on HTTP"""
+        # Set before queuing, the sender thread may seal the batch right away
+        track = bool(chat_time and self.metrics)
+        if track:
+            self.chat_times[participant.id] = chat_time
+        try:
+            if self.overflow_policy == OVERFLOW_BLOCK:
+                self.queue.put(participant, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(participant)
+            return True
+        except queue.Full:
+            if track:
+                self.chat_times.pop(participant.id, None)
+            if self.overflow_policy == OVERFLOW_BLOCK:
+                self.stats['blocked'] += 1
+            self.stats['dropped'] += 1
+            if self.overflow_policy != OVERFLOW_DROP:
+                self.resync_requested = True
+            return False
+
+    def drain(self, limit=None):
+        """Move queued participants into the next batch without blocking"""
+        moved = 0
+        while limit is None or moved < limit:
+            try:
+                participant = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            self.pending[participant.id] = participant
+            moved += 1
+        return moved
+
+    def request_flush(self):
+        """Wake the sender thread without waiting for the flush window"""
+        self.flush_now.set()
+
+    def run(self):
+        """Sender loop: flush every flush_interval or every flush_size participants"""
+        window_start = None
+
+        while self.running or not self.queue.empty():
+            timeout = self.flush_interval
+            if window_start is not None:
+                timeout = max(0.0, window_start + self.flush_interval - time.monotonic())
+
+            try:
+                participant = self.queue.get(timeout=timeout)
+                self.pending[participant.id] = participant
+                if window_start is None:
+                    window_start = time.monotonic()
+                # Drain whatever else is already waiting without blocking
+                self.drain(self.flush_size - len(self.pending))
+            except queue.Empty:
+                pass
+
+            window_elapsed = window_start is not None and time.monotonic() - window_start >= self.flush_interval
+            has_work = self.pending or self.inflight_batches or self.resync_requested
+
+            if has_work and (len(self.pending) >= self.flush_size or window_elapsed
+                             or self.flush_now.is_set() or window_start is None):
+                self.flush_now.clear()
+                if not self.flush():
+                    # Server unreachable: keep everything and back off one window
+                    time.sleep(self.flush_interval)
+                window_start = None
+
+        self.flush(retry=False)
+
+    def post(self, seq, participants, full=False, retry=True):
+        """POST one participant batch, returns the parsed server reply or None
+
+        With `retry`, failed attempts are retried after the server's shared
+        backoff until `stopping` is set; without it (the last flush on the way
+        out) there is one attempt, waiting at most block_timeout for a token.
+        """
+        max_retries = 3
+
+        for attempt in range(max_retries):
+            if retry:
+                ready = self.budget.acquire(SERVER, PRIORITY_UPLOAD, cancel=self.stopping)
+            else:
+                ready = self.budget.acquire(SERVER, PRIORITY_UPLOAD, timeout=self.block_timeout)
+            if not ready:
+                break
+
+            response = None
+            try:
+                response = self.client.post('/api/chat-participants', {
+                    "videoId": self.video_id,
+                    "session": self.session,
+                    "seq": seq,
+                    "full": full,
+                    "participants": participants
+                })
+
+                if response.status_code == 200:
+                    reply = response.json()
+                    self.budget.succeeded(SERVER)
+                    return reply
+
+            except (requests.exceptions.RequestException, ValueError):
+                if attempt == max_retries - 1:
+                    self.log(f"Failed to send update after {max_retries} attempts")
+
+            self.budget.failed(SERVER, response)
+            if not retry:
+                break
+
+        self.stats['failures'] += 1
+        return None
+
+    def acknowledge(self, ack_seq):
+        """Drop every in-flight batch the server has confirmed"""
+        while self.inflight_batches:
+            seq = next(iter(self.inflight_batches))
+            if seq > ack_seq:
+                break
+            size = len(self.inflight_batches.pop(seq))
+            self.inflight_count -= size
+            self.delivered(size, self.batch_times.pop(seq, ()))
+
+    def delivered(self, size, chat_times):
+        """Record a confirmed batch in the metrics"""
+        if not self.metrics:
+            return
+        self.metrics['upload_batch_size'].record(size)
+        now = time.time()
+        latency = self.metrics['delivery_seconds']
+        for chat_time in chat_times:
+            latency.record(now - chat_time)
+
+    def send_full_resync(self, retry=True):
+        """Send the whole roster once, replacing all unacknowledged batches"""
+        # Anything still queued is part of the roster snapshot below
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+        # Clear the request before the snapshot so drops racing with the
+        # upload trigger another resync instead of being lost
+        self.resync_requested = False
+        self.seq += 1
+        participants = self.roster()
+        self.resync_inflight = len(participants)
+        try:
+            reply = self.post(self.seq, participants, full=True, retry=retry)
+        finally:
+            self.resync_inflight = 0
+
+        if not reply or not reply.get('success'):
+            self.resync_requested = True
+            return False
+
+        self.log(f"Full resync sent ({len(participants)} participants)")
+        self.stats['resyncs'] += 1
+        self.pending.clear()
+        self.inflight_batches.clear()
+        self.inflight_count = 0
+        # Everyone still being tracked went out with the roster
+        chat_times = [t for times in self.batch_times.values() for t in times]
+        chat_times.extend(list(self.chat_times.values()))
+        self.batch_times.clear()
+        self.chat_times.clear()
+        self.delivered(len(participants), chat_times)
+        return True
+
+    def seal(self):
+        """Turn newly discovered participants into the next batch"""
+        self.seq += 1
+        # Records are only converted to the wire format here, at send time
+        self.inflight_batches[self.seq] = [participant.to_wire() for participant in self.pending.values()]
+        self.inflight_count += len(self.pending)
+        if self.chat_times:
+            times = [self.chat_times.pop(participant_id, None) for participant_id in self.pending]
+            self.batch_times[self.seq] = [t for t in times if t]
+        self.pending.clear()
+
+    def flush(self, retry=True):
+        """Send participants the server has not acknowledged yet, see post() for `retry`"""
+        if self.pending:
+            self.seal()
+
+        # Go-back-N: resend from the oldest unacknowledged batch, bounded so a
+        # misbehaving server can not keep us here forever
+        for _ in range(len(self.inflight_batches) + 1):
+            if self.resync_requested:
+                return self.send_full_resync(retry)
+
+            if not self.inflight_batches:
+                return True
+
+            seq, batch = next(iter(self.inflight_batches.items()))
+            reply = self.post(seq, batch, retry=retry)
+
+            if not reply or not reply.get('success'):
+                return False
+
+            self.stats['batches_sent'] += 1
+            self.stats['participants_sent'] += len(batch)
+            self.acknowledge(reply.get('ackSeq', 0))
+
+            if reply.get('resync'):
+                self.log("Server requested full resync")
+                self.resync_requested = True
+
+        return not self.inflight_batches
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Adaptive polling for the chat fetchers
+Poll cadence and the staleness threshold follow an EWMA of the observed
+message rate and YouTube's continuation timeout hint; reconnects use a
+capped, jittered exponential backoff.
+"""
+
+import math
+import random
+import time
+
+
+class PollScheduler:
+    def __init__(self, min_interval=0.2, max_interval=5.0, target_batch=20,
+                 attack=2.0, decay=30.0, stale_gaps=6, min_stale=30.0, max_stale=300.0):
+        self.min_interval = min_interval  # Never poll faster than this
+        self.max_interval = max_interval  # ...or slower than this
+        self.target_batch = target_batch  # Messages we aim to collect per poll
+        self.attack = attack  # EWMA time constant (s) when the rate rises, reacts to bursts
+        self.decay = decay  # ...and when it falls, so one quiet poll doesn't slow us down
+        self.stale_gaps = stale_gaps  # Typical message gaps without chat before a reconnect
+        self.min_stale = min_stale
+        self.max_stale = max_stale
+
+        self.rate = 0.0  # Messages per second, drives the poll cadence
+        self.active_rate = None  # Rate between polls that had messages, drives staleness
+        self.hint = None  # Last continuation timeout from YouTube, seconds
+        self.last_poll = None
+        self.last_active_poll = None
+        self.last_count = 0  # Messages the last poll returned
+        self.measured = False  # Whether the rate comes from at least one poll interval
+
+    def observe(self, count, hint=None, now=None):
+        """Record one poll that returned `count` messages"""
+        now = now if now is not None else time.monotonic()
+        if hint:
+            self.hint = hint
+
+        if self.last_poll is None:
+            # No interval to divide by yet: treat the first chunk as arrived
+            # within one min_interval, so a backlog is read at full speed
+            # instead of waiting out the max_interval ceiling
+            if count:
+                self.rate = count / self.min_interval
+        elif now > self.last_poll:
+            elapsed = now - self.last_poll
+            sample = count / elapsed
+            tau = self.attack if sample > self.rate else self.decay
+            self.rate += (1 - math.exp(-elapsed / tau)) * (sample - self.rate)
+            self.measured = True
+        self.last_poll = now
+        self.last_count = count
+
+        if count:
+            if self.last_active_poll is not None and now > self.last_active_poll:
+                # Includes the silence before these messages, so quiet streams look quiet
+                sample = count / (now - self.last_active_poll)
+                self.active_rate = sample if self.active_rate is None else 0.8 * self.active_rate + 0.2 * sample
+            self.last_active_poll = now
+
+    def next_delay(self):
+        """Seconds between polls: long enough to collect target_batch messages,
+        never longer than YouTube's hint"""
+        if self.last_count and (not self.measured or self.last_count >= self.target_batch):
+            # More is probably waiting: the first chunks of a stream, or a full
+            # batch while the EWMA still lags behind a burst
+            return self.min_interval
+        ceiling = min(self.hint, self.max_interval) if self.hint else self.max_interval
+        ceiling = max(ceiling, self.min_interval)
+        if self.rate <= 0:
+            return ceiling
+        return min(max(self.target_batch / self.rate, self.min_interval), ceiling)
+
+    def wait_time(self, now=None):
+        """How much longer to sleep before the next poll, processing time already counts"""
+        if self.last_poll is None:
+            return 0.0
+        now = now if now is not None else time.monotonic()
+        return max(0.0, self.last_poll + self.next_delay() - now)
+
+    def stale_after(self):
+        """Seconds without messages before a stream counts as stale"""
+        if not self.active_rate:
+            return self.max_stale
+        return min(max(self.stale_gaps / self.active_rate, self.min_stale), self.max_stale)
+
+    def snapshot(self):
+        return {
+            'rate': round(self.rate, 2),
+            'interval': round(self.next_delay(), 3),
+            'hint': self.hint,
+            'stale_after': round(self.stale_after(), 1)
+        }
+
+
+class Backoff:
+    """Capped exponential backoff with jitter (half fixed, half random)"""
+
+    def __init__(self, base=1.0, cap=60.0, rng=random):
+        self.base = base
+        self.cap = cap
+        self.rng = rng
+        self.attempt = 0
+
+    def next(self):
+        """Delay before the next attempt"""
+        ceiling = min(self.cap, self.base * 2 ** min(self.attempt, 32))
+        self.attempt += 1
+        return ceiling / 2 + self.rng.uniform(0, ceiling / 2)
+
+    def reset(self):
+        self.attempt = 0
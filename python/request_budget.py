@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Global request budget for the chat fetchers
+Every outbound request (chat polls and reconnects, participant uploads, like
+polls, heartbeats) takes a token from its destination's bucket first. Tokens
+go to the most important waiter, lower classes leave part of the burst to
+higher ones, and failures anywhere feed one jittered backoff per destination
+that every retry and every lower class waits out, so an outage no longer
+turns into a storm of independent retries.
+"""
+
+import threading
+import time
+from itertools import count
+
+from poll_scheduler import Backoff
+
+YOUTUBE = 'youtube'
+SERVER = 'server'
+DESTINATIONS = (YOUTUBE, SERVER)
+
+# Priority classes, lower goes first
+PRIORITY_CHAT = 0       # Chat polls and reconnects
+PRIORITY_UPLOAD = 1     # Participant batches, weights, eligibility
+PRIORITY_LIKES = 2      # Like-count polls and their delivery
+PRIORITY_HEARTBEAT = 3  # Telemetry, skipped rather than queued
+PRIORITY_NAMES = ('chat', 'upload', 'likes', 'heartbeat')
+# Fraction of the burst each class leaves in the bucket for the classes above it
+PRIORITY_RESERVE = (0.0, 0.1, 0.25, 0.5)
+
+# requests/s and burst per destination
+DEFAULT_RATES = {YOUTUBE: (20.0, 20), SERVER: (50.0, 50)}
+THROTTLE_STATUSES = (429, 503)
+CANCEL_POLL = 0.25  # Longest wait between checks of a cancel event
+
+
+def parse_rates(spec):
+    """'youtube=10,server=40/80' -> {'youtube': (10.0, 20), 'server': (40.0, 80)}, burst defaults to 2x"""
+    rates = {}
+    for part in spec.split(','):
+        if not part.strip():
+            continue
+        destination, _, value = part.partition('=')
+        destination = destination.strip().lower()
+        if destination not in DESTINATIONS:
+            raise ValueError(f"Unknown destination: {destination} (use {', '.join(DESTINATIONS)})")
+        rate, _, burst = value.partition('/')
+        rate = float(rate)
+        burst = int(burst) if burst else max(1, int(rate * 2))
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"Invalid rate for {destination}: {value}")
+        rates[destination] = (rate, burst)
+    return rates
+
+
+def retry_after(response):
+    """Seconds from a Retry-After header, None without one (HTTP dates are ignored)"""
+    try:
+        return max(0.0, float(response.headers.get('Retry-After')))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def delay(self, needed, now):
+        """Seconds until `needed` tokens are in the bucket"""
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+        return max(0.0, (needed - self.tokens) / self.rate)
+
+
+class Destination:
+    """Bucket, shared backoff and waiters of one destination"""
+
+    def __init__(self, name, rate, burst, now, backoff_base, backoff_cap):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst, now)
+        self.backoff = Backoff(base=backoff_base, cap=backoff_cap)
+        self.blocked_until = 0.0  # Monotonic time retries and lower classes may go again
+        self.waiters = []  # (priority, ticket, waits out the backoff)
+
+        self.stats = {
+            'granted': dict.fromkeys(PRIORITY_NAMES, 0),
+            'waited': 0,  # Granted after queuing
+            'wait_seconds': 0.0,
+            'timeouts': 0,  # Gave up waiting (heartbeats that were skipped, cancelled waits)
+            'failures': 0,
+            'throttles': 0  # 429/503 answers
+        }
+
+
+class RequestBudget:
+    def __init__(self, rates=None, metrics=None, backoff_base=1.0, backoff_cap=60.0, clock=time.monotonic):
+        self.clock = clock
+        self.metrics = metrics  # Optional FetcherMetrics: queue wait per granted request
+        self.condition = threading.Condition()
+        self.tickets = count()
+        now = clock()
+        rates = dict(DEFAULT_RATES, **(rates or {}))
+        self.destinations = {
+            name: Destination(name, rate, burst, now, backoff_base, backoff_cap)
+            for name, (rate, burst) in rates.items()
+        }
+
+    def acquire(self, destination, priority, timeout=None, cancel=None, retry=False):
+        """Wait for a token, returns False on timeout or when `cancel` is set
+
+        Chat polls on an open connection only wait for the bucket; retries
+        (`retry`) and every other class also wait out the shared backoff.
+        """
+        state = self.destinations[destination]
+        honours_backoff = retry or priority > PRIORITY_CHAT
+        needed = min(state.bucket.burst, 1 + PRIORITY_RESERVE[priority] * state.bucket.burst)
+        started = self.clock()
+        deadline = None if timeout is None else started + timeout
+        ticket = (priority, next(self.tickets), honours_backoff)
+        queued = False
+
+        with self.condition:
+            state.waiters.append(ticket)
+            try:
+                while True:
+                    now = self.clock()
+                    blocked = now < state.blocked_until
+                    if blocked and honours_backoff:
+                        delay = state.blocked_until - now
+                    else:
+                        # Waiters still backing off do not hold up the rest
+                        ahead = any(waiter < ticket and not (blocked and waiter[2]) for waiter in state.waiters)
+                        delay = None if ahead else state.bucket.delay(needed, now)
+                        if delay == 0.0:
+                            state.bucket.tokens -= 1
+                            self.granted(state, priority, now - started if queued else 0.0)
+                            return True
+
+                    if cancel is not None and cancel.is_set():
+                        break
+                    if deadline is not None:
+                        if now >= deadline:
+                            break
+                        delay = deadline - now if delay is None else min(delay, deadline - now)
+                    if cancel is not None:
+                        delay = CANCEL_POLL if delay is None else min(delay, CANCEL_POLL)
+                    self.condition.wait(delay)
+                    queued = True
+
+                state.stats['timeouts'] += 1
+                return False
+            finally:
+                state.waiters.remove(ticket)
+                self.condition.notify_all()
+
+    def granted(self, state, priority, waited):
+        stats = state.stats
+        stats['granted'][PRIORITY_NAMES[priority]] += 1
+        if waited:
+            stats['waited'] += 1
+            stats['wait_seconds'] += waited
+        if self.metrics:
+            self.metrics['budget_wait_seconds'].record(waited)
+
+    def succeeded(self, destination):
+        """A request got through, later retries go right away"""
+        state = self.destinations[destination]
+        with self.condition:
+            state.backoff.reset()
+            state.blocked_until = 0.0
+            self.condition.notify_all()
+
+    def failed(self, destination, response=None):
+        """A request failed: back off everyone retrying at this destination
+
+        429/503 replies count as throttling and wait at least their Retry-After.
+        Returns the delay now in force.
+        """
+        state = self.destinations[destination]
+        with self.condition:
+            delay = state.backoff.next()
+            state.stats['failures'] += 1
+            if response is not None and getattr(response, 'status_code', None) in THROTTLE_STATUSES:
+                state.stats['throttles'] += 1
+                delay = max(delay, retry_after(response) or 0.0)
+            state.blocked_until = max(state.blocked_until, self.clock() + delay)
+            return state.blocked_until - self.clock()
+
+    def totals(self):
+        """Counters for the Prometheus endpoint"""
+        states = self.destinations.values()
+        return {
+            'budget_throttles': sum(state.stats['throttles'] for state in states),
+            'budget_failures': sum(state.stats['failures'] for state in states),
+            'budget_timeouts': sum(state.stats['timeouts'] for state in states)
+        }
+
+    def snapshot(self):
+        now = self.clock()
+        with self.condition:
+            return {
+                name: dict(
+                    state.stats,
+                    granted=dict(state.stats['granted']),
+                    wait_seconds=round(state.stats['wait_seconds'], 3),
+                    rate=state.bucket.rate,
+                    burst=state.bucket.burst,
+                    tokens=round(state.bucket.tokens, 2),
+                    queued=len(state.waiters),
+                    backoff_seconds=round(max(0.0, state.blocked_until - now), 2)
+                )
+                for name, state in self.destinations.items()
+            }
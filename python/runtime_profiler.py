@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Runtime diagnostics for a running fetcher, nothing to restart or attach
+A sampling profiler that writes collapsed stacks (flamegraph.pl, speedscope,
+inferno), and timing hooks on hot-path methods. Both are toggled by signal or
+stdin command. Disabled hooks cost nothing: a hook replaces the method on the
+instance while enabled and is deleted again afterwards, so normal runs call
+the original method directly.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from fetcher_metrics import Histogram
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.expanduser('~'), '.youtube-live-awards', 'profiles')
+
+
+def frame_label(code):
+    """One collapsed-stack frame, ';' separates frames so it can not appear in one"""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ':')
+
+
+class SamplingProfiler:
+    """Samples every thread's stack from a daemon thread, `interval` seconds apart
+
+    Stacks are counted as they are taken; on stop they are written as
+    'thread;outer;...;inner count' lines to a .folded file in `directory`.
+    """
+
+    def __init__(self, directory=DEFAULT_PROFILE_DIR, interval=0.01, name='fetcher', log=print, on_written=None):
+        self.directory = directory
+        self.interval = interval  # 100 Hz by default, well under 1% of one core
+        self.name = name  # File name prefix, the video ID for the fetcher
+        self.log = log
+        self.on_written = on_written  # Optional callback(path, samples)
+
+        self.stacks = Counter()
+        self.samples = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_path = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, duration=None):
+        """Start sampling, for `duration` seconds or until stop(); False if already running"""
+        if self.running:
+            return False
+        self.stacks = Counter()
+        self.samples = 0
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, args=(duration,), name='sampling-profiler', daemon=True)
+        self.thread.start()
+        self.log(f"Profiler started ({1 / self.interval:.0f} Hz{f', {duration:g}s' if duration else ''})")
+        return True
+
+    def stop(self):
+        """Stop sampling, the profiler thread writes the output; False if not running"""
+        if not self.running:
+            return False
+        self.stop_event.set()
+        return True
+
+    def toggle(self):
+        if not self.stop():
+            self.start()
+
+    def run(self, duration):
+        deadline = time.monotonic() + duration if duration else None
+        own = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            self.sample(own)
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+        self.write()
+
+    def sample(self, own):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            labels.append(names.get(ident, f"thread-{ident}"))
+            labels.reverse()
+            self.stacks[';'.join(labels)] += 1
+        self.samples += 1
+
+    def write(self):
+        """Write the collapsed stacks, returns the path or None"""
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self.directory, f"{self.name}-{stamp}.folded")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            suffix = 1
+            while os.path.exists(path):  # Two profiles within one second
+                path = os.path.join(self.directory, f"{self.name}-{stamp}-{suffix}.folded")
+                suffix += 1
+            with open(path, 'w', encoding='utf-8') as f:
+                for stack, count in self.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+        except OSError as e:
+            self.log(f"Profile not written: {e}")
+            return None
+        self.last_path = path
+        self.log(f"Profile written: {path} ({self.samples} samples)")
+        if self.on_written:
+            self.on_written(path, self.samples)
+        return path
+
+
+class TimingHooks:
+    """Named timers around methods of live objects, installed only while enabled"""
+
+    def __init__(self):
+        self.targets = []  # (name, object, method name)
+        self.histograms = {}  # name -> Histogram in microseconds
+        self.enabled = False
+
+    def register(self, name, target, method):
+        """Time `target.method` under `name` while enabled; the method must come from the class"""
+        if method in vars(target):
+            raise ValueError(f"{name}: {method} is already an instance attribute")
+        self.targets.append((name, target, method))
+        self.histograms.setdefault(name, Histogram(scale=10 ** 6))
+
+    def enable(self):
+        """Install the timers, with fresh histograms"""
+        if self.enabled:
+            return
+        self.histograms = {name: Histogram(scale=10 ** 6) for name in self.histograms}
+        for name, target, method in self.targets:
+            setattr(target, method, self.timed(self.histograms[name], getattr(target, method)))
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled:
+            return
+        for _, target, method in self.targets:
+            delattr(target, method)  # The class method shows through again
+        self.enabled = False
+
+    @staticmethod
+    def timed(histogram, method):
+        clock = time.perf_counter
+        record = histogram.record
+
+        def timed_method(*args, **kwargs):
+            started = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                record(clock() - started)
+        return timed_method
+
+    def snapshot(self):
+        """Summaries in seconds, for heartbeats and the log"""
+        return {name: histogram.summary() for name, histogram in self.histograms.items()}
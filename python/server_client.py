@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pooled keep-alive HTTP client for fetcher -> server traffic
+One shared session, per-endpoint timeouts and compressed payloads
+"""
+
+import gzip
+import json
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import msgpack  # Optional compact binary encoding
+except ImportError:
+    msgpack = None
+
+ENCODING_JSON = 'json'
+ENCODING_GZIP = 'gzip'
+ENCODING_MSGPACK = 'msgpack'
+
+
+class ServerClient:
+    # Seconds to wait per endpoint, anything else uses default_timeout
+    TIMEOUTS = {
+        '/api/chat-capabilities': 2,
+        '/api/chat-eligibility': 5,
+        '/api/chat-entry-rules': 2,
+        '/api/chat-heartbeat': 2,
+        '/api/chat-participants': 5,
+        '/api/chat-weights': 5
+    }
+
+    def __init__(self, server_url, gzip_threshold=1024, pool_size=4, default_timeout=5):
+        self.server_url = server_url.rstrip('/')
+        self.gzip_threshold = gzip_threshold  # Bodies at least this large get compressed
+        self.default_timeout = default_timeout
+
+        # Until the server tells us otherwise only plain JSON is safe
+        self.encodings = {ENCODING_JSON}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Connection': 'keep-alive'})
+
+        self.stats = {
+            'requests': 0,
+            'bytes_raw': 0,
+            'bytes_sent': 0,
+            'errors': 0
+        }
+
+    def negotiate(self):
+        """Ask the server which body encodings it accepts"""
+        try:
+            response = self.session.get(
+                self.url('/api/chat-capabilities'),
+                timeout=self.timeout('/api/chat-capabilities')
+            )
+            if response.status_code == 200:
+                self.encodings = {ENCODING_JSON} | set(response.json().get('encodings', []))
+        except (requests.exceptions.RequestException, ValueError):
+            pass  # Older server, stay on plain JSON
+        return self.encodings
+
+    def url(self, path):
+        return f"{self.server_url}{path}"
+
+    def timeout(self, path):
+        return self.TIMEOUTS.get(path, self.default_timeout)
+
+    def encode(self, payload):
+        """Serialize a payload, returns (body, headers)"""
+        if msgpack and ENCODING_MSGPACK in self.encodings:
+            body = msgpack.packb(payload, use_bin_type=True)
+            headers = {'Content-Type': 'application/msgpack'}
+        else:
+            body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            headers = {'Content-Type': 'application/json; charset=utf-8'}
+
+        raw_size = len(body)
+        if ENCODING_GZIP in self.encodings and raw_size >= self.gzip_threshold:
+            body = gzip.compress(body, compresslevel=5)
+            headers['Content-Encoding'] = 'gzip'
+
+        self.stats['bytes_raw'] += raw_size
+        self.stats['bytes_sent'] += len(body)
+        return body, headers
+
+    def post(self, path, payload, timeout=None):
+        """POST a payload over the pooled session"""
+        body, headers = self.encode(payload)
+        self.stats['requests'] += 1
+        try:
+            return self.session.post(
+                self.url(path),
+                data=body,
+                headers=headers,
+                timeout=timeout or self.timeout(path)
+            )
+        except requests.exceptions.RequestException:
+            self.stats['errors'] += 1
+            raise
+
+    def get(self, path, timeout=None):
+        """GET over the pooled session"""
+        self.stats['requests'] += 1
+        try:
+            return self.session.get(self.url(path), timeout=timeout or self.timeout(path))
+        except requests.exceptions.RequestException:
+            self.stats['errors'] += 1
+            raise
+
+    def close(self):
+        """Release pooled connections"""
+        self.session.close()
@@ -7,6 +7,7 @@ const cheerio = require('cheerio');
 const { spawn } = require('child_process');
 const fs = require('fs').promises;
 const path = require('path');
+const readline = require('readline');
 
 const app = express();
 const server = http.createServer(app);
@@ -51,8 +52,37 @@ function log(type, message) {
   }
 }
 
+// Optional compact binary encoding for chat fetcher uploads
+let msgpack = null;
+try {
+  msgpack = require('@msgpack/msgpack');
+} catch (error) {
+  // Not installed - fetchers fall back to (gzipped) JSON
+}
+
 app.use(cors());
-app.use(express.json());
+// Gzip/deflate request bodies are inflated by the body parsers
+app.use(express.json({ limit: '50mb' }));
+if (msgpack) {
+  app.use(express.raw({ type: 'application/msgpack', limit: '50mb' }));
+  app.use((req, res, next) => {
+    if (Buffer.isBuffer(req.body) && req.is('application/msgpack')) {
+      try {
+        req.body = msgpack.decode(req.body);
+      } catch (error) {
+        return res.status(400).json({ success: false, message: 'Invalid msgpack body' });
+      }
+    }
+    next();
+  });
+}
+
+// Body encodings the chat fetcher may use for uploads
+app.get('/api/chat-capabilities', (req, res) => {
+  const encodings = ['json', 'gzip'];
+  if (msgpack) encodings.push('msgpack');
+  res.json({ encodings });
+});
 
 // Get winner GIFs from directory
 app.get('/api/winner-gifs', async (req, res) => {
@@ -76,10 +106,47 @@ app.get('/api/winner-gifs', async (req, res) => {
 
 // Chat heartbeat endpoint for monitoring
 app.post('/api/chat-heartbeat', (req, res) => {
-  const { videoId, status, stats, participants_count } = req.body;
+  recordChatHeartbeat(req.body);
+  res.json({ success: true });
+});
+
+// Latest fetcher telemetry (rates, latency percentiles), kept outside state
+let chatFetcherMetrics = null;
+
+app.get('/api/chat-metrics', (req, res) => {
+  res.json({ lastHeartbeat: state.lastChatHeartbeat || null, metrics: chatFetcherMetrics, startup: chatStartup,
+    lastProfile: chatLastProfile });
+});
+
+// On-demand diagnostics for a lagging fetcher, no restart needed:
+// { profile: 'start' | 'stop', seconds, timings: 'on' | 'off' }
+let chatLastProfile = null;
+
+app.post('/api/chat-profile', (req, res) => {
+  const { profile, seconds, timings } = req.body || {};
+  let sent = false;
+  if (profile === 'start' || profile === 'stop') {
+    const duration = profile === 'start' && Number(seconds) > 0 ? ` ${Number(seconds)}` : '';
+    sent = sendChatCommand(`profile ${profile}${duration}`);
+  }
+  if (timings === 'on' || timings === 'off') {
+    sent = sendChatCommand(`timings ${timings}`) || sent;
+  }
+  res.json({ success: sent });
+});
+
+// Shared by the HTTP endpoint and 'stats' events from the fetcher's stdout
+function recordChatHeartbeat(body) {
+  const { videoId, status, stats, participants_count, metrics } = body;
 
   // Store last heartbeat time
   state.lastChatHeartbeat = Date.now();
+  if (metrics) {
+    chatFetcherMetrics = { ...metrics, uptime_seconds: body.uptime_seconds, participants_count };
+  }
+  if (status === 'alive') {
+    chatLikesPoll = body.likes || null;
+  }
 
   // Log important events
   if (status === 'terminated') {
@@ -92,43 +159,217 @@ app.post('/api/chat-heartbeat', (req, res) => {
     if (!state.heartbeatCount) state.heartbeatCount = 0;
     state.heartbeatCount++;
     if (state.heartbeatCount % 10 === 0) {
-      log('system', `Heartbeat #${state.heartbeatCount} - Participants: ${participants_count || 0}`);
+      const rate = metrics ? `, ${metrics.messages_per_second} msgs/s` : '';
+      log('system', `Heartbeat #${state.heartbeatCount} - Participants: ${participants_count || 0}${rate}`);
     }
   }
+}
 
-  res.json({ success: true });
-});
+// Participant index for O(1) duplicate checks (kept outside state so it is
+// not serialized to clients)
+let chatParticipantIds = new Set();
+
+// Activity weights per participant ID, sent by the fetcher for weighted draws
+let chatWeights = new Map();
+
+// Participants active within the fetcher's sliding window (see activeWindowSeconds)
+let chatEligible = new Set();
+// Bumped on every rules change, the fetcher reloads when it sees a new version
+let chatEntryRulesVersion = 0;
+
+// Delta upload bookkeeping: the fetcher tags each batch with its session and a
+// monotonically increasing sequence number
+let chatUpload = { session: null, lastSeq: 0 };
+
+function resetChatParticipants() {
+  state.chatParticipants = [];
+  chatParticipantIds = new Set();
+  chatWeights = new Map();
+  chatEligible = new Set();
+  chatUpload = { session: null, lastSeq: 0 };
+}
+
+function addChatParticipants(participants) {
+  let newParticipants = 0;
+  participants.forEach(participant => {
+    const id = participant.id || `${participant.name}_${Date.now()}`;
+    if (!chatParticipantIds.has(id)) {
+      chatParticipantIds.add(id);
+      state.chatParticipants.push(participant);
+      newParticipants++;
+    }
+  });
+  return newParticipants;
+}
 
 // API endpoint for Python chat fetcher
 app.post('/api/chat-participants', (req, res) => {
-  const { videoId, participants } = req.body;
-
-  if (videoId === state.videoId && participants) {
-    // Update participants with ID support
-    let newParticipants = 0;
-    participants.forEach(participant => {
-      const id = participant.id || `${participant.name}_${Date.now()}`;
-      if (!state.chatParticipants.find(p => p.id === id)) {
-        state.chatParticipants.push(participant);
-        newParticipants++;
-      }
-    });
+  res.json(ingestChatParticipants(req.body));
+});
+
+// Apply one participant batch (HTTP upload or 'participants' event), returns the reply
+function ingestChatParticipants(body) {
+  const { videoId, participants, session, seq, full } = body;
 
-    if (newParticipants > 0) {
-      log('success', `+${newParticipants} new participants (Total: ${state.chatParticipants.length})`);
+  if (videoId !== state.videoId || !participants) {
+    return { success: false, message: 'Invalid video ID or no participants' };
+  }
+
+  let newParticipants = 0;
+
+  if (seq === undefined) {
+    // Legacy uploads without a sequence number carry the whole roster
+    newParticipants = addChatParticipants(participants);
+  } else if (full) {
+    // Full resync replaces every batch up to and including this one
+    newParticipants = addChatParticipants(participants);
+    chatUpload = { session, lastSeq: seq };
+    log('system', `Participant resync received (${participants.length} entries, seq ${seq})`);
+  } else if (session !== chatUpload.session && seq !== 1) {
+    // Unknown session mid-stream (e.g. server restarted) - ask for everything
+    return { success: true, ackSeq: 0, resync: true, count: state.chatParticipants.length };
+  } else if (session !== chatUpload.session || seq === chatUpload.lastSeq + 1) {
+    if (session !== chatUpload.session) {
+      chatUpload = { session, lastSeq: 0 };
     }
+    newParticipants = addChatParticipants(participants);
+    chatUpload.lastSeq = seq;
+  } else if (seq > chatUpload.lastSeq + 1) {
+    // A batch went missing - the fetcher has to resend the full roster
+    log('warning', `Participant batch gap (expected ${chatUpload.lastSeq + 1}, got ${seq}), requesting resync`);
+    return { success: true, ackSeq: chatUpload.lastSeq, resync: true, count: state.chatParticipants.length };
+  }
+  // seq <= lastSeq: duplicate batch, already applied - just acknowledge
 
+  if (newParticipants > 0) {
+    log('success', `+${newParticipants} new participants (Total: ${state.chatParticipants.length})`);
     io.emit('participants-update', state.chatParticipants);
-    res.json({ success: true, count: state.chatParticipants.length });
+  }
+
+  return {
+    success: true,
+    ackSeq: seq === undefined ? null : chatUpload.lastSeq,
+    resync: false,
+    count: state.chatParticipants.length
+  };
+}
+
+// Activity weights for weighted draws (only weights that changed are sent)
+app.post('/api/chat-weights', (req, res) => {
+  res.json(applyChatWeights(req.body));
+});
+
+function applyChatWeights(body) {
+  const { videoId, weights } = body;
+
+  if (videoId !== state.videoId || !weights) {
+    return { success: false, message: 'Invalid video ID or no weights' };
+  }
+
+  Object.entries(weights).forEach(([id, weight]) => {
+    chatWeights.set(id, Number(weight) || 0);
+  });
+
+  return { success: true, count: chatWeights.size };
+}
+
+// Like counts polled by the robust fetcher (--likes). The reply carries the next
+// reward target, the fetcher polls faster as likes get close to it
+app.post('/api/chat-likes', (req, res) => {
+  res.json(applyChatLikes(req.body));
+});
+
+// Likes tracker state from the fetcher's last heartbeat (null without --likes)
+let chatLikesPoll = null;
+
+// The Node updater stands down while a fetcher started with --likes runs,
+// unless its heartbeats report the tracker failing
+function fetcherTracksLikes() {
+  return Boolean(chatProcess && chatProcess.likes && !(chatLikesPoll && chatLikesPoll.failing));
+}
+
+function applyChatLikes(body) {
+  const { videoId, likes } = body;
+
+  if (videoId !== state.videoId || !Number.isFinite(likes)) {
+    return { success: false, message: 'Invalid video ID or likes' };
+  }
+
+  applyLikes(likes);
+  return { success: true, nextTarget: getNextTarget() };
+}
+
+// Eligibility deltas from the fetcher's activity window. The reply carries the
+// window the fetcher should track, so changing it here reaches the fetcher
+app.post('/api/chat-eligibility', (req, res) => {
+  res.json(applyChatEligibility(req.body));
+});
+
+function applyChatEligibility(body) {
+  const { videoId, full, added, removed } = body;
+
+  if (videoId !== state.videoId) {
+    return { success: false, message: 'Invalid video ID' };
+  }
+
+  if (full) {
+    chatEligible = new Set(added || []);
   } else {
-    res.json({ success: false, message: 'Invalid video ID or no participants' });
+    (added || []).forEach(id => chatEligible.add(id));
+    (removed || []).forEach(id => chatEligible.delete(id));
   }
+
+  return {
+    success: true,
+    window: state.rewardSystem.activeWindowSeconds || null,
+    count: chatEligible.size,
+    entryRulesVersion: chatEntryRulesVersion
+  };
+}
+
+// Entry rules the fetcher applies to new chatters (null = everyone enters)
+app.get('/api/chat-entry-rules', (req, res) => {
+  res.json({
+    version: chatEntryRulesVersion,
+    rules: state.rewardSystem.entryRules
+  });
 });
 
+// Participants a reward can go to - everyone, or only the recently active
+function drawCandidates() {
+  if (!state.rewardSystem.activeWindowSeconds) {
+    return state.chatParticipants;
+  }
+  return state.chatParticipants.filter(p => chatEligible.has(p.id));
+}
+
+// Pick a winner - uniform, or proportional to chat activity when weighted draws are on
+function pickWinner(participants) {
+  if (!state.rewardSystem.weightedDraw || chatWeights.size === 0) {
+    return participants[Math.floor(Math.random() * participants.length)];
+  }
+
+  // Participants without a reported weight count as one message
+  const weightOf = p => (chatWeights.has(p.id) ? chatWeights.get(p.id) : 1);
+  let total = 0;
+  participants.forEach(p => { total += weightOf(p); });
+  if (total <= 0) {
+    return participants[Math.floor(Math.random() * participants.length)];
+  }
+
+  let remaining = Math.random() * total;
+  for (const participant of participants) {
+    remaining -= weightOf(participant);
+    if (remaining < 0) return participant;
+  }
+  return participants[participants.length - 1];
+}
+
 // State management
 let state = {
   monitoring: false,
   videoId: null,
+  extraVideoIds: [], // Simulcast streams pooled into the same participant list
   currentLikes: 0,
   startLikes: 0,
   chatParticipants: [],
@@ -143,6 +384,9 @@ let state = {
   rewardSystem: {
     active: false,
     mode: 'auto', // 'auto' or 'custom'
+    weightedDraw: false, // Pick winners proportionally to chat activity
+    activeWindowSeconds: 0, // Only people who chatted this recently can win (0 = everyone)
+    entryRules: null, // { keywords, excludeModerators, excludeOwner, blockedChannels, caseSensitive }
     autoConfig: {
       interval: 100,
       prize: '100 TL'
@@ -186,40 +430,257 @@ async function fetchVideoStats(videoId) {
 // Python chat fetcher process
 let chatProcess = null;
 
-function startChatFetcher() {
-  if (chatProcess) {
-    log('warning', 'Chat fetcher already running');
-    return;
-  }
+// Warm robust fetcher started with the server: imports loaded and server
+// connection open, it attaches to a video on 'attach <videoId>' (CHAT_STANDBY=0 disables)
+const ROBUST_FETCHER = './python/chat_fetcher_robust.py';
+const STANDBY_RESPAWN_MS = 5000; // Let the attached fetcher start before warming the next one
+let chatStandby = null;
 
-  // Windows uses 'python', macOS/Linux use 'python3'
-  const pythonCommand = process.platform === 'win32' ? 'python' : 'python3';
-  log('system', `Starting Python chat fetcher with command: ${pythonCommand}`);
+// Startup timings of the current fetcher, for /api/chat-metrics
+let chatStartup = null;
 
-  // Use robust version for better reliability
-  const scriptPath = './python/chat_fetcher_robust.py';
+function chatFetcherScript() {
+  // Use robust version for better reliability, CHAT_FETCHER=async selects the
+  // asyncio engine which can multiplex several streams in one process
+  const scriptPath = process.env.CHAT_FETCHER === 'async'
+    ? './python/chat_fetcher_async.py'
+    : ROBUST_FETCHER;
 
   // Check if robust version exists, fallback to original if not
   const fsSync = require('fs');
-  const finalScriptPath = fsSync.existsSync(scriptPath) ? scriptPath : './python/chat_fetcher.py';
+  return fsSync.existsSync(scriptPath) ? scriptPath : './python/chat_fetcher.py';
+}
 
-  log('system', `Using chat fetcher: ${finalScriptPath}`);
+function spawnChatFetcher(scriptPath, videoIds, extraArgs = []) {
+  // Windows uses 'python', macOS/Linux use 'python3'
+  const pythonCommand = process.platform === 'win32' ? 'python' : 'python3';
 
   // Set UTF-8 encoding for Windows
   const env = { ...process.env };
   env.PYTHONIOENCODING = 'utf-8';
   env.PYTHONUTF8 = '1';
 
-  chatProcess = spawn(pythonCommand, [
-    finalScriptPath,
-    state.videoId,
-    'http://localhost:3001'
-  ], {
+  // The robust and async fetchers speak JSON-lines events on stdout; with
+  // CHAT_TRANSPORT=stdio participants come over the pipe instead of HTTP
+  const eventsMode = scriptPath !== './python/chat_fetcher.py';
+  const args = [scriptPath, videoIds, 'http://localhost:3001', ...extraArgs];
+  if (eventsMode) {
+    args.push('--events');
+    if (process.env.CHAT_TRANSPORT === 'stdio') {
+      args.push('--transport', 'stdio');
+    }
+    if (process.env.CHAT_LOG_LEVEL) {
+      args.push('--verbosity', process.env.CHAT_LOG_LEVEL);
+    }
+  }
+  // The robust fetcher polls likes too unless LIKES_TRACKER=node keeps it here
+  if (scriptPath === ROBUST_FETCHER && process.env.LIKES_TRACKER !== 'node') {
+    args.push('--likes');
+  }
+
+  const proc = spawn(pythonCommand, args, {
     env: env,
     encoding: 'utf8'
   });
+  proc.events = eventsMode;
+  proc.likes = args.includes('--likes');
+  proc.stdin.on('error', () => {}); // EPIPE after the fetcher exits
+  proc.multiStream = scriptPath.endsWith('chat_fetcher_async.py');
+
+  if (eventsMode) {
+    readline.createInterface({ input: proc.stdout }).on('line', line => handleChatEvent(proc, line));
+    readline.createInterface({ input: proc.stderr }).on('line', line => console.log(`[Chat] ${line}`));
+  } else {
+    attachLegacyChatOutput(proc);
+  }
+
+  proc.on('close', (code) => {
+    clearTimeout(proc.killTimer);
+    if (chatStandby === proc) {
+      log('warning', `Chat fetcher standby exited with code ${code}`);
+      chatStandby = null;
+      return;
+    }
+    log(code === 0 ? 'info' : 'warning', `Chat fetcher process exited with code ${code}`);
+    // A stopped fetcher may still be draining after a new one was started
+    if (chatProcess === proc) {
+      chatProcess = null;
+    }
+  });
+
+  return proc;
+}
+
+function startChatStandby() {
+  if (chatStandby || process.env.CHAT_STANDBY === '0' || chatFetcherScript() !== ROBUST_FETCHER) {
+    return;
+  }
+  chatStandby = spawnChatFetcher(ROBUST_FETCHER, '-', ['--standby']);
+  log('system', 'Warming a chat fetcher standby');
+}
+
+// The window and entry rules also reach the fetcher through eligibility
+// replies, but over stdio there are no replies
+function pushChatSettings() {
+  if (state.rewardSystem.activeWindowSeconds) {
+    sendChatCommand(`window ${state.rewardSystem.activeWindowSeconds}`);
+  }
+  if (chatEntryRulesVersion) {
+    sendChatCommand(`rules ${JSON.stringify({ version: chatEntryRulesVersion, rules: state.rewardSystem.entryRules })}`);
+  }
+  pushChatTarget(true);
+}
+
+// Next reward target for the fetcher's likes tracker, pushed when it changes
+let pushedChatTarget;
+
+function pushChatTarget(force = false) {
+  const target = getNextTarget() ?? null;
+  if (force || target !== pushedChatTarget) {
+    pushedChatTarget = target;
+    sendChatCommand(`target ${target ?? 'none'}`);
+  }
+}
+
+function startChatFetcher() {
+  if (chatProcess) {
+    log('warning', 'Chat fetcher already running');
+    return;
+  }
+
+  const finalScriptPath = chatFetcherScript();
+  chatStartup = { startedAt: Date.now(), warm: false };
+  chatLikesPoll = null;
+
+  if (chatStandby && finalScriptPath === ROBUST_FETCHER) {
+    // Warm start: imports and connection pool are ready, only the chat connect remains
+    chatProcess = chatStandby;
+    chatStandby = null;
+    chatStartup.warm = true;
+    log('system', `Attaching warm chat fetcher to ${state.videoId}`);
+    sendChatCommand(`attach ${state.videoId}`);
+    pushChatSettings();
+    setTimeout(startChatStandby, STANDBY_RESPAWN_MS);
+    return;
+  }
+
+  log('system', `Using chat fetcher: ${finalScriptPath}`);
+
+  // Extra streams only make sense for the multiplexing fetcher
+  const videoIds = finalScriptPath.endsWith('chat_fetcher_async.py')
+    ? [state.videoId, ...state.extraVideoIds].join(',')
+    : state.videoId;
+
+  chatProcess = spawnChatFetcher(finalScriptPath, videoIds);
+  if (chatProcess.events) {
+    pushChatSettings();
+  }
+  setTimeout(startChatStandby, STANDBY_RESPAWN_MS);
+}
+
+// Ask the fetcher to drain and exit; it gets CHAT_STOP_GRACE_MS to deliver
+// its last participants before it is killed
+function stopChatFetcher() {
+  const proc = chatProcess;
+  if (!proc) return;
+  chatProcess = null;
+
+  const graceMs = parseInt(process.env.CHAT_STOP_GRACE_MS, 10) || 15000;
+  if (proc.events && proc.stdin.writable) {
+    proc.stdin.write('stop\n');
+  } else {
+    proc.kill('SIGTERM'); // The fetchers drain on SIGTERM as well
+  }
+  proc.killTimer = setTimeout(() => {
+    log('warning', `Chat fetcher did not exit within ${graceMs}ms, killing it`);
+    proc.kill('SIGKILL');
+  }, graceMs);
+}
+
+// Write one control command to the fetcher's stdin
+function sendChatCommand(command) {
+  if (chatProcess && chatProcess.events && chatProcess.stdin.writable) {
+    chatProcess.stdin.write(`${command}\n`);
+    return true;
+  }
+  return false;
+}
+
+// One JSON event per line from an events-mode fetcher
+function handleChatEvent(proc, line) {
+  let event;
+  try {
+    event = JSON.parse(line);
+  } catch (e) {
+    console.log(`[Chat] ${line}`);
+    return;
+  }
 
-  chatProcess.stdout.on('data', (data) => {
+  switch (event.event) {
+    case 'participants': {
+      const reply = ingestChatParticipants(event);
+      if (reply.resync && proc === chatProcess) {
+        sendChatCommand('resync');
+      }
+      break;
+    }
+    case 'weights':
+      applyChatWeights(event);
+      break;
+    case 'eligibility':
+      applyChatEligibility(event);
+      break;
+    case 'likes':
+      if (applyChatLikes(event).success && proc === chatProcess) {
+        pushChatTarget();
+      }
+      break;
+    case 'stats':
+      recordChatHeartbeat(event);
+      break;
+    case 'state':
+      if (event.state === 'standby') {
+        log('system', `Chat fetcher standby ready in ${event.warmupSeconds}s`);
+      } else if (event.state === 'connected') {
+        log('success', `Chat connected: ${event.videoId}`);
+      } else if (event.state === 'reconnecting') {
+        log('warning', `Chat reconnecting: ${event.videoId} (${event.reason})`);
+      } else if (event.state === 'draining') {
+        log('info', `Chat fetcher draining ${event.backlog} participants`);
+      } else if (event.state === 'stopped') {
+        const shutdown = event.shutdown_seconds !== undefined
+          ? `, shutdown ${event.shutdown_seconds}s, ${event.unsent} unsent` : '';
+        log('info', `Chat fetcher stopped${event.reason ? ` (${event.reason})` : ''}${shutdown}`);
+      }
+      break;
+    case 'error':
+      log('error', `Chat fetcher: ${event.message}`);
+      break;
+    case 'first_participant':
+      if (proc === chatProcess && chatStartup) {
+        // Server-side clock includes interpreter startup and imports for cold starts
+        chatStartup.firstParticipantMs = Date.now() - chatStartup.startedAt;
+        chatStartup.fetcherSeconds = event.seconds;
+        chatStartup.connectSeconds = event.connectSeconds;
+        log('info', `First chat participant after ${chatStartup.firstParticipantMs}ms (${chatStartup.warm ? 'warm' : 'cold'} start)`);
+      }
+      break;
+    case 'profile':
+      chatLastProfile = { path: event.path, samples: event.samples, writtenAt: Date.now() };
+      break;
+    case 'command':
+      if (!event.ok) {
+        log('warning', `Chat fetcher rejected command: ${event.command}`);
+      }
+      break;
+    default:
+      break;
+  }
+}
+
+// chat_fetcher.py only prints free text, classify it by keywords
+function attachLegacyChatOutput(proc) {
+  proc.stdout.on('data', (data) => {
     const message = data.toString().trim();
     if (message.includes('Connected to chat')) {
       log('success', message);
@@ -236,14 +697,9 @@ function startChatFetcher() {
     }
   });
 
-  chatProcess.stderr.on('data', (data) => {
+  proc.stderr.on('data', (data) => {
     log('error', `Chat fetcher error: ${data}`);
   });
-
-  chatProcess.on('close', (code) => {
-    log(code === 0 ? 'info' : 'warning', `Chat fetcher process exited with code ${code}`);
-    chatProcess = null;
-  });
 }
 
 // Update likes periodically
@@ -254,23 +710,32 @@ function startLikesUpdater() {
 
   log('system', 'Starting likes updater (5 second interval)');
   updateInterval = setInterval(async () => {
+    // Fallback only while the chat fetcher is not tracking likes itself
+    if (fetcherTracksLikes()) {
+      return;
+    }
     if (state.monitoring && state.videoId) {
       const stats = await fetchVideoStats(state.videoId);
       if (stats && stats.likes) {
-        const previousLikes = state.currentLikes;
-        state.currentLikes = stats.likes;
-
-        if (previousLikes !== state.currentLikes) {
-          log('info', `Likes updated: ${previousLikes.toLocaleString('tr-TR')} → ${state.currentLikes.toLocaleString('tr-TR')} (Δ +${(state.currentLikes - previousLikes).toLocaleString('tr-TR')})`);
-
-          io.emit('likes-update', state.currentLikes);
-          checkRewards();
-        }
+        applyLikes(stats.likes);
       }
     }
   }, 5000);
 }
 
+// Shared by the Node updater and the fetcher's likes tracker
+function applyLikes(likes) {
+  const previousLikes = state.currentLikes;
+  state.currentLikes = likes;
+
+  if (previousLikes !== state.currentLikes) {
+    log('info', `Likes updated: ${previousLikes.toLocaleString('tr-TR')} → ${state.currentLikes.toLocaleString('tr-TR')} (Δ +${(state.currentLikes - previousLikes).toLocaleString('tr-TR')})`);
+
+    io.emit('likes-update', state.currentLikes);
+    checkRewards();
+  }
+}
+
 function stopLikesUpdater() {
   if (updateInterval) {
     clearInterval(updateInterval);
@@ -428,9 +893,11 @@ function processRewardQueue() {
     // Mark as achieved immediately to prevent re-processing
     reward.achieved = true;
 
-    if (state.chatParticipants.length > 0) {
+    const candidates = drawCandidates();
+
+    if (candidates.length > 0) {
       // Select random winner
-      const winner = state.chatParticipants[Math.floor(Math.random() * state.chatParticipants.length)];
+      const winner = pickWinner(candidates);
       reward.winner = winner.name;
       reward.winnerId = winner.id;
 
@@ -452,8 +919,8 @@ function processRewardQueue() {
     } else {
       // No participants - mark as skipped
       reward.skipped = true;
-      reward.skipReason = 'No participants';
-      log('warning', `⚠️ Reward skipped at ${reward.targetLikes} likes - No participants`);
+      reward.skipReason = state.rewardSystem.activeWindowSeconds ? 'No active participants' : 'No participants';
+      log('warning', `⚠️ Reward skipped at ${reward.targetLikes} likes - ${reward.skipReason}`);
     }
   }
 
@@ -524,7 +991,7 @@ io.on('connection', (socket) => {
       state.currentLikes = stats.likes;
       state.monitoring = true;
       state.videoId = videoId;
-      state.chatParticipants = [];
+      resetChatParticipants();
       state.stats = {
         ...state.stats,
         streamStartTime: Date.now()
@@ -575,14 +1042,35 @@ io.on('connection', (socket) => {
     // Stop chat fetcher
     if (chatProcess) {
       log('system', 'Stopping chat fetcher process...');
-      chatProcess.kill();
-      chatProcess = null;
+      stopChatFetcher();
     }
 
     io.emit('monitoring-stopped');
     log('info', 'Monitoring stopped');
   });
 
+  // Runtime add/remove of simulcast chat streams (async fetcher only)
+  socket.on('add-chat-stream', (videoId) => {
+    if (!videoId || videoId === state.videoId || state.extraVideoIds.includes(videoId)) return;
+    state.extraVideoIds.push(videoId);
+    log('system', `Chat stream added: ${videoId}`);
+    if (chatProcess && chatProcess.multiStream) {
+      chatProcess.stdin.write(`add ${videoId}\n`);
+    } else if (chatProcess) {
+      log('warning', 'Running chat fetcher is single-stream, set CHAT_FETCHER=async to pool streams');
+    }
+  });
+
+  socket.on('remove-chat-stream', (videoId) => {
+    const index = state.extraVideoIds.indexOf(videoId);
+    if (index === -1) return;
+    state.extraVideoIds.splice(index, 1);
+    log('system', `Chat stream removed: ${videoId}`);
+    if (chatProcess && chatProcess.multiStream) {
+      chatProcess.stdin.write(`remove ${videoId}\n`);
+    }
+  });
+
   socket.on('get-progress', () => {
     const nextTarget = getNextTarget();
     const percentage = getProgressPercentage();
@@ -731,6 +1219,40 @@ io.on('connection', (socket) => {
     });
   });
 
+  socket.on('set-weighted-draw', (enabled) => {
+    state.rewardSystem.weightedDraw = !!enabled;
+    log('system', `Weighted draw ${state.rewardSystem.weightedDraw ? 'enabled' : 'disabled'}`);
+    io.emit('weighted-draw-status', state.rewardSystem.weightedDraw);
+  });
+
+  socket.on('set-active-window', (seconds) => {
+    state.rewardSystem.activeWindowSeconds = Math.max(0, parseInt(seconds, 10) || 0);
+    log('system', state.rewardSystem.activeWindowSeconds
+      ? `Only participants active in the last ${state.rewardSystem.activeWindowSeconds}s can win`
+      : 'All participants can win');
+    sendChatCommand(`window ${state.rewardSystem.activeWindowSeconds}`);
+    io.emit('active-window-status', state.rewardSystem.activeWindowSeconds);
+  });
+
+  socket.on('set-entry-rules', (rules) => {
+    const clean = rules && {
+      keywords: (rules.keywords || []).map(k => String(k).trim()).filter(Boolean),
+      excludeModerators: !!rules.excludeModerators,
+      excludeOwner: !!rules.excludeOwner,
+      blockedChannels: (rules.blockedChannels || []).map(String),
+      caseSensitive: !!rules.caseSensitive
+    };
+    const active = clean && (clean.keywords.length || clean.blockedChannels.length ||
+      clean.excludeModerators || clean.excludeOwner);
+    state.rewardSystem.entryRules = active ? clean : null;
+    chatEntryRulesVersion++;
+    log('system', active
+      ? `Entry rules updated: ${clean.keywords.length} keywords, ${clean.blockedChannels.length} blocked channels`
+      : 'Entry rules cleared, every chatter enters');
+    sendChatCommand(`rules ${JSON.stringify({ version: chatEntryRulesVersion, rules: state.rewardSystem.entryRules })}`);
+    io.emit('entry-rules-status', state.rewardSystem.entryRules);
+  });
+
   socket.on('set-progress-title', (title) => {
     state.progressTitle = title;
     log('info', `Progress title changed to: ${title}`);
@@ -763,6 +1285,7 @@ server.listen(PORT, () => {
   console.log(`${colors.bright}${colors.green}╚════════════════════════════════════════════╝${colors.reset}`);
   console.log('');
   log('success', 'All systems operational');
+  startChatStandby();
   log('info', 'Waiting for connections...');
   console.log('');
 });
\ No newline at end of file
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+Tests import the fetcher modules the way the benchmarks do, from ../python
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(TESTS_DIR, 'fixtures')
+
+sys.path.insert(0, os.path.join(TESTS_DIR, '..', 'python'))
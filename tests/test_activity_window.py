@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+ActivityWindow: bucket expiry at the window boundary, moves to newer buckets,
+sub-window counts and the added/removed deltas sent to the server
+"""
+
+import time
+
+import pytest
+
+from activity_window import ActivityWindow
+
+WINDOW = 600
+BUCKET = 10
+
+
+@pytest.fixture
+def now():
+    # Bucket-aligned and close to the real clock, touch() checks against it
+    return int(time.time()) // BUCKET * BUCKET
+
+
+@pytest.fixture
+def window():
+    return ActivityWindow(WINDOW, BUCKET)
+
+
+def test_bucket_expires_once_it_is_completely_outside_the_window(window, now):
+    window.touch('early', now - 1)  # Last second of the previous bucket
+    window.touch('late', now)  # First second of this one
+    assert window.expire(now + WINDOW - 1) == 0
+    assert window.expire(now + WINDOW) == 1  # 'early' is now a full bucket past the window
+    assert 'early' not in window and 'late' in window
+    assert window.expire(now + WINDOW + BUCKET - 1) == 0
+    assert window.expire(now + WINDOW + BUCKET) == 1
+    assert len(window) == 0
+    assert window.oldest is None
+
+
+def test_new_activity_moves_a_participant_to_a_newer_bucket(window, now):
+    window.touch('viewer', now - BUCKET)
+    window.touch('viewer', now)
+    window.touch('viewer', now - 2 * BUCKET)  # Older than what is recorded, ignored
+    assert window.bucket_of['viewer'] == now // BUCKET
+    assert window.expire(now + WINDOW) == 0
+    assert 'viewer' in window
+
+
+def test_touch_many_matches_touch(window, now):
+    window.touch('a', now - BUCKET)
+    window.touch_many(['a', 'b', 'c'], now)
+    assert len(window) == 3
+    assert window.buckets[now // BUCKET] == {'a', 'b', 'c'}
+    assert not window.buckets[now // BUCKET - 1]
+
+
+def test_activity_older_than_the_window_is_not_recorded(window, now):
+    window.touch('stale', now - WINDOW - 2 * BUCKET)
+    window.touch_many(['stale'], now - WINDOW - 2 * BUCKET)
+    assert len(window) == 0
+    assert window.take_deltas() == ([], [], True)
+
+
+def test_count_and_members_for_a_shorter_window(window, now):
+    window.touch('old', now - 300)
+    window.touch_many(['new', 'newer'], now - 5)
+    assert window.count() == 3
+    assert window.count(60, now=now) == 2
+    assert sorted(window.members(60, now=now)) == ['new', 'newer']
+    assert sorted(window.members()) == ['new', 'newer', 'old']
+
+
+def test_deltas_carry_the_full_set_first_then_changes(window, now):
+    window.touch('a', now - BUCKET)
+    added, removed, full = window.take_deltas()
+    assert (sorted(added), removed, full) == (['a'], [], True)
+
+    window.touch('b', now)
+    window.expire(now + WINDOW)  # 'a' leaves
+    added, removed, full = window.take_deltas()
+    assert (added, removed, full) == (['b'], ['a'], False)
+    assert window.take_deltas() == ([], [], False)
+
+    window.mark_full()  # A failed delivery resends everything
+    assert window.take_deltas() == (['b'], [], True)
+
+
+def test_rejoining_after_expiry_is_an_addition(window, now):
+    window.touch('a', now - WINDOW)
+    window.take_deltas()
+    window.expire(now + BUCKET)
+    window.touch('a', now)
+    added, removed, full = window.take_deltas()
+    assert (added, removed, full) == (['a'], [], False)
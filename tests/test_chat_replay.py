@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Replay harness end to end: a synthetic replay against the stand-in server
+delivers every participant and leaves no temporary journal behind
+"""
+
+import io
+import os
+
+import pytest
+
+from chat_replay import ReplayFetcher, StandInServer, SyntheticSource
+from event_channel import LOG_ERROR
+
+
+@pytest.fixture(autouse=True)
+def no_commands(monkeypatch):
+    monkeypatch.setattr('sys.stdin', io.StringIO())  # The control-command reader hits EOF at once
+
+
+@pytest.fixture
+def server():
+    httpd = StandInServer().start()
+    yield httpd
+    httpd.stop()
+
+
+def test_replay_delivers_everyone_and_removes_its_journal(server):
+    fetcher = ReplayFetcher(SyntheticSource(rate=200, duration=1), server.url, speed=0, verbosity=LOG_ERROR)
+    journal_dir = fetcher.journal_dir.name
+    assert os.path.isdir(journal_dir)
+    fetcher.run()
+    report = fetcher.report(server)
+    assert report['messages'] == 200
+    assert report['server']['participants'] == report['participants'] > 0
+    assert not os.path.exists(journal_dir)
+
+
+def test_given_journal_dir_is_left_alone(server, tmp_path):
+    fetcher = ReplayFetcher(SyntheticSource(rate=50, duration=1), server.url, speed=0, verbosity=LOG_ERROR,
+                            journal_options={'journal_dir': str(tmp_path)})
+    assert fetcher.journal_dir is None
+    fetcher.run()
+    assert os.listdir(tmp_path)  # The checkpointed snapshot stays
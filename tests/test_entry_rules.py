@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+EntryRules: keyword/command/hashtag matching in the combined regex, and the
+moderator, owner and blocked-channel exclusions
+"""
+
+from entry_rules import EntryRules
+from participant_store import FLAG_MEMBER, FLAG_MODERATOR, FLAG_OWNER
+
+
+def test_keyword_must_stand_on_its_own():
+    rules = EntryRules(keywords=['!katil'])
+    assert rules.allows('UC1', 0, '!katil')
+    assert rules.allows('UC1', 0, 'ben de !katil lütfen')
+    assert rules.allows('UC1', 0, '!katil!')  # Punctuation after it is fine
+    assert not rules.allows('UC1', 0, '!katilim')  # Glued to more word characters
+    assert not rules.allows('UC1', 0, 'x!katil')
+    assert not rules.allows('UC1', 0, '')
+    assert not rules.allows('UC1', 0, None)
+
+
+def test_hashtags_and_plain_words():
+    rules = EntryRules(keywords=['#çekiliş', 'katıl'])
+    assert rules.allows('UC1', 0, 'selam #çekiliş')
+    assert not rules.allows('UC1', 0, '##çekiliş')
+    assert not rules.allows('UC1', 0, '#katıl')  # A hashtag is not the plain word
+    assert rules.allows('UC1', 0, 'KATIL')  # Case-insensitive by default
+    assert not rules.allows('UC1', 0, 'katılım')
+
+
+def test_longest_overlapping_keyword_wins():
+    rules = EntryRules(keywords=['giveaway', 'giveaway entry'])
+    assert rules.pattern.search('my giveaway entry').group(0) == 'giveaway entry'
+
+
+def test_regex_characters_are_literal():
+    rules = EntryRules(keywords=['c++', '(yes)'])
+    assert rules.allows('UC1', 0, 'c++')
+    assert rules.allows('UC1', 0, 'I say (yes)')
+    assert not rules.allows('UC1', 0, 'c')
+    assert not rules.allows('UC1', 0, 'yes')
+
+
+def test_case_sensitive_matching():
+    rules = EntryRules(keywords=['Join'], case_sensitive=True)
+    assert rules.allows('UC1', 0, 'Join')
+    assert not rules.allows('UC1', 0, 'join')
+
+
+def test_exclusions():
+    rules = EntryRules(exclude_moderators=True, blocked_channels=['UCbot'])
+    assert rules.allows('UC1', FLAG_MEMBER, 'hi')
+    assert not rules.allows('UC1', FLAG_MODERATOR | FLAG_MEMBER, 'hi')
+    assert rules.allows('UC1', FLAG_OWNER, 'hi')  # Only moderators excluded
+    assert not rules.allows('UCbot', 0, 'hi')
+
+    rules = EntryRules(keywords=['!join'], exclude_owner=True)
+    assert not rules.allows('UC1', FLAG_OWNER, '!join')
+    assert not rules.allows('UC1', 0, 'hi')  # Keyword still required
+
+
+def test_from_dict():
+    assert EntryRules.from_dict(None) is None
+    assert EntryRules.from_dict({'keywords': [' ', '']}) is None  # Nothing left to apply
+    rules = EntryRules.from_dict({'keywords': [' !join '], 'excludeModerators': True,
+                                  'blockedChannels': ['UCbot'], 'caseSensitive': True}, version=3)
+    assert rules.version == 3
+    assert rules.keywords == ['!join']
+    assert rules.allows('UC1', 0, '!join')
+    assert not rules.allows('UC1', 0, '!JOIN')
+    assert not rules.allows('UC1', FLAG_MODERATOR, '!join')
+    assert not rules.allows('UCbot', 0, '!join')
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Histogram: bucket index/upper bound math, percentile ranks, scaling and
+clamping, checked against exact sorted samples
+"""
+
+import random
+
+from fetcher_metrics import SUB_BUCKET_BITS, Histogram
+
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+
+def test_small_values_have_exact_buckets():
+    histogram = Histogram()
+    for value in range(2 * SUB_BUCKETS):
+        assert histogram.index(value) == value
+        assert histogram.upper_bound(value) == value
+
+
+def test_buckets_are_contiguous_and_bounded():
+    histogram = Histogram(max_value=10 ** 7)
+    previous = histogram.index(2 * SUB_BUCKETS - 1)
+    for value in range(2 * SUB_BUCKETS, 1 << 16):
+        index = histogram.index(value)
+        assert index in (previous, previous + 1)  # No gaps, never backwards
+        assert value <= histogram.upper_bound(index)
+        assert histogram.index(histogram.upper_bound(index)) == index
+        previous = index
+    # Octave edges: 128..255 in steps of 2, 256.. in steps of 4
+    assert histogram.index(128) == histogram.index(129) != histogram.index(130)
+    assert histogram.upper_bound(histogram.index(256)) == 259
+
+
+def test_relative_error_stays_under_the_resolution():
+    histogram = Histogram()
+    for value in (200, 12345, 10 ** 6, 3 * 10 ** 9):
+        bound = histogram.upper_bound(histogram.index(value))
+        assert 0 <= bound - value <= value / SUB_BUCKETS
+
+
+def test_percentiles_match_exact_ranks():
+    histogram = Histogram(scale=10 ** 6)
+    rng = random.Random(7)
+    samples = [rng.expovariate(1 / 0.05) for _ in range(5000)]  # Seconds, mean 50 ms
+    for sample in samples:
+        histogram.record(sample)
+    ordered = sorted(int(sample * 10 ** 6) for sample in samples)  # Recorded as whole microseconds
+    for q in (50, 90, 99, 100):
+        exact = ordered[-(-len(ordered) * q // 100) - 1]
+        assert exact <= round(histogram.percentile(q) * 10 ** 6) <= exact * (1 + 1 / SUB_BUCKETS)
+    assert histogram.percentile(100) == ordered[-1] / 10 ** 6  # Capped at the recorded max
+
+
+def test_percentile_of_a_few_values():
+    histogram = Histogram()
+    assert histogram.percentile(50) == 0.0
+    for value in (1, 2, 3, 4):
+        histogram.record(value)
+    assert [histogram.percentile(q) for q in (0, 25, 50, 75, 100)] == [1, 1, 2, 3, 4]
+
+
+def test_values_are_scaled_and_clamped():
+    histogram = Histogram(scale=1000, max_value=5000)
+    histogram.record(-1)
+    histogram.record(0.0025)
+    histogram.record(60)  # Beyond max_value
+    summary = histogram.summary()
+    assert summary['count'] == 3
+    assert summary['min'] == 0
+    assert summary['max'] == 5.0
+    assert histogram.sum == 0.002 + 5.0
+    assert histogram.percentile(50) == 0.002
+    assert len(histogram.counts) == histogram.index(5000) + 1
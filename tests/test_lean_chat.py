@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Lean parser conformance: every item of every continuation fixture must come out
+of LeanProcessor with the same fields pytchat's DefaultProcessor gives it
+
+Fixtures in tests/fixtures/*.jsonl hold raw get_live_chat responses, one per
+line, in the format `chat_replay.py record <video_id> out.jsonl --raw raw.jsonl`
+writes; add new recordings there as YouTube's markup changes.
+"""
+
+import glob
+import json
+import os
+
+import pytest
+
+pytest.importorskip('pytchat')
+
+from pytchat.parser.live import Parser  # noqa: E402
+from pytchat.processors.default.processor import DefaultProcessor  # noqa: E402
+
+import lean_chat  # noqa: E402
+from conftest import FIXTURES_DIR  # noqa: E402
+from participant_store import message_flags  # noqa: E402
+
+FIELDS = ('id', 'type', 'message', 'timestamp')
+AUTHOR_FIELDS = ('channelId', 'name', 'isVerified', 'isChatOwner', 'isChatSponsor', 'isChatModerator')
+FIXTURES = sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.jsonl')))
+
+
+def components(path):
+    """Chat components as PytchatCore._get_chat_component builds them, one per response"""
+    parser = Parser(is_replay=False)
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            contents, _ = parser.get_contents(json.loads(line))
+            metadata, chatdata = parser.parse(contents)
+            yield {'timeout': metadata['timeoutMs'] / 1000, 'chatdata': chatdata}
+
+
+def describe(chat):
+    fields = {field: getattr(chat, field) for field in FIELDS}
+    fields.update({'author.' + field: getattr(chat.author, field) for field in AUTHOR_FIELDS})
+    fields['flags'] = message_flags(chat)
+    return fields
+
+
+def test_fixtures_present():
+    assert FIXTURES, f"no continuation fixtures in {FIXTURES_DIR}"
+
+
+@pytest.mark.parametrize('path', FIXTURES, ids=os.path.basename)
+def test_lean_matches_default_processor(path):
+    default = DefaultProcessor()
+    lean = lean_chat.LeanProcessor()
+    for number, component in enumerate(components(path), 1):
+        expected = default.process([component])
+        actual = lean.process([component])
+        assert actual.interval == expected.interval, f"response {number}: interval"
+        assert [chat.id for chat in actual.items] == [chat.id for chat in expected.items], f"response {number}: items"
+        for want, got in zip(expected.items, actual.items):
+            want, got = describe(want), describe(got)
+            for field in want:
+                assert got[field] == want[field], f"response {number}, {want['id']}: {field}"
+
+
+def test_fixtures_cover_every_item_type_and_flag():
+    """Conformance only means something if the fixtures exercise every branch"""
+    lean = lean_chat.LeanProcessor()
+    chats = [chat for path in FIXTURES for component in components(path)
+             for chat in lean.process([component]).items]
+    assert {chat.type for chat in chats} >= set(lean_chat.ITEM_TYPES.values())
+    for field in AUTHOR_FIELDS[2:]:
+        assert any(getattr(chat.author, field) for chat in chats), field
+    assert any(':' in chat.message for chat in chats)  # Custom emoji shortcuts
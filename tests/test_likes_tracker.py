@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+LikesTracker's streaming scanner against fixture watch pages served locally:
+count present (early, late, split across chunks), count missing, markup
+YouTube restructured, and 304 revalidation
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from likes_tracker import LikesTracker
+
+FILLER = b'<script nonce="x">var ytInitialData = {"contents":{"twoColumnWatchNextResults":{}}};</script>\n' * 2000
+LIKES_MARKUP = b'{"toggleButtonViewModel":{"likeCount":"4321","title":"like"}}'
+# Markup seen after YouTube reshuffles the page: the count only in display text
+RESTRUCTURED_MARKUP = (b'{"likeButtonViewModel":{"likeCountEntity":{"likeCountIfIndifferentNumber":"4321",'
+                       b'"accessibilityText":"like this video along with 4,321 other people"}}}')
+ETAG = '"fixture-1"'
+
+
+def page(markup=b'', position=0.1):
+    at = int(len(FILLER) * position)
+    return b'<!DOCTYPE html><html><body>' + FILLER[:at] + markup + FILLER[at:] + b'</body></html>'
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+    body = b''
+
+    def handle_error(self, request, client_address):
+        pass  # The scanner hangs up early on purpose
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.send_header('ETag', ETAG)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(self.server.body)))
+        self.send_header('ETag', ETAG)
+        self.end_headers()
+        try:
+            self.wfile.write(self.server.body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = FixtureServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def tracker_for(server, **options):
+    url = f"http://127.0.0.1:{server.server_address[1]}/watch?v=fixture"
+    return LikesTracker('fixture', on_likes=None, log=lambda *args: None, url=url, **options)
+
+
+def test_count_found_early_without_reading_the_whole_page(server):
+    server.body = page(LIKES_MARKUP, 0.1)
+    tracker = tracker_for(server)
+    assert tracker.poll() == 4321
+    assert tracker.stats['misses'] == 0
+    assert tracker.stats['last_bytes'] < len(server.body) / 2
+
+
+def test_count_found_late(server):
+    server.body = page(LIKES_MARKUP, 0.95)
+    assert tracker_for(server).poll() == 4321
+
+
+def test_count_split_across_chunks(server):
+    server.body = page(LIKES_MARKUP, 0.5)
+    offset = server.body.index(b'"likeCount"') + 5  # The boundary falls inside the key
+    assert tracker_for(server, chunk_size=offset).poll() == 4321
+
+
+def test_count_missing(server):
+    server.body = page()
+    tracker = tracker_for(server)
+    assert tracker.poll() is None
+    assert tracker.stats['misses'] == 1
+    assert tracker.stats['last_bytes'] == len(server.body)  # Read to the end looking for it
+
+
+def test_restructured_markup_is_a_miss_not_a_wrong_count(server):
+    server.body = page(RESTRUCTURED_MARKUP, 0.1)
+    tracker = tracker_for(server)
+    assert tracker.poll() is None
+    assert tracker.stats['misses'] == 1
+    assert tracker.likes is None
+
+
+def test_not_modified_keeps_the_last_count(server):
+    server.body = page(LIKES_MARKUP, 0.1)
+    tracker = tracker_for(server)
+    tracker.observe(tracker.poll())
+    assert tracker.etag == ETAG
+    assert tracker.poll() == 4321
+    assert tracker.stats['not_modified'] == 1
+    assert tracker.stats['last_bytes'] == 0
+
+
+def test_has_its_own_session():
+    # Early exits close connections; they must not come out of the server client's pool
+    assert LikesTracker('a', None).session is not LikesTracker('b', None).session
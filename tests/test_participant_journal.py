@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+ParticipantJournal: restore from snapshot plus journal tail, a torn last line
+after a crash, and compaction into the snapshot
+"""
+
+import json
+import os
+
+import pytest
+
+from participant_journal import ParticipantJournal
+from participant_store import Participant
+
+
+def wire(i):
+    return {'name': f"viewer {i}", 'id': f"UC{i:06d}", 'url': '', 'first_seen': '2026-01-01T00:00:00'}
+
+
+def journal_lines(participants):
+    return ''.join(json.dumps(p, separators=(',', ':')) + '\n' for p in participants).encode('utf-8')
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return ParticipantJournal('abc/def?', lambda: [], journal_dir=str(tmp_path), log=lambda *args: None)
+
+
+def test_nothing_to_restore(journal):
+    assert journal.load() == {}
+    assert journal.entries == 0
+
+
+def test_torn_last_line_keeps_every_complete_entry(journal):
+    data = journal_lines([wire(i) for i in range(5)])
+    with open(journal.journal_path, 'wb') as f:
+        f.write(data + b'{"name":"viewer 5","id":"UC0000')  # Crashed mid-write
+    restored = journal.load()
+    assert sorted(restored) == [f"UC{i:06d}" for i in range(5)]
+    assert restored['UC000003'] == wire(3)
+    assert journal.stats['restored'] == 5
+
+
+def test_snapshot_plus_tail(journal):
+    with open(journal.snapshot_path, 'wb') as f:
+        f.write(json.dumps([wire(0), wire(1)]).encode('utf-8'))
+    renamed = dict(wire(1), name='renamed later')
+    with open(journal.journal_path, 'wb') as f:
+        f.write(journal_lines([renamed, wire(2)]) + b'[1, 2]\n{"no id": true}\n')  # Not participants, skipped
+    restored = journal.load()
+    assert sorted(restored) == ['UC000000', 'UC000001', 'UC000002']
+    assert restored['UC000001']['name'] == 'viewer 1'  # First record of a participant wins
+    assert journal.entries == 4
+
+
+def test_unreadable_snapshot_falls_back_to_the_tail(tmp_path):
+    messages = []
+    journal = ParticipantJournal('video', lambda: [], journal_dir=str(tmp_path), log=messages.append)
+    with open(journal.snapshot_path, 'wb') as f:
+        f.write(b'[{"id": "UC000000"')  # Torn snapshot
+    with open(journal.journal_path, 'wb') as f:
+        f.write(journal_lines([wire(7)]))
+    assert list(journal.load()) == ['UC000007']
+    assert 'unreadable journal snapshot' in messages[0]
+
+
+def test_written_entries_restore_and_compact(tmp_path):
+    roster = []
+    journal = ParticipantJournal('video', lambda: [p.to_wire() for p in roster], journal_dir=str(tmp_path),
+                                 log=lambda *args: None, write_interval=60)
+    journal.start()
+    for i in range(3):
+        participant = Participant(f"UC{i:06d}", f"viewer {i}", 1700000000.0)
+        roster.append(participant)
+        journal.append(participant)
+    journal.stop()
+    assert sorted(ParticipantJournal('video', None, journal_dir=str(tmp_path)).load()) == [p.id for p in roster]
+
+    journal.start()
+    roster.append(Participant('UC000003', 'viewer 3', 1700000000.0))  # The roster holds everything journaled
+    journal.extend(roster[-1:])
+    journal.stop(checkpoint=True)  # Snapshot holds the roster, the journal is empty
+    assert os.path.getsize(journal.journal_path) == 0
+    assert journal.stats['compactions'] == 1
+    assert sorted(ParticipantJournal('video', None, journal_dir=str(tmp_path)).load()) == [p.id for p in roster]
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Bounded-memory store: the Bloom filter never forgets a key, and records keep
+their activity through eviction, the spill file and back
+"""
+
+import os
+import threading
+
+import pytest
+
+from bloom_filter import BloomFilter, ScalableBloomFilter, key_hashes
+from participant_spill import SpillingParticipantStore
+from participant_store import FLAG_MEMBER, FLAG_SUPERCHAT
+
+
+def test_bloom_filter_has_no_false_negatives_across_growth():
+    bloom = ScalableBloomFilter(initial_capacity=1000, error_rate=0.01)
+    keys = [f"UC{i:022d}" for i in range(20000)]
+    added = sum(bloom.add(key) for key in keys)
+    assert len(bloom.filters) > 1  # Grew past the first filter
+    assert all(key in bloom for key in keys)
+    assert added == len(bloom) >= len(keys) * 0.99  # Only false positives report "maybe seen"
+    assert not bloom.add(keys[0])
+
+
+def test_bloom_filter_false_positive_rate_stays_bounded():
+    bloom = ScalableBloomFilter(initial_capacity=1000, error_rate=0.01)
+    for i in range(20000):
+        bloom.add(f"seen-{i}")
+    false_positives = sum(f"unseen-{i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.02  # error_rate bounds the chain, with slack for sampling
+
+
+def test_fixed_filter_sizing():
+    bloom = BloomFilter(1000, 0.01)
+    assert bloom.num_bits >= 9585  # -n ln p / ln(2)^2
+    assert bloom.num_hashes == 7
+    hashes = key_hashes('UCabc')
+    assert not bloom.contains(hashes)
+    bloom.add(hashes)
+    assert bloom.contains(hashes)
+
+
+def test_invalid_error_rate():
+    with pytest.raises(ValueError):
+        ScalableBloomFilter(error_rate=0)
+    with pytest.raises(ValueError):
+        ScalableBloomFilter(error_rate=1)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SpillingParticipantStore(memory_mb=1, flush_size=200, bloom_capacity=500, spill_dir=str(tmp_path))
+    yield store
+    store.close()
+
+
+def fill(store, count):
+    for i in range(count):
+        record = store.add(f"UC{i:06d}", f"viewer {i}", 1700000000.0 + i, 'video')
+        store.record_activity(record, 1700000100.0 + i, FLAG_MEMBER if i % 2 else 0)
+    return [f"UC{i:06d}" for i in range(count)]
+
+
+def test_spilled_records_round_trip(store):
+    ids = fill(store, 3 * store.cache_size)
+    assert len(store) == len(ids)
+    assert len(store.cache) == store.cache_size
+    assert store.stats['flushes'] > 0
+
+    record = store.get(ids[0])  # Long evicted, read back from disk
+    assert store.stats['disk_hits'] == 1
+    assert (record.name, record.first_seen, record.video_id) == ('viewer 0', 1700000000.0, 'video')
+    assert (record.messages, record.last_seen, record.flags) == (1, 1700000100.0, 0)
+    assert store.get(ids[1]).flags == FLAG_MEMBER
+
+    # Activity on a record read back sticks through its next eviction
+    store.record_activity(record, 1700009999.0, FLAG_SUPERCHAT)
+    fill_more = [store.add(f"UCnew{i}", 'n') for i in range(store.cache_size)]
+    assert all(fill_more) and ids[0] not in store.cache
+    record = store.get(ids[0])
+    assert (record.messages, record.last_seen, record.flags) == (2, 1700009999.0, FLAG_SUPERCHAT)
+    assert record.weight == 4.0  # Two messages, doubled for the superchat
+
+
+def test_lookups_and_duplicates(store):
+    ids = fill(store, 2 * store.cache_size)
+    assert store.add(ids[0], 'again') is None
+    assert store.missing(ids[:5] + ['UCnever']) == {'UCnever'}
+    assert store.get('UCnever', 'default') == 'default'
+    assert ids[-1] in store and 'UCnever' not in store
+    with pytest.raises(KeyError):
+        store['UCnever']
+
+
+def test_rows_yield_every_record_in_slot_order(store):
+    ids = fill(store, 2 * store.cache_size + 10)
+    cached = store.cache[ids[-1]]
+    records = list(store.values())
+    assert [record.id for record in records] == ids
+    assert [record.slot for record in records] == list(range(len(ids)))
+    assert records[-1] is cached  # Cached records as they are, not a stale disk copy
+    assert [wire['id'] for wire in store.to_wire()] == ids
+
+
+def test_load_wire_restores_a_roster(store, tmp_path):
+    ids = fill(store, 1500)
+    roster = store.to_wire()
+    restored = SpillingParticipantStore(memory_mb=1, flush_size=200, spill_dir=str(tmp_path))
+    try:
+        assert restored.load_wire(roster) == len(ids)
+        assert restored.load_wire(roster) == 0
+        assert [record.id for record in restored.values()] == ids
+        assert restored.get(ids[3]).name == 'viewer 3'
+    finally:
+        restored.close()
+
+
+def test_rows_while_the_fetcher_thread_inserts(store):
+    fill(store, 2 * store.cache_size)
+    errors = []
+    done = threading.Event()
+
+    def read_rosters():
+        try:
+            while not done.is_set():
+                records = list(store.rows(batch=256))
+                assert [record.slot for record in records] == list(range(len(records)))
+        except Exception as e:  # Surfaced in the main thread
+            errors.append(e)
+
+    reader = threading.Thread(target=read_rosters)
+    reader.start()
+    try:
+        for i in range(5000):
+            record = store.add(f"UCmore{i}", 'more') or store.get(f"UCmore{i}")
+            store.get(f"UC{i % (2 * store.cache_size):06d}")  # Moves old records back into the cache
+            store.record_activity(record)
+    finally:
+        done.set()
+        reader.join()
+    assert not errors
+    assert len(list(store.rows())) == 2 * store.cache_size + 5000
+
+
+def test_close_removes_the_spill_file(tmp_path):
+    store = SpillingParticipantStore(memory_mb=1, spill_dir=str(tmp_path))
+    assert os.path.exists(store.path)
+    store.close()
+    assert not os.listdir(tmp_path)
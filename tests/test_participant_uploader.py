@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Delta upload protocol between ParticipantUploader and the server: in-order
+acks, go-back-N resends, gap and restart resyncs, retries after failures
+
+Runs against chat_replay's StandInServer, which applies the same seq rules
+as server.js /api/chat-participants; FlakyHandler adds the failures.
+"""
+
+import json
+import time
+
+import pytest
+
+from chat_replay import StandInHandler, StandInServer
+from participant_store import Participant
+from participant_uploader import ParticipantUploader
+from request_budget import SERVER, RequestBudget
+from server_client import ServerClient
+
+
+class FlakyHandler(StandInHandler):
+    def do_POST(self):
+        server = self.server
+        if self.path == '/api/chat-participants' and server.fail_next:
+            server.fail_next -= 1
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path == '/api/chat-participants' and server.lose_reply:
+            # Applied, but the reply never arrives: a timeout after the fact
+            server.lose_reply -= 1
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            server.ingest(json.loads(body))
+            self.close_connection = True
+            return
+        super().do_POST()
+
+
+@pytest.fixture
+def server():
+    httpd = StandInServer()
+    httpd.RequestHandlerClass = FlakyHandler
+    httpd.fail_next = 0
+    httpd.lose_reply = 0
+    httpd.handle_error = lambda request, address: None  # Connections we drop on purpose
+    httpd.start()
+    yield httpd
+    httpd.stop()
+
+
+class Harness:
+    """An uploader flushed by hand, with everything it was given as its roster"""
+
+    def __init__(self, server):
+        self.participants = []
+        self.client = ServerClient(server.url)
+        self.budget = RequestBudget(backoff_base=0.01, backoff_cap=0.02)
+        self.uploader = ParticipantUploader(
+            'video', self.client, lambda: [p.to_wire() for p in self.participants],
+            log=lambda *args: None, budget=self.budget
+        )
+
+    def add(self, count, drain=True):
+        start = len(self.participants)
+        for i in range(start, start + count):
+            participant = Participant(f"UC{i:06d}", f"viewer {i}", time.time())
+            self.participants.append(participant)
+            self.uploader.submit(participant)
+        if drain:  # By hand, unless the sender thread runs
+            self.uploader.drain()
+
+    def flush(self, retry=True):
+        return self.uploader.flush(retry=retry)
+
+    @property
+    def ids(self):
+        return {p.id for p in self.participants}
+
+
+@pytest.fixture
+def harness(server):
+    harness = Harness(server)
+    yield harness
+    harness.client.close()
+
+
+def test_batches_are_acknowledged_in_order(server, harness):
+    for batch in range(3):
+        harness.add(5)
+        assert harness.flush()
+        assert server.last_seq == harness.uploader.seq == batch + 1
+    assert server.participant_ids == harness.ids
+    assert not harness.uploader.inflight_batches
+    assert harness.uploader.backlog == 0
+    assert server.resyncs_requested == 0
+
+
+def test_gap_triggers_full_resync(server, harness):
+    harness.add(5)
+    assert harness.flush()
+    with server.lock:
+        server.last_seq = 0  # Batch 1 "never arrived", so seq 2 is a gap
+        server.participant_ids.clear()
+    harness.add(5)
+    assert harness.flush()
+    assert server.resyncs_requested == 1
+    assert harness.uploader.stats['resyncs'] == 1
+    assert server.participant_ids == harness.ids  # The roster filled the hole
+    assert harness.uploader.backlog == 0
+
+
+def test_server_restart_triggers_full_resync(server, harness):
+    harness.add(5)
+    assert harness.flush()
+    with server.lock:
+        server.session, server.last_seq = None, 0  # Restarted: unknown session, nothing stored
+        server.participant_ids.clear()
+    harness.add(3)
+    assert harness.flush()
+    assert harness.uploader.stats['resyncs'] == 1
+    assert server.participant_ids == harness.ids
+    assert server.last_seq == harness.uploader.seq
+
+
+def test_failed_post_is_retried_with_the_same_seq(server, harness):
+    server.fail_next = 1
+    harness.add(5)
+    assert harness.flush()
+    assert server.last_seq == harness.uploader.seq == 1  # No seq burnt on the failure
+    assert server.participant_ids == harness.ids
+    assert server.resyncs_requested == 0
+    assert harness.budget.snapshot()[SERVER]['throttles'] == 1  # 503 counts as throttling
+
+
+def test_lost_reply_is_resent_and_acknowledged_as_duplicate(server, harness):
+    server.lose_reply = 1
+    harness.add(5)
+    assert harness.flush()
+    harness.add(5)
+    assert harness.flush()
+    assert server.lose_reply == 0
+    assert server.resyncs_requested == 0
+    assert server.participant_ids == harness.ids
+    assert server.last_seq == harness.uploader.seq == 2
+
+
+def test_final_flush_keeps_unacknowledged_batches(server, harness):
+    server.fail_next = 5
+    harness.add(5)
+    assert not harness.flush(retry=False)
+    assert server.fail_next == 4  # One attempt only
+    assert harness.uploader.backlog == 5
+    assert 1 in harness.uploader.inflight_batches
+    server.fail_next = 0
+    assert harness.flush()
+    assert server.participant_ids == harness.ids
+    assert harness.uploader.backlog == 0
+
+
+def test_sender_thread_retries_through_failures(server, harness):
+    server.fail_next = 2
+    harness.uploader.start()
+    for _ in range(10):
+        harness.add(25, drain=False)
+    deadline = time.monotonic() + 5.0
+    while harness.uploader.backlog and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert harness.uploader.stop(timeout=5.0) == 0
+    assert server.participant_ids == harness.ids
+    assert server.resyncs_requested == 0
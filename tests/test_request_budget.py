@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+RequestBudget: token refill, per-class reserves, priority order among waiters,
+the shared backoff (and chat polls bypassing it), Retry-After, cancel/timeout
+"""
+
+import threading
+import time
+
+import pytest
+
+from request_budget import (PRIORITY_CHAT, PRIORITY_HEARTBEAT, PRIORITY_LIKES, PRIORITY_UPLOAD, SERVER,
+                            YOUTUBE, RequestBudget, parse_rates)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Response:
+    def __init__(self, status_code, retry_after=None):
+        self.status_code = status_code
+        self.headers = {} if retry_after is None else {'Retry-After': str(retry_after)}
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def budget_with(clock, rate=1.0, burst=10):
+    return RequestBudget(rates={YOUTUBE: (rate, burst)}, clock=clock)
+
+
+def take(budget, count, priority=PRIORITY_CHAT):
+    for _ in range(count):
+        assert budget.acquire(YOUTUBE, priority, timeout=0)
+
+
+def test_parse_rates():
+    assert parse_rates('youtube=10,server=40/80') == {YOUTUBE: (10.0, 20), SERVER: (40.0, 80)}
+    assert parse_rates(' youtube = 0.5 ,') == {YOUTUBE: (0.5, 1)}
+    with pytest.raises(ValueError):
+        parse_rates('elsewhere=5')
+    with pytest.raises(ValueError):
+        parse_rates('youtube=0')
+
+
+def test_bucket_empties_and_refills(clock):
+    budget = budget_with(clock, rate=2.0, burst=4)
+    take(budget, 4)
+    assert not budget.acquire(YOUTUBE, PRIORITY_CHAT, timeout=0)
+    clock.now += 1.0  # Two tokens back
+    take(budget, 2)
+    assert not budget.acquire(YOUTUBE, PRIORITY_CHAT, timeout=0)
+    clock.now += 60.0  # Never more than the burst
+    take(budget, 4)
+    assert not budget.acquire(YOUTUBE, PRIORITY_CHAT, timeout=0)
+
+
+def test_lower_classes_leave_their_reserve(clock):
+    # Burst 10: chat needs 1 token in the bucket, uploads 2, likes 3.5, heartbeats 6
+    budget = budget_with(clock)
+    take(budget, 5)
+    assert not budget.acquire(YOUTUBE, PRIORITY_HEARTBEAT, timeout=0)
+    take(budget, 2, PRIORITY_LIKES)  # 5 -> 3 tokens
+    assert not budget.acquire(YOUTUBE, PRIORITY_LIKES, timeout=0)
+    take(budget, 2, PRIORITY_UPLOAD)  # 3 -> 1
+    assert not budget.acquire(YOUTUBE, PRIORITY_UPLOAD, timeout=0)
+    take(budget, 1, PRIORITY_CHAT)
+    stats = budget.snapshot()[YOUTUBE]
+    assert stats['granted'] == {'chat': 6, 'upload': 2, 'likes': 2, 'heartbeat': 0}
+    assert stats['timeouts'] == 3
+
+
+def test_reserve_is_capped_at_the_burst(clock):
+    budget = budget_with(clock, burst=1)  # 1 + 0.5 * 1 would never fit in the bucket
+    assert budget.acquire(YOUTUBE, PRIORITY_HEARTBEAT, timeout=0)
+
+
+def test_backoff_blocks_retries_and_lower_classes_but_not_chat_polls(clock):
+    budget = budget_with(clock)
+    delay = budget.failed(YOUTUBE)
+    assert 0.5 <= delay <= 1.0  # Half fixed, half jitter of the 1 s base
+    assert budget.acquire(YOUTUBE, PRIORITY_CHAT, timeout=0)  # Open connection keeps polling
+    assert not budget.acquire(YOUTUBE, PRIORITY_CHAT, timeout=0, retry=True)
+    assert not budget.acquire(YOUTUBE, PRIORITY_UPLOAD, timeout=0)
+    clock.now += delay
+    assert budget.acquire(YOUTUBE, PRIORITY_CHAT, timeout=0, retry=True)
+    assert budget.acquire(YOUTUBE, PRIORITY_UPLOAD, timeout=0)
+
+
+def test_backoff_grows_and_resets_on_success(clock):
+    budget = budget_with(clock)
+    delays = [budget.failed(YOUTUBE) for _ in range(4)]
+    assert delays[-1] >= 4.0  # 8 s ceiling on the fourth failure, at least half of it
+    assert budget.snapshot()[YOUTUBE]['failures'] == 4
+    budget.succeeded(YOUTUBE)
+    assert budget.acquire(YOUTUBE, PRIORITY_UPLOAD, timeout=0)
+    assert budget.failed(YOUTUBE) <= 1.0
+
+
+def test_retry_after_on_throttling_only(clock):
+    budget = budget_with(clock)
+    assert budget.failed(YOUTUBE, Response(429, retry_after=30)) >= 30
+    assert budget.snapshot()[YOUTUBE]['throttles'] == 1
+    budget.succeeded(YOUTUBE)
+    assert budget.failed(YOUTUBE, Response(500, retry_after=30)) <= 1.0  # Not a throttle
+    assert budget.failed(YOUTUBE, Response(503, retry_after='Wed, 21 Oct 2015 07:28:00 GMT')) < 30
+    assert budget.totals() == {'budget_throttles': 2, 'budget_failures': 3, 'budget_timeouts': 0}
+
+
+def test_destinations_are_independent(clock):
+    budget = RequestBudget(rates={YOUTUBE: (1.0, 1), SERVER: (1.0, 1)}, clock=clock)
+    budget.failed(YOUTUBE)
+    assert budget.acquire(SERVER, PRIORITY_UPLOAD, timeout=0)
+    assert not budget.acquire(YOUTUBE, PRIORITY_UPLOAD, timeout=0)
+
+
+def test_cancel_ends_a_wait(clock):
+    budget = budget_with(clock)
+    budget.failed(YOUTUBE)
+    cancel = threading.Event()
+    cancel.set()
+    assert not budget.acquire(YOUTUBE, PRIORITY_UPLOAD, cancel=cancel)
+    assert budget.snapshot()[YOUTUBE]['timeouts'] == 1
+
+
+def test_timeout_and_cancel_with_a_real_clock():
+    budget = RequestBudget(rates={YOUTUBE: (0.01, 1)})
+    take(budget, 1)
+    started = time.monotonic()
+    assert not budget.acquire(YOUTUBE, PRIORITY_CHAT, timeout=0.1)
+    assert 0.1 <= time.monotonic() - started < 1.0
+
+    cancel = threading.Event()
+    threading.Timer(0.1, cancel.set).start()
+    started = time.monotonic()
+    assert not budget.acquire(YOUTUBE, PRIORITY_CHAT, cancel=cancel)
+    assert time.monotonic() - started < 1.0  # Noticed within CANCEL_POLL
+    assert budget.snapshot()[YOUTUBE]['queued'] == 0
+
+
+def test_higher_priority_waiter_goes_first():
+    budget = RequestBudget(rates={YOUTUBE: (5.0, 1)})  # One token every 0.2 s
+    take(budget, 1)
+    order = []
+
+    def waiter(priority):
+        assert budget.acquire(YOUTUBE, priority, timeout=5)
+        order.append(priority)
+
+    threads = [threading.Thread(target=waiter, args=(priority,)) for priority in (PRIORITY_LIKES, PRIORITY_CHAT)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)  # Both queued well before the next token
+    for thread in threads:
+        thread.join()
+    assert order == [PRIORITY_CHAT, PRIORITY_LIKES]
+    assert budget.snapshot()[YOUTUBE]['waited'] == 2
+
+
+def test_waiter_in_backoff_does_not_hold_up_chat_polls():
+    budget = RequestBudget(rates={YOUTUBE: (1.0, 10)})
+    budget.failed(YOUTUBE)
+    cancel = threading.Event()
+    result = []
+    thread = threading.Thread(target=lambda: result.append(budget.acquire(YOUTUBE, PRIORITY_CHAT, retry=True,
+                                                                          cancel=cancel)))
+    thread.start()
+    time.sleep(0.05)  # The retry is queued ahead, waiting out the backoff
+    assert budget.acquire(YOUTUBE, PRIORITY_CHAT, timeout=0)
+    cancel.set()
+    thread.join()
+    assert result == [False]